@@ -0,0 +1,230 @@
+# Stage benchmarks on synthetic corpora - times every pipeline stage, saves JSON baselines and
+# fails when a stage is slower than its baseline by more than a threshold.
+# benchmarks/run_benchmarks.py
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from benchmarks.synthetic_corpus import write_corpus
+
+BASELINE_DIR = Path("benchmarks/baselines")
+RESULTS_DIR = Path("data/benchmarks/results")
+STAGES = ["clean", "psych_lexicon", "psych_textblob", "projection", "eai", "features", "embed",
+          "knn_graph", "umap", "hdbscan", "merge", "label_summary"]
+
+
+# --- Tiny local encoder ---
+def build_tiny_encoder(model_dir, texts, hidden_size=32, layers=2):
+    """
+    Save a randomly initialised two-layer BERT with a vocabulary built from texts
+    as a SentenceTransformer directory, so the embedding stage runs the real
+    encode() path without downloading a model.
+    """
+    model_dir = Path(model_dir)
+    if (model_dir / "modules.json").exists():
+        return model_dir
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    vocab = Counter(word for text in texts[:10_000] for word in text.lower().split())
+    tokens = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [w for w, _ in vocab.most_common(5_000)]
+    raw_dir = model_dir / "bert"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    (raw_dir / "vocab.txt").write_text("\n".join(tokens) + "\n", encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(raw_dir / "vocab.txt")).save_pretrained(raw_dir)
+    config = BertConfig(vocab_size=len(tokens), hidden_size=hidden_size, num_hidden_layers=layers,
+                        num_attention_heads=2, intermediate_size=hidden_size * 2, max_position_embeddings=512)
+    BertModel(config).save_pretrained(raw_dir)
+
+    transformer = models.Transformer(str(raw_dir), max_seq_length=256)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    SentenceTransformer(modules=[transformer, pooling]).save(str(model_dir))
+    return model_dir
+
+
+# --- Stage runners: each takes the shared context and returns the number of docs processed ---
+def bench_clean(ctx):
+    from feature_engineering.prepare_text_dataset import iter_cleaned
+    import pandas as pd
+    columns = {}
+    for chunk, _ in iter_cleaned(ctx["corpus"], workers=ctx["workers"]):
+        for col, values in chunk.items():
+            columns.setdefault(col, []).extend(values)
+    ctx["clean"] = pd.DataFrame(columns)
+    return len(ctx["clean"])
+
+def bench_psych_lexicon(ctx):
+    from feature_engineering.lexicon import LexiconEngine
+    from feature_engineering.psych_signals import count_questions
+    texts = ctx["texts"]
+    ctx["lexicon"] = LexiconEngine().count_frame(texts)
+    ctx["questions"] = [count_questions(t) for t in texts]
+    return len(texts)
+
+def bench_psych_textblob(ctx):
+    from feature_engineering.sentiment_cache import get_cache
+    ctx["sentiment"] = get_cache().sentiment_many(ctx["texts"])
+    return len(ctx["texts"])
+
+def bench_projection(ctx):
+    from feature_engineering.projection_signals import extract_projection_features_batch
+    extract_projection_features_batch(ctx["texts"])
+    return len(ctx["texts"])
+
+def bench_eai(ctx):
+    from feature_engineering.emergent_agency_index import compute_emergent_agency_index
+    compute_emergent_agency_index(ctx["texts"])
+    return len(ctx["texts"])
+
+def bench_features(ctx):
+    # psych + projection + EAI through the registry, sharing each intermediate (RoBERTa excluded: no model here)
+    from feature_engineering.feature_registry import extract_features
+    extract_features(ctx["texts"], ["psych", "projection", "eai"])
+    return len(ctx["texts"])
+
+def bench_embed(ctx):
+    import numpy as np
+    from feature_engineering.encoding_engine import encode
+    embeddings = encode(ctx["texts"], model_name=str(ctx["tiny_model"]), workers=ctx["workers"])
+    ctx["embeddings_path"] = ctx["scratch"] / "embeddings.npy"
+    np.save(ctx["embeddings_path"], embeddings)
+    ctx["embeddings"] = embeddings
+    return len(embeddings)
+
+def bench_knn_graph(ctx):
+    from feature_engineering.knn_graph import DEFAULT_K, build_knn
+    ctx["knn"] = build_knn(ctx["embeddings"], min(DEFAULT_K, len(ctx["embeddings"]) - 1), "cosine")
+    return len(ctx["embeddings"])
+
+def bench_umap(ctx):
+    import umap
+    from feature_engineering.knn_graph import precomputed_knn
+    indices, distances, search_index = ctx["knn"]
+    n_neighbors = min(15, indices.shape[1])
+    reducer = umap.UMAP(n_neighbors=n_neighbors, min_dist=0.1, n_components=2, metric="cosine", random_state=42,
+                        precomputed_knn=precomputed_knn(indices, distances, n_neighbors, search_index))
+    ctx["umap"] = reducer.fit_transform(ctx["embeddings"])
+    return len(ctx["umap"])
+
+def bench_hdbscan(ctx):
+    import hdbscan
+    clusterer = hdbscan.HDBSCAN(min_cluster_size=2, prediction_data=True).fit(ctx["umap"])
+    ctx["labels"] = clusterer.labels_
+    return len(ctx["labels"])
+
+def bench_merge(ctx):
+    from feature_engineering.feature_store import write_feature_store
+    polarity, subjectivity = zip(*ctx["sentiment"]) if ctx["sentiment"] else ((), ())
+    signals = ctx["lexicon"][["i_count", "negation_count", "temporal_refs"]].assign(
+        id=ctx["ids"], question_mark_count=ctx["questions"], word_count=[len(t.split()) for t in ctx["texts"]],
+        sentiment_polarity=polarity, sentiment_subjectivity=subjectivity, cluster=ctx["labels"],
+    )
+    store = write_feature_store(ctx["scratch"] / "feature_store", signals, ctx["embeddings_path"], ctx["ids"])
+    ctx["signals"] = signals
+    return len(store)
+
+def bench_label_summary(ctx):
+    from interpretation.auto_label import extract_top_posts, load_data, load_stats, summarize_traits
+    table_path = ctx["scratch"] / "labeling_table.csv"
+    ctx["signals"].assign(selftext=ctx["texts"]).to_csv(table_path, index=False)
+    df = load_data(table_path)
+    stats = load_stats(table_path, df, cache_dir=ctx["scratch"] / "cluster_stats")
+    clusters = [c for c in sorted(df["cluster"].unique()) if c >= 0]
+    for cluster_id in clusters:
+        summarize_traits(stats, cluster_id)
+        extract_top_posts(stats, cluster_id)
+    return len(df)
+
+RUNNERS = {name: globals()[f"bench_{name}"] for name in STAGES}
+
+
+# --- Running and comparing ---
+def run_suite(n_posts, stages=STAGES, workers=1, seed=0):
+    """Run stages in order on the n_posts corpus; returns {stage: {"seconds", "docs", "docs_per_sec"}}."""
+    from feature_engineering.sentiment_cache import SentimentCache, set_cache
+    corpus = write_corpus(n_posts, seed)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="profiler_bench_") as scratch:
+        scratch = Path(scratch)
+        # A cold sentiment cache per run, shared across stages the way the pipeline shares it
+        previous_cache = set_cache(SentimentCache(scratch / "sentiment.sqlite", max_entries=0))
+        try:
+            ctx = {"corpus": corpus, "workers": workers, "scratch": scratch}
+            last = max(STAGES.index(s) for s in stages)
+            for name in STAGES[:last + 1]:  # earlier stages produce what later ones read
+                if name == "embed":
+                    ctx["tiny_model"] = build_tiny_encoder(Path("data/benchmarks/tiny_encoder"), ctx["texts"])
+                start = time.perf_counter()
+                docs = RUNNERS[name](ctx)
+                seconds = time.perf_counter() - start
+                if name == "clean":
+                    ctx["texts"], ctx["ids"] = ctx["clean"]["text"].tolist(), ctx["clean"]["id"].tolist()
+                if name in stages:
+                    results[name] = {"seconds": round(seconds, 4), "docs": docs,
+                                     "docs_per_sec": round(docs / seconds, 1) if seconds else None}
+                    print(f"  {name:<15} {seconds:9.2f}s  {docs / max(seconds, 1e-9):12,.0f} docs/sec")
+        finally:
+            set_cache(previous_cache)
+    return results
+
+def baseline_path(n_posts, baseline_dir=BASELINE_DIR):
+    return Path(baseline_dir) / f"synthetic_{n_posts}.json"
+
+def compare(results, baseline, threshold, min_seconds=0.05):
+    """Return [(stage, baseline seconds, seconds, ratio)] for stages slower than baseline * (1 + threshold)."""
+    regressions = []
+    for stage, result in results.items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        ratio = result["seconds"] / max(base["seconds"], 1e-9)
+        if ratio > 1 + threshold and result["seconds"] - base["seconds"] > min_seconds:
+            regressions.append((stage, base["seconds"], result["seconds"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="Corpus sizes (e.g. 10000 100000 1000000)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--workers", type=int, default=1, help="Processes for cleaning and encoding")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown over baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baselines")
+    parser.add_argument("--baseline-dir", type=str, default=str(BASELINE_DIR))
+    args = parser.parse_args()
+
+    failed = False
+    for n_posts in args.sizes:
+        print(f"=== {n_posts} posts ===")
+        results = run_suite(n_posts, args.stages, args.workers)
+        report = {"n_posts": n_posts, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                              "processor": platform.processor(), "workers": args.workers},
+                  "stages": results}
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        (RESULTS_DIR / f"synthetic_{n_posts}_{time.strftime('%Y%m%d_%H%M%S')}.json").write_text(json.dumps(report, indent=2))
+
+        path = baseline_path(n_posts, args.baseline_dir)
+        if args.save_baseline:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            print(f"Baseline saved to {path}")
+        elif path.exists():
+            regressions = compare(results, json.loads(path.read_text()), args.threshold)
+            for stage, base, now, ratio in regressions:
+                print(f"REGRESSION {stage}: {base:.2f}s -> {now:.2f}s ({ratio:.2f}x, threshold {1 + args.threshold:.2f}x)")
+            failed |= bool(regressions)
+            if not regressions:
+                print(f"No stage slower than {1 + args.threshold:.2f}x its baseline")
+        else:
+            print(f"No baseline at {path}; run with --save-baseline to create one")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Entry-point startup benchmark - times `python -m <module> --help` (or a bare import for modules without a
+# CLI) in a fresh interpreter, and fails when one exceeds its budget, errors, or writes to the working directory.
+# benchmarks/startup_time.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET = 1.0  # seconds; startup is numpy + pandas at most, never a model, client or corpus
+STDLIB_BUDGET = 0.5   # entry points that import nothing beyond the standard library up front
+
+# module: (mode, budget in seconds); "help" runs the CLI with --help, "import" only imports the module
+ENTRY_POINTS = {
+    "feature_engineering.prepare_text_dataset": ("help", DEFAULT_BUDGET),
+    "feature_engineering.psych_signals": ("help", DEFAULT_BUDGET),
+    "feature_engineering.projection_signals": ("import", DEFAULT_BUDGET),
+    "feature_engineering.emergent_agency_index": ("import", DEFAULT_BUDGET),
+    "feature_engineering.parallel_features": ("help", DEFAULT_BUDGET),
+    "feature_engineering.sentence_engine": ("help", DEFAULT_BUDGET),
+    "feature_engineering.lexicon": ("help", DEFAULT_BUDGET),
+    "feature_engineering.encoding_engine": ("help", DEFAULT_BUDGET),
+    "feature_engineering.embedding_store": ("help", DEFAULT_BUDGET),
+    "feature_engineering.quantized_embeddings": ("help", DEFAULT_BUDGET),
+    "feature_engineering.embed_signals": ("help", DEFAULT_BUDGET),
+    "feature_engineering.knn_graph": ("help", DEFAULT_BUDGET),
+    "feature_engineering.clustering": ("help", DEFAULT_BUDGET),
+    "feature_engineering.sampled_clustering": ("help", DEFAULT_BUDGET),
+    "feature_engineering.hdbscan_sweep": ("help", DEFAULT_BUDGET),
+    "feature_engineering.cluster_model": ("help", DEFAULT_BUDGET),
+    "feature_engineering.merge_all": ("help", DEFAULT_BUDGET),
+    "feature_engineering.incremental": ("help", DEFAULT_BUDGET),
+    "interpretation": ("import", DEFAULT_BUDGET),
+    "interpretation.auto_label": ("help", DEFAULT_BUDGET),
+    "interpretation.review_labels": ("import", DEFAULT_BUDGET),
+    "interpretation.cluster_labels": ("import", DEFAULT_BUDGET),
+    "interpretation.assemble_profiles": ("help", DEFAULT_BUDGET),
+    "interpretation.stand_in_llm_server": ("help", STDLIB_BUDGET),
+    "utils.validate_pipeline": ("import", DEFAULT_BUDGET),
+    "modeling.run_full_process": ("help", STDLIB_BUDGET),
+    "benchmarks.synthetic_corpus": ("help", STDLIB_BUDGET),
+}
+
+
+def _command(module, mode, importtime=False):
+    flags = ["-X", "importtime"] if importtime else []
+    if mode == "help":
+        return [sys.executable, *flags, "-m", module, "--help"]
+    return [sys.executable, *flags, "-c", f"import {module}"]
+
+def _env():
+    """Run as if offline and without credentials: startup must need neither."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env.update(HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1", PYTHONDONTWRITEBYTECODE="1")
+    env.pop("ANTHROPIC_API_KEY", None)
+    return env
+
+def time_entry_point(module, mode, repeats=3):
+    """
+    Best wall time of `repeats` fresh-interpreter starts, run from an empty
+    directory. Returns {"seconds", "returncode", "error", "created"}, where
+    created lists anything the entry point wrote into that directory.
+    """
+    best, result = float("inf"), None
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = subprocess.run(_command(module, mode), cwd=cwd, env=_env(), capture_output=True, text=True)
+            best = min(best, time.perf_counter() - start)
+            if result.returncode != 0:
+                break
+        created = sorted(str(p.relative_to(cwd)) for p in Path(cwd).rglob("*"))
+    return {
+        "seconds": round(best, 3),
+        "returncode": result.returncode,
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode != 0 and result.stderr.strip() else None,
+        "created": created,
+    }
+
+def slowest_imports(module, mode, n=5):
+    """The n top-level imports with the largest cumulative time (seconds), from -X importtime."""
+    with tempfile.TemporaryDirectory() as cwd:
+        stderr = subprocess.run(_command(module, mode, importtime=True), cwd=cwd, env=_env(),
+                                capture_output=True, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # nested imports are indented under the one that pulled them in
+            imports.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+def run(modules, repeats=3, budget_scale=1.0):
+    results, failures = {}, []
+    for module in modules:
+        mode, budget = ENTRY_POINTS[module]
+        budget *= budget_scale
+        result = time_entry_point(module, mode, repeats)
+        result.update(mode=mode, budget=round(budget, 3))
+        problems = []
+        if result["returncode"] != 0:
+            problems.append(f"exited {result['returncode']}: {result['error']}")
+        elif result["seconds"] > budget:
+            problems.append(f"{result['seconds']:.2f}s over the {budget:.2f}s budget")
+            result["slowest_imports"] = slowest_imports(module, mode)
+        if result["created"]:
+            problems.append(f"wrote {', '.join(result['created'])} at startup")
+        status = "FAIL" if problems else "ok"
+        print(f"  {module:45s} {mode:6s} {result['seconds']:6.2f}s / {budget:.2f}s  {status}")
+        for problem in problems:
+            print(f"      {problem}")
+        for seconds, name in result.get("slowest_imports", []):
+            print(f"      {seconds:6.2f}s  import {name}")
+        results[module] = result
+        if problems:
+            failures.append(module)
+    return results, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every entry point starts within its time budget")
+    parser.add_argument("--modules", nargs="+", choices=sorted(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh starts per entry point; the best is kept")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiply every budget (e.g. 2 on a slow CI machine)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    print(f"Startup times (best of {args.repeats}, fresh interpreter, offline, empty working directory):")
+    results, failures = run(args.modules, args.repeats, args.budget_scale)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if failures:
+        print(f"\n{len(failures)} entry point(s) failed the startup check: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\nAll {len(results)} entry points started within budget.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Deterministic synthetic Reddit-style corpus - same seed and size always give byte-identical JSONL.
+# benchmarks/synthetic_corpus.py
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+CORPUS_DIR = Path("data/benchmarks")
+
+SUBREDDITS = ["offmychest", "relationships", "TrueOffMyChest", "confession", "Advice", "lonely", "self"]
+
+# Fragments are chosen to hit every lexicon category (self-reference, negation, temporal,
+# rigidity, tense, ethical and existential terms) at realistic rates
+OPENERS = [
+    "I don't know if I did the right thing.", "Throwaway because my partner reads this sub.",
+    "This has been eating at me for a week.", "Sometimes I wonder if there's meaning to any of it.",
+    "My mom said something yesterday that I can't stop thinking about.", "Long time lurker, first post.",
+    "I regret what I said, but I meant it in the moment.", "You always do this and I never say anything.",
+]
+SENTENCES = [
+    "I was so angry that I said things I should have kept to myself.",
+    "She never listens, obviously, and everyone else thinks that's fine.",
+    "Today I feel like I'm a ghost in my own house.",
+    "We had a fight last month and nothing has been the same since.",
+    "Is it wrong that I feel relieved?",
+    "They clearly think I'm responsible for the whole mess.",
+    "I think about death more than I would like to admit.",
+    "My purpose used to be my job, and now I'm not sure what my identity is.",
+    "He did apologize, but it felt hollow.",
+    "I guess the consequence is that I'm alone now.",
+    "Every day is the same and I don't feel anything anymore.",
+    "I should have left years ago, but I had no idea where to go.",
+    "Why does everyone expect me to be fine?",
+    "It's not about the money, it never was.",
+    "Honestly I feel guilt every time I think about it.",
+    "Tomorrow I have to face them again and I can't do it.",
+    "My existence feels irrelevant to the people around me.",
+    "I thought things would get better after the move.",
+]
+CLOSERS = [
+    "Thanks for reading.", "I just needed to get this out.", "Am I the problem?",
+    "Any advice would help.", "Edit: thank you all, I read every comment.", "",
+]
+TITLES = [
+    "I finally said it", "I don't know what to do anymore", "Update on my situation",
+    "Needed to vent", "Is this normal?", "I feel like a ghost", "My family never listens",
+    "I regret everything", "Small win today", "It's been a year",
+]
+
+
+def make_post(rng, index):
+    """One post as a dict with the fields prepare_text_dataset and embed_signals read."""
+    n_sentences = min(int(rng.expovariate(1 / 6)) + 1, 60)  # long-tailed post lengths
+    parts = [rng.choice(OPENERS)] + [rng.choice(SENTENCES) for _ in range(n_sentences)] + [rng.choice(CLOSERS)]
+    if rng.random() < 0.05:
+        parts.insert(rng.randrange(1, len(parts)), "https://example.com/post/%d" % rng.randrange(10**6))
+    separator = "\n\n" if rng.random() < 0.3 else " "
+    return {
+        "id": f"s{index:07d}",
+        "subreddit": rng.choice(SUBREDDITS),
+        "title": rng.choice(TITLES),
+        "selftext": separator.join(p for p in parts if p),
+        "score": int(rng.paretovariate(1.5)),
+        "num_comments": int(rng.paretovariate(1.2)) - 1,
+        "created_utc": 1_700_000_000 + index * 37,
+    }
+
+def iter_posts(n_posts, seed=0):
+    rng = random.Random(seed)
+    for index in range(n_posts):
+        yield make_post(rng, index)
+
+def corpus_path(n_posts, seed=0, corpus_dir=CORPUS_DIR):
+    return Path(corpus_dir) / f"synthetic_{n_posts}_seed{seed}.jsonl"
+
+def write_corpus(n_posts, seed=0, corpus_dir=CORPUS_DIR):
+    """Write the corpus once and return its path; an existing file for the same size and seed is reused."""
+    path = corpus_path(n_posts, seed, corpus_dir)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".jsonl.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for post in iter_posts(n_posts, seed):
+            f.write(json.dumps(post) + "\n")
+    tmp.replace(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic Reddit-style JSONL corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n_posts in args.sizes:
+        path = write_corpus(n_posts, args.seed)
+        print(f"{n_posts} posts -> {path} ({path.stat().st_size / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from benchmarks.startup_time import STDLIB_BUDGET, time_entry_point
+
+
+def test_stdlib_entry_points_start_fast_without_side_effects():
+    # The other entry points need the full environment; these import nothing heavy up front
+    for module in ["interpretation.stand_in_llm_server", "modeling.run_full_process"]:
+        result = time_entry_point(module, "help", repeats=2)
+        assert result["returncode"] == 0, result["error"]
+        assert result["created"] == []
+        assert result["seconds"] < STDLIB_BUDGET * 2
@@ -0,0 +1,19 @@
+import json
+from benchmarks.synthetic_corpus import iter_posts, write_corpus
+
+REQUIRED_FIELDS = {"id", "subreddit", "title", "selftext", "score", "num_comments"}
+
+
+def test_corpus_is_deterministic(tmp_path):
+    first = write_corpus(500, seed=3, corpus_dir=tmp_path / "a")
+    second = write_corpus(500, seed=3, corpus_dir=tmp_path / "b")
+    assert first.read_bytes() == second.read_bytes()
+    assert list(iter_posts(5, seed=3)) != list(iter_posts(5, seed=4))
+
+
+def test_posts_have_pipeline_fields_and_unique_ids():
+    posts = [json.loads(json.dumps(p)) for p in iter_posts(2000)]
+    assert all(REQUIRED_FIELDS <= post.keys() for post in posts)
+    assert len({post["id"] for post in posts}) == len(posts)
+    assert any("\n" in post["selftext"] for post in posts)
+    assert any("http" in post["selftext"] for post in posts)
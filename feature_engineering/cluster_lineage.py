@@ -0,0 +1,158 @@
+# Cluster lineage - matches each fit's clusters to the previous fit's by member overlap and centroid
+# similarity, so stable ids (and the labels keyed to them) survive a re-cluster.
+# feature_engineering/cluster_lineage.py
+
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+LINEAGE_PATH = Path("data/processed/cluster_lineage.csv")
+LINEAGE_COLUMNS = ["cluster", "stable_id", "status", "parents", "previous_cluster", "jaccard",
+                   "centroid_similarity", "size", "version", "previous_version"]
+DEFAULT_OVERLAP_WEIGHT = 0.7   # share of the match score from Jaccard overlap; the rest from centroid similarity
+DEFAULT_MIN_JACCARD = 0.2      # a match needs this much member overlap...
+DEFAULT_MIN_SIMILARITY = 0.9   # ...or centroids this close (e.g. a cluster made of new posts only)
+DEFAULT_MIN_SHARE = 0.2        # a previous cluster is a parent if it supplies this share of the new one
+
+
+def cluster_centroids(embeddings, labels, chunk_size=50_000):
+    """(cluster ids, unit-length mean directions) for every non-noise cluster, in chunked passes."""
+    labels = np.asarray(labels)
+    cluster_ids = np.unique(labels[labels >= 0])
+    sums = np.zeros((len(cluster_ids), embeddings.shape[1]), dtype=np.float64)
+    for start in range(0, len(labels), chunk_size):
+        block_labels = labels[start:start + chunk_size]
+        keep = block_labels >= 0
+        block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)[keep]
+        block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        np.add.at(sums, np.searchsorted(cluster_ids, block_labels[keep]), block)
+    return cluster_ids, sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+def overlap_counts(previous, current):
+    """Members shared by each (previous cluster, current cluster) pair; both are id -> cluster Series."""
+    joined = pd.concat([previous.rename("previous"), current.rename("cluster")], axis=1, join="inner")
+    joined = joined[(joined["previous"] >= 0) & (joined["cluster"] >= 0)]
+    return joined.groupby(["previous", "cluster"]).size().rename("overlap").reset_index()
+
+
+def build_lineage(previous, current, previous_centroids, current_centroids, previous_stable, next_stable_id,
+                  overlap_weight=DEFAULT_OVERLAP_WEIGHT, min_jaccard=DEFAULT_MIN_JACCARD,
+                  min_similarity=DEFAULT_MIN_SIMILARITY, min_share=DEFAULT_MIN_SHARE):
+    """
+    Lineage rows for the current clusters.
+    previous / current: id -> cluster Series of the two fits.
+    *_centroids: (cluster ids, unit centroid matrix) from cluster_centroids.
+    previous_stable: {previous cluster: stable id}.
+    Clusters are paired one-to-one by an assignment solver over
+    overlap_weight * Jaccard + (1 - overlap_weight) * centroid cosine similarity.
+    Returns (DataFrame with LINEAGE_COLUMNS minus the versions, next unused stable id).
+    """
+    from scipy.optimize import linear_sum_assignment
+    prev_ids, prev_matrix = previous_centroids
+    cur_ids, cur_matrix = current_centroids
+    prev_pos = {c: i for i, c in enumerate(prev_ids)}
+    cur_pos = {c: i for i, c in enumerate(cur_ids)}
+
+    # Jaccard over the ids present in both fits, from sparse overlap counts
+    common = previous.index.intersection(current.index)
+    prev_sizes = previous.loc[common].value_counts()
+    cur_sizes = current.loc[common].value_counts()
+    pairs = overlap_counts(previous, current)
+    jaccard = np.zeros((len(prev_ids), len(cur_ids)))
+    share_of_current = np.zeros_like(jaccard)
+    share_of_previous = np.zeros_like(jaccard)
+    if len(pairs):
+        p = pairs["previous"].map(prev_pos).to_numpy()
+        c = pairs["cluster"].map(cur_pos).to_numpy()
+        inter = pairs["overlap"].to_numpy(dtype=np.float64)
+        p_size = pairs["previous"].map(prev_sizes).to_numpy(dtype=np.float64)
+        c_size = pairs["cluster"].map(cur_sizes).to_numpy(dtype=np.float64)
+        jaccard[p, c] = inter / (p_size + c_size - inter)
+        share_of_current[p, c] = inter / c_size
+        share_of_previous[p, c] = inter / p_size
+    similarity = prev_matrix @ cur_matrix.T if len(prev_ids) and len(cur_ids) else np.zeros_like(jaccard)
+
+    matched = {}
+    if len(prev_ids) and len(cur_ids):
+        score = overlap_weight * jaccard + (1 - overlap_weight) * np.clip(similarity, 0, 1)
+        rows, cols = linear_sum_assignment(-score)
+        for r, c in zip(rows, cols):
+            if jaccard[r, c] >= min_jaccard or similarity[r, c] >= min_similarity:
+                matched[c] = r
+
+    children = (share_of_previous >= min_share).sum(axis=1)
+    sizes = current.value_counts()
+    records = []
+    for c, cluster_id in enumerate(cur_ids):
+        parents = np.flatnonzero(share_of_current[:, c] >= min_share) if len(prev_ids) else np.array([], int)
+        r = matched.get(c)
+        if r is not None:
+            stable_id = previous_stable.get(prev_ids[r], prev_ids[r])
+            parents = np.union1d(parents, [r])
+            status = "merged" if len(parents) > 1 else "split" if children[r] > 1 else "continued"
+        else:
+            stable_id, next_stable_id = next_stable_id, next_stable_id + 1
+            status = "new" if len(parents) == 0 else "merged" if len(parents) > 1 else "split"
+        records.append({
+            "cluster": int(cluster_id),
+            "stable_id": int(stable_id),
+            "status": status,
+            "parents": " ".join(str(int(previous_stable.get(prev_ids[i], prev_ids[i]))) for i in parents),
+            "previous_cluster": int(prev_ids[r]) if r is not None else None,
+            "jaccard": round(float(jaccard[r, c]), 4) if r is not None else None,
+            "centroid_similarity": round(float(similarity[r, c]), 4) if r is not None else None,
+            "size": int(sizes.get(cluster_id, 0)),
+        })
+    return pd.DataFrame(records, columns=LINEAGE_COLUMNS[:-2]), next_stable_id
+
+
+def record_lineage(version_dir, ids, labels, embeddings, previous_dir=None, lineage_path=LINEAGE_PATH):
+    """
+    Save this fit's labels and centroids in its model version directory, match
+    them against the previous version's, and write the lineage table both there
+    and to lineage_path. Returns the lineage DataFrame.
+    """
+    version_dir = Path(version_dir)
+    current = pd.Series(np.asarray(labels), index=pd.Index(ids, name="id"), name="cluster")
+    centroids = cluster_centroids(embeddings, labels)
+    current.reset_index().to_parquet(version_dir / "labels.parquet", index=False)
+    np.savez(version_dir / "centroids.npz", cluster_ids=centroids[0], centroids=centroids[1])
+
+    previous_ok = previous_dir is not None and (Path(previous_dir) / "lineage.json").exists()
+    if previous_ok:
+        previous_dir = Path(previous_dir)
+        prev_labels = pd.read_parquet(previous_dir / "labels.parquet").set_index("id")["cluster"]
+        with np.load(previous_dir / "centroids.npz") as saved:
+            prev_centroids = (saved["cluster_ids"], saved["centroids"])
+        prev_lineage = pd.read_csv(previous_dir / "lineage.csv")
+        previous_stable = dict(zip(prev_lineage["cluster"], prev_lineage["stable_id"]))
+        next_stable_id = json.loads((previous_dir / "lineage.json").read_text())["next_stable_id"]
+        lineage, next_stable_id = build_lineage(prev_labels, current, prev_centroids, centroids,
+                                                previous_stable, next_stable_id)
+        retired = sorted(set(previous_stable.values()) - set(lineage["stable_id"]))
+    else:
+        # First fit with lineage: every cluster starts its own line
+        lineage = pd.DataFrame({"cluster": centroids[0].astype(int), "stable_id": centroids[0].astype(int),
+                                "status": "new", "parents": "", "previous_cluster": None, "jaccard": None,
+                                "centroid_similarity": None,
+                                "size": current[current >= 0].value_counts().reindex(centroids[0]).to_numpy()})
+        next_stable_id = int(centroids[0].max()) + 1 if len(centroids[0]) else 0
+        retired = []
+
+    lineage["version"] = version_dir.name
+    lineage["previous_version"] = previous_dir.name if previous_ok else None
+    lineage = lineage[LINEAGE_COLUMNS]
+    lineage.to_csv(version_dir / "lineage.csv", index=False)
+    (version_dir / "lineage.json").write_text(json.dumps({
+        "previous": previous_dir.name if previous_ok else None,
+        "next_stable_id": int(next_stable_id),
+        "retired_stable_ids": [int(s) for s in retired],
+    }, indent=2))
+    Path(lineage_path).parent.mkdir(parents=True, exist_ok=True)
+    lineage.to_csv(lineage_path, index=False)
+
+    counts = lineage["status"].value_counts()
+    print("Cluster lineage: " + ", ".join(f"{counts.get(s, 0)} {s}" for s in ("continued", "split", "merged", "new"))
+          + f", {len(retired)} retired -> {lineage_path}")
+    return lineage
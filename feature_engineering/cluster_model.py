@@ -0,0 +1,136 @@
+# Versioned UMAP + HDBSCAN artifacts, and the assign-new-posts entry point that uses them.
+# feature_engineering/cluster_model.py
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
+
+MODELS_DIR = Path("data/models/clustering")
+
+
+# --- Artifacts ---
+def save_model(reducer, clusterer, params, models_dir=MODELS_DIR):
+    """Save the fitted reducer and clusterer under a new timestamped version and mark it latest."""
+    import joblib
+    version = datetime.now().strftime("%Y%m%d_%H%M%S")
+    version_dir = Path(models_dir) / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(reducer, version_dir / "reducer.joblib")
+    joblib.dump(clusterer, version_dir / "clusterer.joblib")
+    meta = {
+        "version": version,
+        "params": params,
+        "n_clusters": int(clusterer.labels_.max() + 1),
+        "n_fit_points": int(len(clusterer.labels_)),
+    }
+    (version_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+    (Path(models_dir) / "LATEST").write_text(version)
+    print(f"Saved clustering model version {version} to {version_dir}")
+    return version
+
+def load_model(version="latest", models_dir=MODELS_DIR):
+    """Return (reducer, clusterer, meta) for a saved version."""
+    import joblib
+    models_dir = Path(models_dir)
+    if version == "latest":
+        latest = models_dir / "LATEST"
+        if not latest.exists():
+            raise FileNotFoundError(f"No saved clustering model in {models_dir}; run clustering first.")
+        version = latest.read_text().strip()
+    version_dir = models_dir / version
+    meta = json.loads((version_dir / "meta.json").read_text())
+    return joblib.load(version_dir / "reducer.joblib"), joblib.load(version_dir / "clusterer.joblib"), meta
+
+
+# --- Prediction ---
+def iter_assign(embeddings, reducer, clusterer, chunk_size=50_000, soft=True):
+    """
+    Project embeddings with the saved reducer and assign them to the saved clusters,
+    chunk_size rows at a time. Yields (start, projected, part) per chunk, where part
+    holds cluster, cluster_prob, outlier_score and, if soft is set, the soft
+    (membership-vector) cluster and probability. embeddings may be memory-mapped.
+    """
+    import hdbscan
+    for start in range(0, len(embeddings), chunk_size):
+        block = np.asarray(embeddings[start:start + chunk_size])
+        with hotspot("umap_transform", docs=len(block)):
+            projected = reducer.transform(block)
+        with hotspot("hdbscan_predict", docs=len(block)):
+            labels, probs = hdbscan.approximate_predict(clusterer, projected)
+            outlier = hdbscan.approximate_predict_scores(clusterer, projected)
+        part = pd.DataFrame({"cluster": labels, "cluster_prob": probs, "outlier_score": outlier})
+        if soft and clusterer.labels_.max() >= 0:
+            membership = np.atleast_2d(hdbscan.membership_vector(clusterer, projected))
+            part["soft_cluster"] = membership.argmax(axis=1)
+            part["soft_prob"] = membership.max(axis=1)
+        yield start, projected, part
+
+def assign(embeddings, reducer, clusterer, chunk_size=50_000):
+    """Return iter_assign's chunks as one DataFrame."""
+    parts = [part for _, _, part in iter_assign(embeddings, reducer, clusterer, chunk_size)]
+    if not parts:
+        return pd.DataFrame(columns=["cluster", "cluster_prob", "outlier_score", "soft_cluster", "soft_prob"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign new posts to the saved UMAP + HDBSCAN clusters")
+    parser.add_argument("--input", type=str, required=True, help="JSONL of new posts")
+    parser.add_argument("--version", type=str, default="latest", help="Saved model version")
+    parser.add_argument("--output", type=str, default="data/processed/cluster_predictions.csv")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Rows per transform/predict call")
+    parser.add_argument("--workers", type=int, default=None, help="Encoder processes for new posts")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("cluster_model", args.profile) as run:
+        from feature_engineering.embedding_store import EmbeddingStore, embedding_text_hash
+        from feature_engineering.encoding_engine import encode
+
+        start = time.perf_counter()
+        df = pd.read_json(args.input, lines=True)
+        df["text"] = df["title"].fillna("") + " " + df["selftext"].fillna("")
+
+        # Skip posts that already have an assignment in the output file
+        output_path = Path(args.output)
+        previous = pd.read_csv(output_path) if output_path.exists() else None
+        if previous is not None:
+            df = df[~df["id"].isin(previous["id"])]
+        print(f"{len(df)} new posts to assign.")
+        run.rows(rows_in=len(df), rows_out=0)
+        if df.empty:
+            return
+
+        # Embed only posts the store has not seen
+        ids, texts = df["id"].tolist(), df["text"].tolist()
+        hashes = [embedding_text_hash(t) for t in texts]
+        store = EmbeddingStore()
+        todo = store.missing(ids, hashes)
+        if todo:
+            print(f"Encoding {len(todo)} posts...")
+            with hotspot("encode", docs=len(todo)):
+                vectors = encode([texts[i] for i in todo], workers=args.workers)
+            store.append([ids[i] for i in todo], [hashes[i] for i in todo], vectors)
+        embeddings = store.materialize(ids, Path("data/processed/new_embeddings.npy"))
+
+        reducer, clusterer, meta = load_model(args.version)
+        print(f"Assigning with model version {meta['version']} ({meta['n_clusters']} clusters)...")
+        assigned = assign(embeddings, reducer, clusterer, args.chunk_size)
+        assigned.insert(0, "id", ids)
+        assigned["model_version"] = meta["version"]
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        assigned.to_csv(output_path, mode="a" if previous is not None else "w",
+                        header=previous is None, index=False)
+        run.rows(rows_out=len(assigned))
+        elapsed = time.perf_counter() - start
+        print(f"Assigned {len(assigned)} posts in {elapsed:.1f}s "
+              f"({(assigned['cluster'] == -1).mean():.1%} noise) -> {output_path}")
+
+if __name__ == "__main__":
+    main()
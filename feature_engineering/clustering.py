@@ -1,52 +1,131 @@
 import numpy as np
 import pandas as pd
 from pathlib import Path
-import umap
-import hdbscan
 import os
+import argparse
+from feature_engineering.knn_graph import DEFAULT_K, load_or_build_knn, precomputed_knn
+from feature_engineering.cluster_model import MODELS_DIR, save_model
+from feature_engineering.cluster_lineage import record_lineage
+from feature_engineering.quantized_embeddings import STORAGE_TYPES, open_embeddings
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
 
-def main():
-    # Set up paths
-    embeddings_path = Path("data/processed/embeddings.npy")
-    ids_path = Path("data/processed/embedding_ids.csv")
-    umap_out_path = Path("data/processed/embeddings_umap.npy")
-    cluster_out_path = Path("data/processed/cluster_labels.csv")
-
-    # Check if input files exist
-    if not embeddings_path.exists() or not ids_path.exists():
-        print(f"Missing files! Ensure {embeddings_path} and {ids_path} exist.")
-        return
+def fit_umap_hdbscan(embeddings_path, n_neighbors=15, min_dist=0.1, n_components=2, knn_k=DEFAULT_K,
+                     min_cluster_size=2, min_samples=None, cluster_selection_method="eom"):
+    """
+    Fit UMAP and HDBSCAN on every row of the .npy at embeddings_path.
+    Returns (reducer, clusterer, embeddings_2d, n_neighbors actually used).
+    """
+    import hdbscan
+    import umap
+    embeddings = np.load(embeddings_path, mmap_mode="r")  # UMAP takes its own copy; don't hold a second one
 
-    # Load data
-    embeddings = np.load(embeddings_path)
-    ids_df = pd.read_csv(ids_path)
-
-    print(f"Loaded {len(embeddings)} embeddings.")
+    # Nearest-neighbour graph, cached per embeddings content / k / metric
+    n_neighbors = min(n_neighbors, len(embeddings)-1)
+    with hotspot("knn_graph", docs=len(embeddings)):
+        knn_indices, knn_dists, knn_index = load_or_build_knn(
+            embeddings_path, max(knn_k, n_neighbors), metric='cosine', with_index=True
+        )
 
     # Dimensionality reduction with UMAP
     print("Performing dimensionality reduction with UMAP...")
-    reducer = umap.UMAP(n_neighbors=min(15, len(embeddings)-1), min_dist=0.1, metric='cosine', random_state=42)
-    embeddings_2d = reducer.fit_transform(embeddings)
-    np.save(umap_out_path, embeddings_2d)  # Saving the UMAP output
-    print(f"Saved UMAP embeddings to {umap_out_path}")
+    reducer = umap.UMAP(
+        n_neighbors=n_neighbors, min_dist=min_dist, n_components=n_components,
+        metric='cosine', random_state=42,
+        precomputed_knn=precomputed_knn(knn_indices, knn_dists, n_neighbors, knn_index),
+    )
+    with hotspot("umap_fit", docs=len(embeddings)):
+        embeddings_2d = reducer.fit_transform(embeddings)
 
     # Clustering with HDBSCAN
     print("Clustering with HDBSCAN...")
-    clusterer = hdbscan.HDBSCAN(min_cluster_size=2, prediction_data=True)
-    cluster_labels = clusterer.fit_predict(embeddings_2d)
-    probs = clusterer.probabilities_
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size, min_samples=min_samples,
+        cluster_selection_method=cluster_selection_method, prediction_data=True,
+    )
+    with hotspot("hdbscan_fit", docs=len(embeddings_2d)):
+        clusterer.fit(embeddings_2d)
+    return reducer, clusterer, embeddings_2d, n_neighbors
+
+def main():
+    parser = argparse.ArgumentParser(description="UMAP + HDBSCAN clustering over post embeddings")
+    parser.add_argument("--n-neighbors", type=int, default=15, help="UMAP n_neighbors")
+    parser.add_argument("--min-dist", type=float, default=0.1, help="UMAP min_dist")
+    parser.add_argument("--n-components", type=int, default=2, help="UMAP output dimensions")
+    parser.add_argument("--knn-k", type=int, default=DEFAULT_K, help="Neighbours kept in the cached kNN graph")
+    parser.add_argument("--min-cluster-size", type=int, default=2, help="HDBSCAN min_cluster_size (see hdbscan_sweep)")
+    parser.add_argument("--min-samples", type=int, default=None, help="HDBSCAN min_samples (default: min_cluster_size)")
+    parser.add_argument("--cluster-selection-method", choices=["eom", "leaf"], default="eom")
+    parser.add_argument("--sample-size", type=int, default=None,
+                        help="Fit on a stratified sample of this many rows and assign the rest out of core")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Rows per projection chunk in sample mode")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="float32",
+                        help="Embeddings read for sampling, streaming assignment and lineage (see quantized_embeddings)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("clustering", args.profile) as run:
+        # Set up paths
+        embeddings_path = Path("data/processed/embeddings.npy")
+        ids_path = Path("data/processed/embedding_ids.csv")
+        umap_out_path = Path("data/processed/embeddings_umap.npy")
+        cluster_out_path = Path("data/processed/cluster_labels.csv")
+
+        # Check if input files exist
+        if not embeddings_path.exists() or not ids_path.exists():
+            print(f"Missing files! Ensure {embeddings_path} and {ids_path} exist.")
+            return
+
+        # Load data (memory-mapped: sample mode never holds the full matrix)
+        embeddings = open_embeddings(embeddings_path, args.storage)
+        ids_df = pd.read_csv(ids_path)
+
+        print(f"Loaded {len(embeddings)} embeddings.")
+        fit_params = dict(
+            n_neighbors=args.n_neighbors, min_dist=args.min_dist, n_components=args.n_components, knn_k=args.knn_k,
+            min_cluster_size=args.min_cluster_size, min_samples=args.min_samples,
+            cluster_selection_method=args.cluster_selection_method,
+        )
+
+        if args.sample_size and args.sample_size < len(embeddings):
+            from feature_engineering.sampled_clustering import fit_on_sample, stream_labels
+            reducer, clusterer, n_neighbors = fit_on_sample(embeddings, args.sample_size, **fit_params)
+            stream_labels(embeddings, ids_df["id"], reducer, clusterer, cluster_out_path, umap_out_path, args.chunk_size)
+            cluster_labels = pd.read_csv(cluster_out_path, usecols=["cluster"])["cluster"].to_numpy()
+        else:
+            reducer, clusterer, embeddings_2d, n_neighbors = fit_umap_hdbscan(embeddings_path, **fit_params)
+            np.save(umap_out_path, embeddings_2d)  # Saving the UMAP output
+            print(f"Saved UMAP embeddings to {umap_out_path}")
+
+            cluster_labels = clusterer.labels_
+
+            # Add to DataFrame
+            ids_df["cluster"] = cluster_labels
+            ids_df["cluster_prob"] = clusterer.probabilities_
+            ids_df["outlier_score"] = clusterer.outlier_scores_
+
+            # Save to disk
+            ids_df.to_csv(cluster_out_path, index=False)
 
-    # Add to DataFrame
-    ids_df["cluster"] = cluster_labels
-    ids_df["cluster_prob"] = probs
+        # Print number of clusters
+        unique_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
+        print(f"HDBSCAN found {unique_clusters} cluster(s)")
+        run.rows(rows_in=len(embeddings), rows_out=len(cluster_labels))
+        run.extra["n_clusters"] = unique_clusters
+        print(f"Cluster labels saved to {cluster_out_path}")
 
-    # Print number of clusters
-    unique_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-    print(f"HDBSCAN found {unique_clusters} cluster(s)")
+        # Save the fitted reducer and clusterer so new posts can be assigned without a refit
+        latest = MODELS_DIR / "LATEST"
+        previous_version = latest.read_text().strip() if latest.exists() else None
+        version = save_model(reducer, clusterer, params={
+            "n_neighbors": n_neighbors, "min_dist": args.min_dist, "n_components": args.n_components,
+            "metric": "cosine", "min_cluster_size": args.min_cluster_size, "min_samples": args.min_samples,
+            "cluster_selection_method": args.cluster_selection_method, "sample_size": args.sample_size,
+        })
 
-    # Save to disk
-    ids_df.to_csv(cluster_out_path, index=False)
-    print(f"Cluster labels saved to {cluster_out_path}")
+        # Match the new clusters to the previous fit's so stable ids and labels carry forward
+        with hotspot("cluster_lineage", docs=len(cluster_labels)):
+            record_lineage(MODELS_DIR / version, ids_df["id"], cluster_labels, embeddings,
+                           previous_dir=MODELS_DIR / previous_version if previous_version else None)
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,77 @@
 import pandas as pd
 import numpy as np
 import json
+import argparse
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+from feature_engineering.embedding_store import EmbeddingStore, embedding_text_hash
+from feature_engineering.encoding_engine import DEFAULT_MODEL, encode
+from feature_engineering.quantized_embeddings import STORAGE_TYPES, write_quantized
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
 
 def main():
-    # --- Paths ---
-    processed_dir = Path("data/processed")
-    input_file = Path("data/raw/OffMyChest_posts_20250418_123424.jsonl")
-    print(f"Using input file: {input_file.name}")
-
-    # --- Load full JSONL post data ---
-    records = []
-    with open(input_file, "r", encoding="utf-8") as f:
-        for line in f:
-            post = json.loads(line)
-            post["text"] = f"{post['title']} {post['selftext']}"
-            records.append(post)
-
-    df = pd.DataFrame(records)
-
-    if "text" not in df.columns:
-        raise ValueError("Expected a 'text' column in the parsed JSONL.")
-
-    texts = df["text"].tolist()
-    ids = df["id"].tolist()
-
-    # --- Load model ---
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("Sentence-BERT model loaded.")
-
-    # --- Generate embeddings ---
-    print(f"Encoding {len(texts)} posts...")
-    embeddings = model.encode(texts, show_progress_bar=True)
-
-    # --- Save outputs ---
-    processed_dir.mkdir(parents=True, exist_ok=True)
-    np.save(processed_dir / "embeddings.npy", embeddings)
-    df[["id", "title", "selftext"]].to_csv(processed_dir / "reddit_with_umap.csv", index=False)
-
-    print("Saved embeddings to embeddings.npy")
-    print("Saved post metadata to reddit_with_umap.csv")
+    parser = argparse.ArgumentParser(description="Embed Reddit posts with Sentence-BERT")
+    parser.add_argument("--input", type=str, default="data/raw/OffMyChest_posts_20250418_123424.jsonl",
+                        help="Path to input JSONL")
+    parser.add_argument("--workers", type=int, default=None, help="Encoder processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per length-bucketed batch")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch", help="Encoder backend")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="float32",
+                        help="Also write a quantized, memory-mappable copy of embeddings.npy (float16 or int8)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("embed_signals", args.profile) as run:
+        # --- Paths ---
+        processed_dir = Path("data/processed")
+        input_file = Path(args.input)
+        print(f"Using input file: {input_file.name}")
+
+        # --- Load full JSONL post data ---
+        records = []
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                post = json.loads(line)
+                post["text"] = f"{post['title']} {post['selftext']}"
+                records.append(post)
+
+        df = pd.DataFrame(records)
+
+        if "text" not in df.columns:
+            raise ValueError("Expected a 'text' column in the parsed JSONL.")
+
+        texts = df["text"].tolist()
+        ids = df["id"].tolist()
+        hashes = [embedding_text_hash(t) for t in texts]
+
+        # --- Find posts not yet in the store (new ids or changed text) ---
+        store = EmbeddingStore(processed_dir / "embedding_store")
+        todo = store.missing(ids, hashes)
+        print(f"{len(ids) - len(todo)} posts already embedded, {len(todo)} to encode.")
+
+        if todo:
+            # --- Generate embeddings for missing posts only ---
+            print(f"Encoding {len(todo)} posts with {DEFAULT_MODEL} ({args.backend})...")
+            with hotspot("encode", docs=len(todo)):
+                embeddings = encode([texts[i] for i in todo], batch_size=args.batch_size,
+                                    workers=args.workers, backend=args.backend)
+            store.append([ids[i] for i in todo], [hashes[i] for i in todo], embeddings)
+
+        # --- Save outputs ---
+        processed_dir.mkdir(parents=True, exist_ok=True)
+        with hotspot("materialize", docs=len(ids)):
+            embeddings = store.materialize(ids, processed_dir / "embeddings.npy")
+        df[["id"]].to_csv(processed_dir / "embedding_ids.csv", index=False)
+        df[["id", "title", "selftext"]].to_csv(processed_dir / "reddit_with_umap.csv", index=False)
+
+        print(f"Saved embeddings to embeddings.npy {embeddings.shape}")
+        if args.storage != "float32":
+            with hotspot("quantize", docs=len(ids)):
+                quantized = write_quantized(processed_dir / "embeddings.npy", args.storage)
+            print(f"Saved {args.storage} embeddings ({quantized.nbytes / 2**20:,.1f} MiB)")
+        print("Saved embedding ids to embedding_ids.csv")
+        print("Saved post metadata to reddit_with_umap.csv")
+        run.rows(rows_in=len(df), rows_out=len(ids))
+        run.extra["encoded"] = len(todo)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,156 @@
+# Append-only embedding store - vectors sharded on disk, indexed by post id and text hash.
+# feature_engineering/embedding_store.py
+
+import argparse
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+DEFAULT_STORE_DIR = Path("data/processed/embedding_store")
+INDEX_COLUMNS = ["id", "text_hash", "shard", "row"]
+
+
+def embedding_text_hash(text):
+    """Hash of the exact text that was encoded (no normalization: the encoder is case-sensitive)."""
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Embeddings kept as numbered shard_*.npy files plus an index.parquet mapping
+    each post id to (text_hash, shard, row). New vectors are written as a new
+    shard; a changed post's index entry is repointed and its old row is left
+    behind until compact() rewrites the live rows.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / "index.parquet"
+        if self.index_path.exists():
+            self.index = pd.read_parquet(self.index_path)
+        else:
+            self.index = pd.DataFrame({col: pd.Series(dtype="int64" if col in ("shard", "row") else "object")
+                                       for col in INDEX_COLUMNS})
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def dim(self):
+        if self.index.empty:
+            return None
+        return self._shard(int(self.index["shard"].iloc[0])).shape[1]
+
+    def _shard_path(self, shard):
+        return self.root / f"shard_{shard:05d}.npy"
+
+    def _shard(self, shard):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(self._shard_path(shard), mmap_mode="r")
+        return self._shards[shard]
+
+    def _next_shard(self):
+        existing = [int(p.stem.split("_")[1]) for p in self.root.glob("shard_*.npy")]
+        return max(existing, default=-1) + 1
+
+    def _save_index(self):
+        tmp = self.index_path.with_suffix(".parquet.tmp")
+        self.index.to_parquet(tmp, index=False)
+        tmp.replace(self.index_path)
+
+    # --- Lookup ---
+    def missing(self, ids, text_hashes):
+        """Return positions of (id, hash) pairs that are absent or whose text changed."""
+        known = dict(zip(self.index["id"], self.index["text_hash"]))
+        return [i for i, (pid, h) in enumerate(zip(ids, text_hashes)) if known.get(pid) != h]
+
+    def materialize(self, ids, out_path, chunk_size=50_000):
+        """
+        Write the vectors for ids, in that order, to an .npy at out_path and
+        return it memory-mapped read-only. Rows are gathered shard by shard in
+        chunks, so only chunk_size vectors are held in memory at a time.
+        """
+        locations = self.index.set_index("id").reindex(pd.Index(ids))
+        if locations["shard"].isna().any():
+            absent = locations.index[locations["shard"].isna()][:5].tolist()
+            raise KeyError(f"{locations['shard'].isna().sum()} ids not in embedding store, e.g. {absent}")
+        shards = locations["shard"].to_numpy(dtype=np.int64)
+        rows = locations["row"].to_numpy(dtype=np.int64)
+
+        # Write to a temp file and swap it in, so readers holding the old file are unaffected
+        out_path = Path(out_path)
+        tmp_path = out_path.with_name(out_path.name + ".tmp")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(ids), self.dim or 0))
+        for start in range(0, len(ids), chunk_size):
+            stop = min(start + chunk_size, len(ids))
+            for shard in np.unique(shards[start:stop]):
+                mask = shards[start:stop] == shard
+                out[start:stop][mask] = self._shard(int(shard))[rows[start:stop][mask]]
+        out.flush()
+        del out
+        tmp_path.replace(out_path)
+        return np.load(out_path, mmap_mode="r")
+
+    # --- Mutation ---
+    def append(self, ids, text_hashes, vectors):
+        """Write vectors as a new shard and point their ids at it."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(ids) == 0:
+            return
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim {vectors.shape[1]} does not match store dim {self.dim}.")
+        self.root.mkdir(parents=True, exist_ok=True)
+        shard = self._next_shard()
+        np.save(self._shard_path(shard), vectors)
+
+        new_rows = pd.DataFrame({"id": list(ids), "text_hash": list(text_hashes),
+                                 "shard": shard, "row": np.arange(len(ids))})
+        new_rows = new_rows.drop_duplicates("id", keep="last")
+        self.index = pd.concat([self.index[~self.index["id"].isin(new_rows["id"])], new_rows],
+                               ignore_index=True)
+        self._save_index()
+
+    def compact(self, shard_size=500_000):
+        """Rewrite live rows into fresh shards of shard_size and delete everything superseded."""
+        if self.index.empty:
+            return
+        old_paths = sorted(self.root.glob("shard_*.npy"))
+        first_new = self._next_shard()
+        index = self.index.sort_values(["shard", "row"]).reset_index(drop=True)
+        dim = self.dim
+
+        new_index = []
+        for n, start in enumerate(range(0, len(index), shard_size)):
+            part = index.iloc[start:start + shard_size]
+            block = np.empty((len(part), dim), dtype=np.float32)
+            for shard, rows in part.groupby("shard")["row"]:
+                block[(part["shard"] == shard).to_numpy()] = self._shard(int(shard))[rows.to_numpy()]
+            np.save(self._shard_path(first_new + n), block)
+            new_index.append(part.assign(shard=first_new + n, row=np.arange(len(part))))
+
+        self.index = pd.concat(new_index, ignore_index=True)
+        self._save_index()
+        self._shards = {}
+        for path in old_paths:
+            path.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the incremental embedding store")
+    parser.add_argument("command", choices=["compact", "stats"])
+    parser.add_argument("--store", type=str, default=str(DEFAULT_STORE_DIR), help="Store directory")
+    parser.add_argument("--shard-size", type=int, default=500_000, help="Rows per shard after compaction")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.store)
+    shards_before = len(list(store.root.glob("shard_*.npy")))
+    if args.command == "compact":
+        store.compact(args.shard_size)
+        print(f"Compacted {shards_before} shard(s) into {len(list(store.root.glob('shard_*.npy')))}")
+    total_rows = sum(np.load(p, mmap_mode="r").shape[0] for p in store.root.glob("shard_*.npy"))
+    print(f"Embedding store {store.root}: {len(store)} live ids, {total_rows} stored rows, dim={store.dim}")
+
+if __name__ == "__main__":
+    main()
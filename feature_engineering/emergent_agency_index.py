@@ -1,7 +1,37 @@
 import pandas as pd
 import numpy as np
-import re
-from textblob import TextBlob
+from feature_engineering.feature_registry import FeatureExtractor, feature_frame, register
+from feature_engineering.lexicon import LEXICONS
+
+# Aggregate Emergent Agency Index weights
+EAI_WEIGHTS = {
+    'narrative_self_reference': 0.3,
+    'ethical_reflection': 0.25,
+    'individual_voice_divergence': 0.25,
+    'existential_awareness': 0.2,
+}
+
+
+@register
+class EmergentAgencyFeatures(FeatureExtractor):
+    name = 'eai'
+    columns = (*EAI_WEIGHTS, 'emergent_agency_index')
+    requires = ('word_counts', 'lexicon', 'sentiment')
+
+    def compute(self, batch):
+        lexicon, sentiment = batch['lexicon'], batch['sentiment']
+        components = np.column_stack([
+            # Narrative Self-Reference Score
+            lexicon['first_person'] / np.maximum(batch['word_counts'], 1),
+            # Ethical Reflection Score
+            lexicon['ethical_keywords'] / len(LEXICONS['ethical_keywords']['terms']),
+            # Individual Voice Divergence (using sentiment complexity as a proxy)
+            np.abs(sentiment[:, 0] * sentiment[:, 1]),
+            # Existential Awareness Score
+            lexicon['existential_keywords'] / len(LEXICONS['existential_keywords']['terms']),
+        ])
+        return np.column_stack([components, components @ np.array(list(EAI_WEIGHTS.values()))])
+
 
 def compute_emergent_agency_index(texts):
     '''
@@ -11,49 +41,7 @@ def compute_emergent_agency_index(texts):
     Returns:
         DataFrame: A DataFrame with calculated EAI components and overall score.
     '''
-
-    data = {
-        'text': [],
-        'narrative_self_reference': [],
-        'ethical_reflection': [],
-        'individual_voice_divergence': [],
-        'existential_awareness': [],
-        'emergent_agency_index': []
-    }
-
-    for text in texts:
-        # Normalize
-        clean_text = text.lower()
-
-        # Narrative Self-Reference Score
-        first_person_score = len(re.findall(r'\b(i|my|me|mine)\b', clean_text)) / max(len(clean_text.split()), 1)
-
-        # Ethical Reflection Score
-        ethical_keywords = ['right thing', 'wrong', 'should have', 'regret', 'guilt', 'responsible', 'consequence']
-        ethical_score = sum(1 for word in ethical_keywords if word in clean_text) / len(ethical_keywords)
-
-        # Individual Voice Divergence (using sentiment complexity as a proxy)
-        sentiment = TextBlob(clean_text).sentiment
-        sentiment_complexity = abs(sentiment.polarity * sentiment.subjectivity)
-
-        # Existential Awareness Score
-        existential_keywords = ['meaning', 'existence', 'purpose', 'death', 'irrelevant', 'ghost', 'identity']
-        existential_score = sum(1 for word in existential_keywords if word in clean_text) / len(existential_keywords)
-
-        # Aggregate Emergent Agency Index (weighted)
-        eai = (
-            0.3 * first_person_score +
-            0.25 * ethical_score +
-            0.25 * sentiment_complexity +
-            0.2 * existential_score
-        )
-
-        data['text'].append(text)
-        data['narrative_self_reference'].append(first_person_score)
-        data['ethical_reflection'].append(ethical_score)
-        data['individual_voice_divergence'].append(sentiment_complexity)
-        data['existential_awareness'].append(existential_score)
-        data['emergent_agency_index'].append(eai)
-
-    return pd.DataFrame(data)
-
+    texts = list(texts)
+    frame = feature_frame(texts, ['eai'])
+    frame.insert(0, 'text', texts)
+    return frame
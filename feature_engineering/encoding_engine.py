@@ -0,0 +1,119 @@
+# CPU encoding engine - length-bucketed batches fanned out to a pool of encoder processes.
+# feature_engineering/encoding_engine.py
+
+import argparse
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# --- Worker side: one model per process, loaded by the pool initializer ---
+_worker_model = None
+
+def load_model(model_name=DEFAULT_MODEL, backend="torch", threads=None):
+    """Load a SentenceTransformer on CPU, with the ONNX Runtime backend if requested."""
+    from sentence_transformers import SentenceTransformer
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx")
+    return SentenceTransformer(model_name, device="cpu")
+
+def _init_worker(model_name, backend, threads):
+    global _worker_model
+    _worker_model = load_model(model_name, backend, threads)
+
+def _encode_batch(positions, texts):
+    return positions, _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+# --- Bucketing ---
+def length_buckets(texts, batch_size):
+    """
+    Sort texts by approximate token length and cut the order into batches,
+    so each batch pads to a similar length. Returns lists of positions,
+    longest batches first so the pool finishes with short work.
+    """
+    lengths = np.fromiter((len(t.split()) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(lengths, kind="stable")
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    return batches[::-1]
+
+def encode(texts, model_name=DEFAULT_MODEL, batch_size=64, workers=None, backend="torch", sort=True):
+    """
+    Encode texts on CPU and return a float32 matrix in the original order.
+    Parameters:
+        texts (list of str): Texts to encode.
+        batch_size (int): Texts per encoder call.
+        workers (int): Encoder processes; 1 encodes in this process.
+        backend (str): "torch" or "onnx".
+        sort (bool): Bucket by length; False keeps input order (baseline).
+    Returns:
+        ndarray: (len(texts), dim) embeddings.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if sort:
+        batches = length_buckets(texts, batch_size)
+    else:
+        batches = [np.arange(i, min(i + batch_size, len(texts))) for i in range(0, len(texts), batch_size)]
+
+    out = None
+    def place(positions, vectors):
+        nonlocal out
+        if out is None:
+            out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        out[positions] = vectors
+
+    if workers == 1:
+        model = load_model(model_name, backend, threads)
+        for positions in batches:
+            place(positions, model.encode([texts[i] for i in positions], batch_size=len(positions)))
+        return out
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_name, backend, threads)) as pool:
+        futures = [pool.submit(_encode_batch, positions, [texts[i] for i in positions]) for positions in batches]
+        for future in futures:
+            place(*future.result())
+    return out
+
+# --- Benchmark ---
+def benchmark(texts, configs, model_name=DEFAULT_MODEL):
+    """Time encode() for each config dict and return rows with posts/sec."""
+    results = []
+    for config in configs:
+        start = time.perf_counter()
+        encode(texts, model_name=model_name, **config)
+        elapsed = time.perf_counter() - start
+        results.append({**config, "seconds": round(elapsed, 2), "posts_per_sec": round(len(texts) / elapsed, 1)})
+        print(f"{config}: {results[-1]['posts_per_sec']} posts/sec")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU encoding configurations")
+    parser.add_argument("--input", type=str, required=True, help="Cleaned CSV with a 'text' column")
+    parser.add_argument("--docs", type=int, default=5000, help="Number of posts to encode per configuration")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--onnx", action="store_true", help="Also benchmark the ONNX Runtime backend")
+    args = parser.parse_args()
+
+    import pandas as pd
+    texts = pd.read_csv(args.input)["text"].fillna("").astype(str).tolist()[:args.docs]
+
+    configs = [{"workers": 1, "batch_size": args.batch_size, "sort": False}]
+    backends = ["torch", "onnx"] if args.onnx else ["torch"]
+    configs += [{"workers": w, "batch_size": args.batch_size, "backend": b, "sort": True}
+                for b in backends for w in args.workers]
+
+    results = benchmark(texts, configs)
+    print(pd.DataFrame(results).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
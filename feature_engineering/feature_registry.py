@@ -0,0 +1,185 @@
+# Feature extractor registry - psych, projection and EAI features declared against shared per-batch
+# intermediates (lowercased text, tokens, sentences, sentiment), each computed once per batch for all of them.
+# feature_engineering/feature_registry.py
+
+import importlib
+import numpy as np
+from utils.instrumentation import hotspot
+from utils.lazy import shared
+
+DEFAULT_BATCH_SIZE = 10_000
+# Modules whose extractors (and extractor-specific intermediates) register themselves on import
+BUILTIN_MODULES = (
+    "feature_engineering.psych_signals",
+    "feature_engineering.projection_signals",
+    "feature_engineering.emergent_agency_index",
+    "feature_engineering.sentence_engine",
+)
+
+INTERMEDIATES = {}  # name -> (required intermediate names, compute(batch))
+EXTRACTORS = {}     # name -> FeatureExtractor, in registration order
+
+
+def intermediate(name, requires=()):
+    """Register compute(batch) as the producer of a named per-batch intermediate."""
+    def register_intermediate(compute):
+        INTERMEDIATES[name] = (tuple(requires), compute)
+        return compute
+    return register_intermediate
+
+def register(cls):
+    """Class decorator: register one instance of a FeatureExtractor subclass under cls.name."""
+    EXTRACTORS[cls.name] = cls()
+    return cls
+
+
+class Batch:
+    """
+    A batch of texts and the intermediates computed for it so far. batch[name]
+    computes an intermediate on first access, after the ones it requires, and
+    keeps it for every later extractor. options are settings read by some
+    intermediates (roberta_batch_size, threads, sentence_store).
+    """
+
+    def __init__(self, texts, **options):
+        self.texts = [t if isinstance(t, str) else "" for t in texts]
+        self.options = options
+        self._values = {}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            _load_builtins()
+            requires, compute = INTERMEDIATES[name]
+            for required in requires:
+                self[required]
+            with hotspot(name, docs=len(self.texts)):
+                self._values[name] = compute(self)
+        return self._values[name]
+
+    def computed(self):
+        """Names of the intermediates computed so far, in the order they were computed."""
+        return list(self._values)
+
+
+class FeatureExtractor:
+    """
+    A named group of feature columns. Subclasses set name, columns (plus
+    int_columns, the count-valued ones), requires (intermediate names) and
+    implement compute(batch) -> array of shape (len(batch), len(columns)).
+    parallel=False keeps an extractor out of the process pool (e.g. one that
+    threads internally).
+    """
+    name = None
+    columns = ()
+    int_columns = ()
+    requires = ()
+    parallel = True
+
+    def compute(self, batch):
+        raise NotImplementedError
+
+    def batch(self, texts, intermediates=None):
+        """Feature matrix for texts; pass a Batch of the same texts to share its intermediates."""
+        intermediates = Batch(texts) if intermediates is None else intermediates
+        values = np.asarray(self.compute(intermediates), dtype=np.float64)
+        return values.reshape(len(intermediates), len(self.columns))
+
+
+# --- Shared intermediates ---
+@shared
+def word_tokenizer():
+    from nltk import word_tokenize  # NLTK is slow to import, so it loads on first use
+    return word_tokenize
+
+@intermediate("lower")
+def _lower(batch):
+    return [text.lower() for text in batch.texts]
+
+@intermediate("word_counts")
+def _word_counts(batch):
+    return np.array([len(text.split()) for text in batch.texts], dtype=np.int64)
+
+@intermediate("tokens", requires=("lower",))
+def _tokens(batch):
+    tokenize = word_tokenizer()
+    return [tokenize(text) for text in batch["lower"]]
+
+@intermediate("lexicon")
+def _lexicon(batch):
+    """{lexicon category: counts array} from one pass of the shared lexicon engine."""
+    from feature_engineering.lexicon import get_engine
+    engine = get_engine()
+    return dict(zip(engine.columns, engine.count_matrix(batch.texts).T))
+
+@intermediate("sentiment")
+def _sentiment(batch):
+    """(n, 2) polarity and subjectivity of each whole text, through the shared sentiment cache."""
+    from feature_engineering.sentiment_cache import get_cache
+    return np.array(get_cache().sentiment_many(batch.texts), dtype=np.float64).reshape(len(batch), 2)
+
+
+# --- Planner ---
+def _load_builtins():
+    for module in BUILTIN_MODULES:
+        importlib.import_module(module)
+
+def get_extractor(name):
+    _load_builtins()
+    if name not in EXTRACTORS:
+        raise KeyError(f"Unknown feature extractor {name!r}; registered: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]
+
+def plan(names=None):
+    """The extractors for names (every registered one if None) and the intermediates they need, dependencies first."""
+    _load_builtins()
+    extractors = [get_extractor(name) for name in (names or list(EXTRACTORS))]
+    order = []
+
+    def visit(name):
+        if name not in order:
+            for required in INTERMEDIATES[name][0]:
+                visit(required)
+            order.append(name)
+
+    for extractor in extractors:
+        for name in extractor.requires:
+            visit(name)
+    return extractors, order
+
+def extract_features(texts, names=None, batch_size=DEFAULT_BATCH_SIZE, workers=1, **options):
+    """
+    One aligned (len(texts), n_columns) float matrix of the named extractors'
+    features, and its column names. Texts go through in batches; within a batch
+    each intermediate is computed once and shared by every extractor. workers
+    other than 1 (None: all cores) runs the batches on a process pool.
+    """
+    if workers != 1:
+        from feature_engineering.parallel_features import extract_parallel
+        return extract_parallel(texts, names, workers=workers, batch_size=batch_size, **options)
+    extractors, order = plan(names)
+    columns = [column for extractor in extractors for column in extractor.columns]
+    texts = list(texts)
+    matrix = np.empty((len(texts), len(columns)), dtype=np.float64)
+    for start in range(0, len(texts), batch_size):
+        batch = Batch(texts[start:start + batch_size], **options)
+        for name in order:
+            batch[name]
+        column = 0
+        for extractor in extractors:
+            width = len(extractor.columns)
+            matrix[start:start + len(batch), column:column + width] = extractor.batch(batch.texts, batch)
+            column += width
+    return matrix, columns
+
+def feature_frame(texts, names=None, **kwargs):
+    """extract_features as a DataFrame, with count columns as integers."""
+    import pandas as pd
+    matrix, columns = extract_features(texts, names, **kwargs)
+    frame = pd.DataFrame(matrix, columns=columns)
+    extractors, _ = plan(names)
+    for column in (c for extractor in extractors for c in extractor.int_columns):
+        frame[column] = frame[column].astype(np.int64)
+    return frame
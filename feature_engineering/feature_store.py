@@ -0,0 +1,198 @@
+# Columnar feature store - scalar signals in Parquet, embeddings in a memory-mapped float32 matrix,
+# both aligned to one shared id index.
+# feature_engineering/feature_store.py
+
+import io
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+DEFAULT_STORE_DIR = Path("data/processed/feature_store")
+
+
+def gather_rows(source, positions, out_path, chunk_size=50_000):
+    """Copy source[positions] into a new .npy at out_path, chunk_size rows at a time."""
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(len(positions), source.shape[1]))
+    for start in range(0, len(positions), chunk_size):
+        out[start:start + chunk_size] = source[positions[start:start + chunk_size]]
+    out.flush()
+    del out
+
+
+def append_npy(path, rows, chunk_size=50_000):
+    """
+    Append rows to a 2-D float32 .npy in place: the data goes on the end and only
+    the header's row count is rewritten. np.save leaves room in the header for
+    the shape to grow; if it does not fit, the file is rewritten once.
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.float32)
+    path = Path(path)
+    if not path.exists():
+        np.save(path, rows)
+        return len(rows)
+    fmt = np.lib.format
+    with open(path, "r+b") as f:
+        version = fmt.read_magic(f)
+        read_header = fmt.read_array_header_1_0 if version == (1, 0) else fmt.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_end = f.tell()
+        if fortran_order or dtype != np.float32 or len(shape) != 2 or shape[1] != rows.shape[1]:
+            raise ValueError(f"Cannot append {rows.shape} float32 rows to {path} ({shape}, {dtype}).")
+        new_shape = (shape[0] + len(rows), shape[1])
+        header = io.BytesIO()
+        write_header = fmt.write_array_header_1_0 if version == (1, 0) else fmt.write_array_header_2_0
+        write_header(header, {"descr": fmt.dtype_to_descr(dtype), "fortran_order": False, "shape": new_shape})
+        if header.tell() == header_end:
+            # Rows first, header last: an interrupted append still reads as the old array
+            f.seek(header_end + shape[0] * shape[1] * 4)
+            f.write(rows.tobytes())
+            f.truncate()
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+            return new_shape[0]
+
+    old = np.load(path, mmap_mode="r")
+    tmp_path = path.with_name(path.name + ".tmp")
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=new_shape)
+    for start in range(0, len(old), chunk_size):
+        out[start:start + chunk_size] = old[start:start + chunk_size]
+    out[len(old):] = rows
+    out.flush()
+    del out, old
+    tmp_path.replace(path)
+    return new_shape[0]
+
+
+def write_feature_store(root, signals, embeddings_path, embedding_ids):
+    """
+    Write a feature store whose rows are the ids present in both signals and embeddings.
+    Parameters:
+        root (Path): Store directory.
+        signals (DataFrame): Scalar features with an 'id' column, in any order.
+        embeddings_path (Path): .npy matrix whose rows follow embedding_ids.
+        embedding_ids (list): Post id for each embedding row.
+    Returns:
+        FeatureStore: The written store.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    emb_index = pd.Index(embedding_ids)
+    if not emb_index.is_unique:
+        raise ValueError("Embedding ids are not unique; cannot join by id.")
+    signals = signals.drop_duplicates("id", keep="last")
+
+    # Canonical row order is the embedding order, restricted to ids that have signals
+    ids = emb_index[emb_index.isin(signals["id"])]
+    signals = signals.set_index("id").loc[ids].rename_axis("id").reset_index()
+
+    for part in [*root.glob("ids_*.parquet"), *root.glob("signals_*.parquet")]:
+        part.unlink()  # appended parts belong to the store being replaced
+    pd.DataFrame({"id": ids}).to_parquet(root / "ids.parquet", index=False)
+    signals.to_parquet(root / "signals.parquet", index=False)
+
+    source = np.load(embeddings_path, mmap_mode="r")
+    target = root / "embeddings.npy"
+    target.unlink(missing_ok=True)
+    if len(ids) == len(emb_index):
+        # Same rows in the same order: link the matrix instead of copying it
+        try:
+            os.link(embeddings_path, target)
+        except OSError:
+            shutil.copyfile(embeddings_path, target)
+    else:
+        gather_rows(source, emb_index.get_indexer(ids), target)
+
+    meta = {"rows": len(ids), "columns": [c for c in signals.columns if c != "id"], "dim": int(source.shape[1])}
+    (root / "meta.json").write_text(json.dumps(meta, indent=2))
+    return FeatureStore(root)
+
+
+def append_feature_store(root, signals, embeddings=None):
+    """
+    Add rows for new ids to an existing store without rewriting it: ids and
+    signals go into new numbered Parquet parts, embeddings onto the end of the
+    matrix. signals is restricted to the store's columns (missing ones become
+    null). Pass embeddings=None when the matrix was already extended, e.g. when
+    it is hard-linked to an embeddings file the caller appended to.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    store = FeatureStore(root)
+    signals = signals.drop_duplicates("id", keep="last")
+    if signals["id"].isin(store.ids).any():
+        raise ValueError("append_feature_store only adds new ids; rebuild the store to change existing rows.")
+    if embeddings is not None and len(embeddings) != len(signals):
+        raise ValueError(f"{len(embeddings)} embedding rows for {len(signals)} new ids.")
+
+    part = max([int(p.stem.split("_")[1]) for p in store.root.glob("ids_*.parquet")], default=0) + 1
+    schema = pq.read_schema(store.root / "signals.parquet")
+    table = pa.Table.from_pandas(signals.reindex(columns=schema.names), schema=schema, preserve_index=False)
+    if embeddings is not None:
+        append_npy(store.root / "embeddings.npy", embeddings)
+    pq.write_table(table, store.root / f"signals_{part:05d}.parquet")
+    pd.DataFrame({"id": signals["id"]}).to_parquet(store.root / f"ids_{part:05d}.parquet", index=False)
+
+    store.meta["rows"] += len(signals)
+    (store.root / "meta.json").write_text(json.dumps(store.meta, indent=2))
+    return FeatureStore(root)
+
+
+class FeatureStore:
+    """
+    Read side of the feature store. Rows are addressed by post id through the
+    shared index; only the requested Parquet columns are read, and embeddings
+    stay memory-mapped until rows are selected from them.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        if not (self.root / "meta.json").exists():
+            raise FileNotFoundError(f"No feature store at {self.root}")
+        self.meta = json.loads((self.root / "meta.json").read_text())
+        self.ids = pd.Index(pd.concat([pd.read_parquet(p)["id"] for p in self._parts("ids")], ignore_index=True))
+        self._embeddings = None
+
+    def _parts(self, name):
+        """The base Parquet file plus any parts appended by append_feature_store, in row order."""
+        return [self.root / f"{name}.parquet", *sorted(self.root.glob(f"{name}_*.parquet"))]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    def positions(self, ids):
+        """Row positions for ids; raises KeyError if any id is not in the store."""
+        pos = self.ids.get_indexer(pd.Index(ids))
+        if (pos < 0).any():
+            missing = pd.Index(ids)[pos < 0][:5].tolist()
+            raise KeyError(f"{(pos < 0).sum()} ids not in feature store, e.g. {missing}")
+        return pos
+
+    def load(self, columns=None, ids=None):
+        """Return the 'id' column plus the requested signal columns, optionally for a subset of ids."""
+        columns = self.columns if columns is None else list(columns)
+        unknown = set(columns) - set(self.columns)
+        if unknown:
+            raise KeyError(f"Unknown feature columns: {sorted(unknown)}")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.concat_tables([pq.read_table(p, columns=["id"] + columns) for p in self._parts("signals")])
+        if ids is not None:
+            table = table.take(self.positions(ids))
+        return table.to_pandas()
+
+    def embeddings(self, ids=None):
+        """Memory-mapped embedding matrix, or a float32 array of the rows for ids."""
+        if self._embeddings is None:
+            self._embeddings = np.load(self.root / "embeddings.npy", mmap_mode="r")
+        if ids is None:
+            return self._embeddings
+        return np.asarray(self._embeddings[self.positions(ids)])
@@ -0,0 +1,102 @@
+# HDBSCAN parameter sweep - grid points fitted in parallel, sharing cached core distances and trees.
+# feature_engineering/hdbscan_sweep.py
+
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from utils.instrumentation import add_profile_argument, stage_run
+
+UMAP_PATH = Path("data/processed/embeddings_umap.npy")
+CACHE_DIR = Path("data/cache/hdbscan")
+OUTPUT_PATH = Path("data/processed/hdbscan_sweep.csv")
+
+
+def fit_config(data_path, cache_dir, min_cluster_size, min_samples, cluster_selection_method):
+    """Fit one grid point and return its summary row."""
+    import hdbscan
+    from joblib import Memory
+
+    X = np.load(data_path, mmap_mode="r")
+    start = time.perf_counter()
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size,
+        min_samples=min_samples,
+        cluster_selection_method=cluster_selection_method,
+        gen_min_span_tree=True,
+        memory=Memory(str(cache_dir), verbose=0),
+        core_dist_n_jobs=1,
+    ).fit(np.asarray(X))
+    runtime = time.perf_counter() - start
+
+    labels = clusterer.labels_
+    try:
+        validity = float(clusterer.relative_validity_)
+    except (ValueError, ZeroDivisionError, IndexError):
+        validity = float("nan")  # undefined when everything is noise or one cluster
+
+    return {
+        "min_cluster_size": min_cluster_size,
+        "min_samples": min_samples,
+        "cluster_selection_method": cluster_selection_method,
+        "n_clusters": int(labels.max() + 1),
+        "noise_fraction": float((labels == -1).mean()),
+        "relative_validity": validity,
+        "runtime_sec": round(runtime, 3),
+    }
+
+
+def sweep(data_path, min_cluster_sizes, min_samples_values, methods, workers=None, cache_dir=CACHE_DIR):
+    """
+    Run the full grid and return a DataFrame sorted by relative validity.
+    Core distances and the minimum spanning tree depend only on min_samples, so
+    they are cached with joblib (HDBSCAN's memory= argument). The sweep runs in
+    two parallel phases: one tree build per min_samples value, then every
+    remaining point off the cache, so no two workers build the same tree.
+    """
+    grid = list(itertools.product(min_cluster_sizes, min_samples_values, methods))
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    # Phase 1 builds one tree per min_samples; phase 2 reuses them from the cache
+    first_per_min_samples = {}
+    for config in grid:
+        first_per_min_samples.setdefault(config[1], config)
+    phase_1 = list(first_per_min_samples.values())
+    phase_2 = [config for config in grid if config not in phase_1]
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for phase in (phase_1, phase_2):
+            futures = [pool.submit(fit_config, data_path, cache_dir, *config) for config in phase]
+            rows.extend(f.result() for f in futures)
+
+    return pd.DataFrame(rows).sort_values("relative_validity", ascending=False, na_position="last")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep HDBSCAN parameters with shared tree caching")
+    parser.add_argument("--input", type=str, default=str(UMAP_PATH), help="UMAP projection (.npy)")
+    parser.add_argument("--min-cluster-size", type=int, nargs="+", default=[2, 5, 10, 15, 25, 50])
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--methods", nargs="+", choices=["eom", "leaf"], default=["eom", "leaf"])
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fits (default: all cores)")
+    parser.add_argument("--output", type=str, default=str(OUTPUT_PATH))
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("hdbscan_sweep", args.profile) as run:
+        start = time.perf_counter()
+        results = sweep(args.input, args.min_cluster_size, args.min_samples, args.methods, args.workers)
+        results.to_csv(args.output, index=False)
+        run.rows(rows_in=len(np.load(args.input, mmap_mode="r")), rows_out=len(results))
+
+        print(results.to_string(index=False))
+        print(f"\n{len(results)} configurations in {time.perf_counter() - start:.1f}s; table saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# Daily incremental ingestion - only posts not seen before are cleaned, scored, embedded and
+# assigned to the saved clusters; a full re-cluster runs only past a volume or drift threshold.
+# feature_engineering/incremental.py
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from feature_engineering.prepare_text_dataset import clean_text, json_loads, read_chunks
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
+
+RAW_DIR = Path("data/raw")
+RAW_PATTERN = "*_posts_*.jsonl*"
+PROCESSED_DIR = Path("data/processed")
+STATE_PATH = PROCESSED_DIR / "incremental" / "watermark.json"
+SIGNALS_PATH = PROCESSED_DIR / "incremental_signals.csv"
+STORE_DIR = PROCESSED_DIR / "feature_store"
+LABELING_TABLE_PATH = PROCESSED_DIR / "reddit_with_clusters_signals_final.csv"
+CLUSTER_COLUMNS = ["cluster", "cluster_prob", "outlier_score"]
+
+DEFAULT_RECLUSTER_VOLUME = 0.25  # new rows since the last fit, as a fraction of the rows it was fitted on
+DEFAULT_RECLUSTER_DRIFT = 0.10   # rise in the noise fraction of posts assigned since the last fit
+DEFAULT_MIN_DRIFT_ROWS = 500     # assigned rows needed before the noise fraction is trusted
+
+
+# --- Watermark ---
+def load_state(path=STATE_PATH):
+    if Path(path).exists():
+        return json.loads(Path(path).read_text())
+    return {"files": {}, "total_rows": 0, "fit": None, "since_fit": {"rows": 0, "noise": 0}}
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(path)
+
+def batch_time(path):
+    """The YYYYMMDD_HHMMSS stamp in a raw file name, so batches are processed in scrape order."""
+    match = re.search(r"(\d{8}_\d{6})", Path(path).name)
+    return match.group(1) if match else ""
+
+def pending_files(raw_dir, state, pattern=RAW_PATTERN):
+    """Raw files not processed yet, or grown since they were (their old posts are skipped by id)."""
+    files = []
+    for path in Path(raw_dir).glob(pattern):
+        seen = state["files"].get(path.name)
+        if seen is None or seen["size"] != path.stat().st_size:
+            files.append(path)
+    return sorted(files, key=lambda p: (batch_time(p), p.name))
+
+
+# --- Reading one batch ---
+def read_new_posts(path, seen_ids, chunk_size=10_000):
+    """
+    Posts in path whose id is not in seen_ids, with the cleaned 'text' the psych
+    stage scores and the raw title/selftext the encoder embeds.
+    Returns (DataFrame, Counter of malformed-line errors).
+    """
+    rows, errors = [], Counter()
+    for lines in read_chunks(path, chunk_size):
+        for line in lines:
+            try:
+                post = json_loads(line)
+                if post["id"] in seen_ids:
+                    continue
+                title, selftext = post.get("title") or "", post.get("selftext") or ""
+                rows.append({
+                    "id": post["id"],
+                    "subreddit": post["subreddit"],
+                    "title": title,
+                    "selftext": selftext,
+                    "text": clean_text(f"{title} {selftext}"),
+                    "score": post["score"],
+                    "num_comments": post["num_comments"],
+                })
+            except Exception as e:
+                errors[type(e).__name__] += 1
+    posts = pd.DataFrame(rows, columns=["id", "subreddit", "title", "selftext", "text", "score", "num_comments"])
+    return posts.drop_duplicates("id", keep="last").reset_index(drop=True), errors
+
+def known_ids(processed_dir=PROCESSED_DIR):
+    ids_path = Path(processed_dir) / "embedding_ids.csv"
+    if not ids_path.exists():
+        return set()
+    return set(pd.read_csv(ids_path, usecols=["id"])["id"])
+
+
+# --- Per-batch features ---
+def batch_signals(posts, batch_size=32, threads=None, workers=None):
+    """Psych, projection and EAI features for the new posts only, in one registry pass."""
+    from feature_engineering.psych_signals import compute_signals
+    return compute_signals(posts[["id", "subreddit", "text", "score", "num_comments"]], batch_size, threads,
+                           workers=workers)
+
+def batch_embeddings(posts, scratch_path, workers=None):
+    """Encode the posts the embedding store has not seen and return all of the batch's vectors."""
+    from feature_engineering.embedding_store import EmbeddingStore, embedding_text_hash
+    from feature_engineering.encoding_engine import encode
+    ids = posts["id"].tolist()
+    texts = (posts["title"] + " " + posts["selftext"]).tolist()  # same text embed_signals encodes
+    hashes = [embedding_text_hash(t) for t in texts]
+    store = EmbeddingStore(PROCESSED_DIR / "embedding_store")
+    todo = store.missing(ids, hashes)
+    if todo:
+        with hotspot("encode", docs=len(todo)):
+            vectors = encode([texts[i] for i in todo], workers=workers)
+        store.append([ids[i] for i in todo], [hashes[i] for i in todo], vectors)
+    return np.asarray(store.materialize(ids, scratch_path)), len(todo)
+
+
+# --- Appending outputs ---
+def append_csv(df, path, columns=None):
+    """Append df to a CSV, keeping the columns (and order) of its existing header."""
+    path = Path(path)
+    if path.exists():
+        header = pd.read_csv(path, nrows=0).columns
+        df.reindex(columns=header).to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False, columns=columns)
+
+def append_history(posts, signals, vectors, processed_dir=PROCESSED_DIR):
+    """Extend the history files the full re-cluster reads: signals, embeddings and their ids, post text."""
+    from feature_engineering.feature_store import append_npy
+    processed_dir = Path(processed_dir)
+    append_csv(signals, SIGNALS_PATH)
+    embeddings_path = processed_dir / "embeddings.npy"
+    store_embeddings = STORE_DIR / "embeddings.npy"
+    shared = (embeddings_path.exists() and store_embeddings.exists()
+              and os.path.samefile(embeddings_path, store_embeddings))
+    append_npy(embeddings_path, vectors)
+    append_csv(posts[["id"]], processed_dir / "embedding_ids.csv")
+    append_csv(posts[["id", "title", "selftext"]], processed_dir / "reddit_with_umap.csv")
+    return shared
+
+def assign_batch(vectors, reducer, clusterer):
+    """(projection, assignments) of the batch under the saved model."""
+    from feature_engineering.cluster_model import iter_assign
+    chunks = list(iter_assign(vectors, reducer, clusterer, soft=False))
+    return np.vstack([projected for _, projected, _ in chunks]), pd.concat([part for _, _, part in chunks],
+                                                                           ignore_index=True)
+
+def append_assigned(posts, signals, vectors, projected, assigned, store_shares_embeddings,
+                    processed_dir=PROCESSED_DIR):
+    """Add the assigned batch to the projection, cluster labels, feature store and labeling table."""
+    from feature_engineering.feature_store import append_feature_store, append_npy
+    append_npy(Path(processed_dir) / "embeddings_umap.npy", projected)
+    labels = assigned.assign(id=posts["id"].to_numpy())[["id", *CLUSTER_COLUMNS]]
+    append_csv(labels, Path(processed_dir) / "cluster_labels.csv")
+    merged = signals.merge(labels, on="id")
+    with hotspot("feature_store_write", docs=len(merged)):
+        append_feature_store(STORE_DIR, merged, None if store_shares_embeddings else vectors)
+    append_csv(merged.merge(posts[["id", "title", "selftext"]], on="id", how="left"), LABELING_TABLE_PATH)
+
+
+# --- Re-cluster decision ---
+def recluster_reason(state, volume_threshold, drift_threshold, min_drift_rows):
+    """Why a full re-cluster is due, or None. Thresholds are checked over everything assigned since the last fit."""
+    fit, since = state["fit"], state["since_fit"]
+    if fit is None:
+        return "no fitted model"
+    if since["rows"] > volume_threshold * fit["rows"]:
+        return f"{since['rows']} new rows since the last fit on {fit['rows']} (> {volume_threshold:.0%})"
+    if since["rows"] >= min_drift_rows:
+        noise = since["noise"] / since["rows"]
+        if noise - fit["noise_fraction"] > drift_threshold:
+            return (f"noise fraction of new posts {noise:.1%} vs {fit['noise_fraction']:.1%} "
+                    f"at fit (> +{drift_threshold:.0%})")
+    return None
+
+def adopt_existing_fit(state, processed_dir=PROCESSED_DIR):
+    """Start the drift counters from a model the non-incremental pipeline already fitted, if there is one."""
+    labels_path = Path(processed_dir) / "cluster_labels.csv"
+    if state["fit"] is not None or not labels_path.exists() or not (STORE_DIR / "meta.json").exists():
+        return
+    from feature_engineering.cluster_model import load_model
+    try:
+        _, _, meta = load_model()
+    except FileNotFoundError:
+        return
+    clusters = pd.read_csv(labels_path, usecols=["cluster"])["cluster"]
+    state["fit"] = {"version": meta["version"], "rows": int(len(clusters)),
+                    "noise_fraction": float((clusters == -1).mean()), "fitted_at": None}
+    print(f"Using existing clustering model {meta['version']} fitted on {len(clusters)} rows")
+
+def run_module(module, *args):
+    command = [sys.executable, "-m", module, *[str(a) for a in args]]
+    print(f"Running {' '.join(command[1:])}")
+    subprocess.run(command, check=True)
+
+def full_recluster(state, sample_size=None, min_cluster_size=2, processed_dir=PROCESSED_DIR):
+    """Re-fit on the whole history, rebuild the feature store and labeling table, and reset the drift counters."""
+    sample_args = ["--sample-size", sample_size] if sample_size else []
+    run_module("feature_engineering.clustering", "--min-cluster-size", min_cluster_size, *sample_args)
+    run_module("feature_engineering.merge_all", "--signals", SIGNALS_PATH)
+    clusters = pd.read_csv(Path(processed_dir) / "cluster_labels.csv", usecols=["cluster"])["cluster"]
+    from feature_engineering.cluster_model import load_model
+    _, _, meta = load_model()
+    state["fit"] = {"version": meta["version"], "rows": int(len(clusters)),
+                    "noise_fraction": float((clusters == -1).mean()),
+                    "fitted_at": datetime.now().isoformat(timespec="seconds")}
+    state["since_fit"] = {"rows": 0, "noise": 0}
+
+def seed_signals_history():
+    """
+    A store built by the non-incremental pipeline has no SIGNALS_PATH yet; copy its
+    signal columns there once so a later full re-cluster still sees every post.
+    """
+    if SIGNALS_PATH.exists() or not (STORE_DIR / "meta.json").exists():
+        return
+    from feature_engineering.feature_store import FeatureStore
+    store = FeatureStore(STORE_DIR)
+    store.load([c for c in store.columns if c not in CLUSTER_COLUMNS]).to_csv(SIGNALS_PATH, index=False)
+    print(f"Seeded {SIGNALS_PATH} with {len(store)} rows from the feature store")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest new daily post files without reprocessing history")
+    parser.add_argument("--raw-dir", type=str, default=str(RAW_DIR), help=f"Directory of {RAW_PATTERN} files")
+    parser.add_argument("--recluster-volume", type=float, default=DEFAULT_RECLUSTER_VOLUME,
+                        help="Re-cluster once rows added since the last fit exceed this fraction of it")
+    parser.add_argument("--recluster-drift", type=float, default=DEFAULT_RECLUSTER_DRIFT,
+                        help="Re-cluster once the noise fraction of new posts rises this much over the fit's")
+    parser.add_argument("--min-drift-rows", type=int, default=DEFAULT_MIN_DRIFT_ROWS)
+    parser.add_argument("--force-recluster", action="store_true", help="Re-cluster after ingesting regardless")
+    parser.add_argument("--sample-size", type=int, default=None, help="Re-cluster via a stratified sample of this size")
+    parser.add_argument("--min-cluster-size", type=int, default=2, help="HDBSCAN min_cluster_size for a re-cluster")
+    parser.add_argument("--batch-size", type=int, default=32, help="RoBERTa batch size")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads for RoBERTa scoring")
+    parser.add_argument("--workers", type=int, default=None, help="Feature extraction and encoder processes")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("incremental", args.profile) as run:
+        state = load_state()
+        files = pending_files(args.raw_dir, state)
+        seen = known_ids()
+        state["total_rows"] = len(seen)
+        print(f"{len(files)} raw file(s) to ingest; {len(seen)} posts already processed")
+        seed_signals_history()
+        adopt_existing_fit(state)
+
+        model = None
+        if state["fit"] is not None:
+            from feature_engineering.cluster_model import load_model
+            reducer, clusterer, meta = load_model()
+            model = (reducer, clusterer)
+            if meta["version"] != state["fit"]["version"]:
+                print(f"Note: latest model {meta['version']} differs from the watermark's {state['fit']['version']}")
+
+        rows_in = rows_out = 0
+        for path in files:
+            start = time.perf_counter()
+            posts, errors = read_new_posts(path, seen)
+            rows_in += len(posts) + sum(errors.values())
+            print(f"{path.name}: {len(posts)} new posts" + (f", {sum(errors.values())} malformed lines" if errors else ""))
+            if not posts.empty:
+                signals = batch_signals(posts, args.batch_size, args.threads, args.workers)
+                vectors, encoded = batch_embeddings(posts, STATE_PATH.parent / "batch_embeddings.npy", args.workers)
+                shared = append_history(posts, signals, vectors)
+                if model is not None and recluster_reason(state, args.recluster_volume, args.recluster_drift,
+                                                          args.min_drift_rows) is None:
+                    projected, assigned = assign_batch(vectors, *model)
+                    append_assigned(posts, signals, vectors, projected, assigned, shared)
+                    state["since_fit"]["rows"] += len(posts)
+                    state["since_fit"]["noise"] += int((assigned["cluster"] == -1).sum())
+                seen.update(posts["id"])
+                state["total_rows"] += len(posts)
+                rows_out += len(posts)
+                print(f"  {encoded} encoded, done in {time.perf_counter() - start:.1f}s "
+                      f"({len(posts) / max(time.perf_counter() - start, 1e-9):,.0f} posts/sec)")
+            state["files"][path.name] = {"size": path.stat().st_size, "new_posts": len(posts),
+                                         "processed_at": datetime.now().isoformat(timespec="seconds")}
+            save_state(state)
+
+        reason = "--force-recluster" if args.force_recluster else recluster_reason(
+            state, args.recluster_volume, args.recluster_drift, args.min_drift_rows)
+        if reason and state["total_rows"]:
+            print(f"Full re-cluster: {reason}")
+            full_recluster(state, args.sample_size, args.min_cluster_size)
+            save_state(state)
+        elif state["fit"] is not None:
+            since = state["since_fit"]
+            print(f"No re-cluster: {since['rows']} rows since the fit on {state['fit']['rows']}, "
+                  f"{since['noise'] / max(since['rows'], 1):.1%} of them noise")
+
+        run.rows(rows_in=rows_in, rows_out=rows_out)
+        run.extra.update(files=len(files), recluster=reason, total_rows=state["total_rows"])
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,8 @@
-# "emergent agency index" into psychological signals ?
\ No newline at end of file
+# "emergent agency index" into psychological signals: EAI is a registered feature extractor, so psych_signals
+# computes it alongside the psych and projection features from the same batch intermediates.
+# feature_engineering/integrate_eai_into_psych_signals.py
+
+from feature_engineering.psych_signals import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Persisted approximate kNN graph - built once per embeddings file, reused by every UMAP run.
+# feature_engineering/knn_graph.py
+
+import argparse
+import hashlib
+import time
+import numpy as np
+from pathlib import Path
+from utils.instrumentation import add_profile_argument, stage_run
+
+DEFAULT_KNN_DIR = Path("data/processed/knn")
+DEFAULT_K = 30
+
+
+def embeddings_fingerprint(embeddings_path, chunk_bytes=64 << 20):
+    """Content hash of an embeddings .npy file, read in chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(embeddings_path, "rb") as f:
+        while chunk := f.read(chunk_bytes):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def knn_cache_path(fingerprint, k, metric, knn_dir=DEFAULT_KNN_DIR):
+    return Path(knn_dir) / f"knn_{fingerprint}_k{k}_{metric}.npz"
+
+def build_knn(embeddings, k=DEFAULT_K, metric="cosine", random_state=42):
+    """Approximate kNN graph with the same NN-descent search UMAP runs internally."""
+    from umap.umap_ import nearest_neighbors
+    return nearest_neighbors(
+        embeddings, n_neighbors=k, metric=metric, metric_kwds={}, angular=False,
+        random_state=np.random.RandomState(random_state),
+    )
+
+def load_or_build_knn(embeddings_path, k=DEFAULT_K, metric="cosine", knn_dir=DEFAULT_KNN_DIR, with_index=False):
+    """
+    Return (indices, distances, search_index) for embeddings_path, building and saving
+    the graph only if no cached graph exists for this file content, k and metric.
+    The NN-descent search index is saved alongside and loaded only when with_index
+    is set (UMAP needs it to transform new points); otherwise it is returned as None.
+    """
+    import joblib
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    k = min(k, len(embeddings) - 1)
+    cache_path = knn_cache_path(embeddings_fingerprint(embeddings_path), k, metric, knn_dir)
+    index_path = cache_path.with_suffix(".index.joblib")
+
+    if cache_path.exists() and (index_path.exists() or not with_index):
+        cached = np.load(cache_path)
+        print(f"Reusing kNN graph {cache_path.name}")
+        search_index = joblib.load(index_path) if with_index else None
+        return cached["indices"], cached["distances"], search_index
+
+    print(f"Building kNN graph (k={k}, metric={metric}) over {len(embeddings)} embeddings...")
+    start = time.perf_counter()
+    indices, distances, search_index = build_knn(np.array(embeddings), k, metric)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(cache_path, indices=indices, distances=distances)
+    joblib.dump(search_index, index_path)
+    print(f"Saved kNN graph to {cache_path} ({time.perf_counter() - start:.1f}s)")
+    return indices, distances, search_index if with_index else None
+
+def precomputed_knn(indices, distances, n_neighbors, search_index=None):
+    """Slice a cached graph down to n_neighbors for umap.UMAP(precomputed_knn=...)."""
+    if indices.shape[1] < n_neighbors:
+        raise ValueError(f"Cached kNN graph has k={indices.shape[1]}, need at least n_neighbors={n_neighbors}.")
+    return (np.ascontiguousarray(indices[:, :n_neighbors]),
+            np.ascontiguousarray(distances[:, :n_neighbors]),
+            search_index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and cache the kNN graph over the embeddings")
+    parser.add_argument("--embeddings", type=str, default="data/processed/embeddings.npy")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Neighbours per point (>= largest UMAP n_neighbors)")
+    parser.add_argument("--metric", type=str, default="cosine")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("knn_graph", args.profile) as run:
+        indices, _, _ = load_or_build_knn(Path(args.embeddings), args.k, args.metric)
+        print(f"kNN graph ready: {indices.shape[0]} points x {indices.shape[1]} neighbours")
+        run.rows(rows_in=indices.shape[0], rows_out=indices.shape[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Single-pass lexicon engine - every keyword/regex signal counted from one tokenization per document.
+# feature_engineering/lexicon.py
+
+import argparse
+import re
+import time
+from collections import Counter
+import numpy as np
+
+# Word runs, plus the standalone "n't" the negation lexicon matches with \bn't\b
+TOKEN_RE = re.compile(r"n't\b|\w+")
+
+# --- Lexicon definitions ---
+# mode:  "word"      -> whole-word match (\bterm\b), counted per occurrence
+#        "substring" -> raw substring match, counted per occurrence (str.count)
+#        "presence"  -> substring match, counted once per distinct term present
+# case_sensitive=False matches against lowercased text.
+LEXICONS = {
+    # psych_signals.py
+    "i_count": {"terms": ["I", "i"], "mode": "word", "case_sensitive": True},
+    "negation_count": {"terms": ["not", "no", "never", "n't"], "mode": "word", "case_sensitive": True},
+    "temporal_refs": {
+        "terms": ["yesterday", "today", "tomorrow", "week", "month", "year", "day", "decade"],
+        "mode": "word",
+        "case_sensitive": True,
+    },
+    # projection_signals.py
+    "narrative_rigidity_score": {
+        "terms": ["always", "never", "clearly", "should", "obviously"],
+        "mode": "substring",
+        "case_sensitive": False,
+    },
+    "past_tense": {"terms": ["was", "had", "did", "felt", "said", "thought"], "mode": "word", "case_sensitive": False},
+    "present_tense": {"terms": ["is", "has", "do", "feel", "say", "think"], "mode": "word", "case_sensitive": False},
+    # emergent_agency_index.py
+    "first_person": {"terms": ["i", "my", "me", "mine"], "mode": "word", "case_sensitive": False},
+    "ethical_keywords": {
+        "terms": ["right thing", "wrong", "should have", "regret", "guilt", "responsible", "consequence"],
+        "mode": "presence",
+        "case_sensitive": False,
+    },
+    "existential_keywords": {
+        "terms": ["meaning", "existence", "purpose", "death", "irrelevant", "ghost", "identity"],
+        "mode": "presence",
+        "case_sensitive": False,
+    },
+}
+
+
+class LexiconEngine:
+    """
+    Counts every lexicon category for a batch of texts.
+    Each document is tokenized once; token lookups are memoized across the batch,
+    so repeated vocabulary costs a single dict hit. Multi-word substring terms are
+    matched with one combined pattern over the lowercased text.
+    """
+
+    def __init__(self, lexicons=None):
+        self.lexicons = lexicons or LEXICONS
+        self.columns = list(self.lexicons)
+
+        self._word_cs = {}       # exact token -> [slot, ...]
+        self._word_ci = {}       # lowercased token -> [slot, ...]
+        self._substrings = []    # (slot, term) for single-word substring terms
+        self._phrases = {}       # multi-word term -> [slot, ...]
+        slot_category = []
+
+        for col, (name, spec) in enumerate(self.lexicons.items()):
+            mode, case_sensitive = spec["mode"], spec.get("case_sensitive", True)
+            if mode not in ("word", "substring", "presence"):
+                raise ValueError(f"Unknown lexicon mode for {name}: {mode}")
+            for term in spec["terms"]:
+                slot = len(slot_category)
+                slot_category.append(col)
+                if mode == "word":
+                    table = self._word_cs if case_sensitive else self._word_ci
+                    table.setdefault(term if case_sensitive else term.lower(), []).append(slot)
+                elif not case_sensitive and " " in term:
+                    self._phrases.setdefault(term.lower(), []).append(slot)
+                elif not case_sensitive and re.fullmatch(r"\w+", term):
+                    self._substrings.append((slot, term.lower()))
+                else:
+                    raise ValueError(f"Unsupported substring term for {name}: {term!r}")
+
+        self._n_slots = len(slot_category)
+        self._phrase_re = (
+            re.compile("|".join(re.escape(p) for p in sorted(self._phrases, key=len, reverse=True)))
+            if self._phrases else None
+        )
+
+        # Slot -> category aggregation; presence categories count distinct terms present
+        self._aggregate = np.zeros((self._n_slots, len(self.columns)), dtype=np.int64)
+        self._aggregate[np.arange(self._n_slots), slot_category] = 1
+        self._presence = np.array(
+            [self.lexicons[name]["mode"] == "presence" for name in self.columns]
+        )
+        self._token_cache = {}
+
+    def _token_hits(self, token):
+        hits = self._token_cache.get(token)
+        if hits is None:
+            lowered = token.lower()
+            found = {}
+            for slot in self._word_cs.get(token, ()):
+                found[slot] = found.get(slot, 0) + 1
+            for slot in self._word_ci.get(lowered, ()):
+                found[slot] = found.get(slot, 0) + 1
+            for slot, term in self._substrings:
+                n = lowered.count(term)
+                if n:
+                    found[slot] = found.get(slot, 0) + n
+            hits = tuple(found.items())
+            self._token_cache[token] = hits
+        return hits
+
+    def slot_counts(self, texts):
+        """Return the (n_texts, n_terms) matrix of raw per-term counts."""
+        counts = np.zeros((len(texts), self._n_slots), dtype=np.int64)
+        cache = self._token_cache
+        for row, text in enumerate(texts):
+            row_counts = [0] * self._n_slots
+            for token, n in Counter(TOKEN_RE.findall(text)).items():
+                hits = cache.get(token)
+                if hits is None:
+                    hits = self._token_hits(token)
+                for slot, k in hits:
+                    row_counts[slot] += k * n
+            if self._phrase_re is not None:
+                for phrase in self._phrase_re.findall(text.lower()):
+                    for slot in self._phrases[phrase]:
+                        row_counts[slot] += 1
+            counts[row] = row_counts
+        return counts
+
+    def count_matrix(self, texts):
+        """Return the (n_texts, n_categories) counts matrix, columns in self.columns order."""
+        slots = self.slot_counts(texts)
+        counts = slots @ self._aggregate
+        if self._presence.any():
+            counts[:, self._presence] = ((slots > 0) @ self._aggregate)[:, self._presence]
+        return counts
+
+    def count_frame(self, texts):
+        """Return the counts matrix as a DataFrame with one column per category."""
+        import pandas as pd
+        return pd.DataFrame(self.count_matrix(texts), columns=self.columns)
+
+
+_default_engine = None
+
+def get_engine():
+    """Shared engine over the default lexicons; its token cache persists across batches."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = LexiconEngine()
+    return _default_engine
+
+
+# --- Throughput benchmark ---
+def _regex_reference(texts):
+    """Per-function scans as done before the engine existed (minus tokenizer/TextBlob work)."""
+    for text in texts:
+        lower = text.lower()
+        len(re.findall(r"\b[Ii]\b", text))
+        len(re.findall(r"\b(not|no|never|n't)\b", text))
+        len(re.findall(r"\b(yesterday|today|tomorrow|week|month|year|day|decade)\b", text))
+        sum(text.lower().count(w) for w in LEXICONS["narrative_rigidity_score"]["terms"])
+        len(re.findall(r"\b(was|had|did|felt|said|thought)\b", text.lower()))
+        len(re.findall(r"\b(is|has|do|feel|say|think)\b", text.lower()))
+        len(re.findall(r"\b(i|my|me|mine)\b", lower))
+        sum(1 for w in LEXICONS["ethical_keywords"]["terms"] if w in lower)
+        sum(1 for w in LEXICONS["existential_keywords"]["terms"] if w in lower)
+
+
+def benchmark(texts, repeats=3):
+    """Return docs/sec for the per-function regex scans and for the lexicon engine."""
+    results = {}
+    for name, fn in [("regex", _regex_reference), ("engine", lambda t: LexiconEngine().count_matrix(t))]:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(texts)
+            best = min(best, time.perf_counter() - start)
+        results[name] = len(texts) / max(best, 1e-9)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lexicon engine against per-function regex scans")
+    parser.add_argument("--input", type=str, help="Cleaned CSV with a 'text' column (defaults to a synthetic corpus)")
+    parser.add_argument("--docs", type=int, default=20000, help="Number of documents to benchmark")
+    args = parser.parse_args()
+
+    if args.input:
+        import pandas as pd
+        texts = pd.read_csv(args.input)["text"].fillna("").astype(str).tolist()[:args.docs]
+    else:
+        rng = np.random.default_rng(42)
+        vocab = [t for spec in LEXICONS.values() for t in spec["terms"]] + \
+            "the a and it to of that this just feel like really he she we they you".split() * 4
+        texts = [" ".join(rng.choice(vocab, size=rng.integers(5, 300))) for _ in range(args.docs)]
+
+    results = benchmark(texts)
+    for name, docs_per_sec in results.items():
+        print(f"{name:>7}: {docs_per_sec:,.0f} docs/sec")
+    print(f"Speedup: {results['engine'] / results['regex']:.2f}x over {len(texts)} docs")
+
+if __name__ == "__main__":
+    main()
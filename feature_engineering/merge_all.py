@@ -4,40 +4,62 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import glob
+import argparse
+from feature_engineering.feature_store import write_feature_store
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
+
+LABELING_TABLE_PATH = Path("data/processed/reddit_with_clusters_signals_final.csv")
 
 def main():
-    print("Searching for latest psychological signals CSV...")
-    signal_files = sorted(glob.glob("data/processed/*_signals.csv"))
-    if not signal_files:
-        raise FileNotFoundError("No *_signals.csv file found in data/processed/")
-    latest_signals = signal_files[-1]
-    print(f"Found: {latest_signals}")
+    parser = argparse.ArgumentParser(description="Join signals, embeddings and cluster labels into the feature store")
+    parser.add_argument("--signals", type=str, default=None, help="Signals CSV (default: latest *_signals.csv)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
 
-    print("Loading psych features...")
-    heuristics = pd.read_csv(latest_signals)
+    with stage_run("merge_all", args.profile) as run:
+        if args.signals:
+            latest_signals = args.signals
+        else:
+            print("Searching for latest psychological signals CSV...")
+            signal_files = glob.glob("data/processed/*_signals.csv")
+            if not signal_files:
+                raise FileNotFoundError("No *_signals.csv file found in data/processed/")
+            # The incremental history covers every ingested day; otherwise take the newest file, not the
+            # lexically last one
+            history = [f for f in signal_files if Path(f).name == "incremental_signals.csv"]
+            latest_signals = history[0] if history else max(signal_files, key=lambda f: Path(f).stat().st_mtime)
+        print(f"Found: {latest_signals}")
 
-    print("Loading embeddings...")
-    embeddings = np.load("data/processed/embeddings.npy")
-    ids = pd.read_csv("data/processed/embedding_ids.csv")
+        print("Loading psych features...")
+        heuristics = pd.read_csv(latest_signals)
 
-    print("Loading cluster labels...")
-    clusters = pd.read_csv("data/processed/cluster_labels.csv")
+        print("Loading embedding ids...")
+        ids = pd.read_csv("data/processed/embedding_ids.csv")
 
-    print("Merging all components...")
-    df = heuristics.merge(ids, on="id").merge(clusters, on="id")
+        print("Loading cluster labels...")
+        clusters = pd.read_csv("data/processed/cluster_labels.csv")
 
-    if embeddings.shape[0] != df.shape[0]:
-        raise ValueError(
-            f"Embedding count ({embeddings.shape[0]}) does not match merged rows ({df.shape[0]})."
-        )
+        print("Merging scalar components by id...")
+        df = heuristics.merge(ids, on="id").merge(clusters, on="id")
 
-    embedding_df = pd.DataFrame(embeddings, columns=[f"emb_{i}" for i in range(embeddings.shape[1])])
-    full_df = pd.concat([df, embedding_df], axis=1)
+        # Embeddings stay a float32 matrix; rows are joined to the signals through the shared id index
+        with hotspot("feature_store_write", docs=len(df)):
+            store = write_feature_store(
+                Path("data/processed/feature_store"),
+                signals=df,
+                embeddings_path=Path("data/processed/embeddings.npy"),
+                embedding_ids=ids["id"].tolist(),
+            )
 
-    output_path = Path("data/processed/full_features.csv")
-    full_df.to_csv(output_path, index=False)
+        print(f"Feature store written to {store.root} "
+              f"(rows: {len(store)}, signal columns: {len(store.columns)}, embedding dim: {store.meta['dim']})")
 
-    print(f"Merged dataset saved to {output_path} (rows: {full_df.shape[0]})")
+        # Scalar signals + clusters + post text, the table interpretation/auto_label.py reads
+        posts = pd.read_csv("data/processed/reddit_with_umap.csv")
+        posts[["title", "selftext"]] = posts[["title", "selftext"]].fillna("")
+        df.merge(posts, on="id", how="left").to_csv(LABELING_TABLE_PATH, index=False)
+        print(f"Labeling table written to {LABELING_TABLE_PATH}")
+        run.rows(rows_in=len(heuristics), rows_out=len(store))
 
 if __name__ == "__main__":
     main()
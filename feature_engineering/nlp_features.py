@@ -1,6 +1,8 @@
-from textblob import TextBlob
 import pandas as pd
 import os
+from feature_engineering.feature_registry import extract_features
+from feature_engineering.sentiment_cache import get_cache
+from utils.instrumentation import hotspot, stage_run
 
 # Update the input file path to the latest available file
 input_file = 'data/raw/relationships_posts_20250418_174400.jsonl'  # Use the most recent file
@@ -8,23 +10,33 @@ output_file = 'data/processed/reddit_with_sentiment.csv'
 
 # Function to extract sentiment polarity and subjectivity
 def extract_sentiment(text):
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity  # Sentiment polarity (-1 to 1)
-    subjectivity = blob.sentiment.subjectivity  # Subjectivity (0 to 1)
+    polarity, subjectivity = get_cache().sentiment(text)  # Polarity (-1 to 1), subjectivity (0 to 1)
     return polarity, subjectivity
 
-# Load your scraped Reddit posts data from the updated file
-try:
-    df = pd.read_json(input_file, lines=True)
-    print(f"Successfully loaded data from {input_file}")
-except ValueError as e:
-    print(f"Error loading JSON file: {e}")
-    exit()
+def main():
+    # The pool's worker processes may import this module, so the work only runs when it is the script
+    run = stage_run("nlp_features").start()
 
-# Apply sentiment extraction to each post
-df[['sentiment_polarity', 'sentiment_subjectivity']] = df['selftext'].apply(lambda x: pd.Series(extract_sentiment(x)))
+    # Load your scraped Reddit posts data from the updated file
+    try:
+        df = pd.read_json(input_file, lines=True)
+        print(f"Successfully loaded data from {input_file}")
+    except ValueError as e:
+        print(f"Error loading JSON file: {e}")
+        return
 
-# Save the data with extracted features
-df.to_csv(output_file, index=False)
+    # Apply sentiment extraction to all posts, cached and spread over every core
+    with hotspot("sentiment_cache", docs=len(df)):
+        sentiment, _ = extract_features(df['selftext'].tolist(), ['sentiment'], workers=None)
+        df[['sentiment_polarity', 'sentiment_subjectivity']] = sentiment
 
-print(f"Sentiment features extracted and saved to '{output_file}'")
+    # Save the data with extracted features
+    df.to_csv(output_file, index=False)
+
+    print(f"Sentiment features extracted and saved to '{output_file}'")
+    get_cache().report()
+    run.rows(rows_in=len(df), rows_out=len(df))
+    run.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Multi-core feature extraction - the corpus is cut into chunks that pool workers run through the feature
+# registry, each writing its rows straight into one shared-memory float64 matrix; only row counts come back.
+# feature_engineering/parallel_features.py
+
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+import numpy as np
+from feature_engineering.feature_registry import DEFAULT_BATCH_SIZE, extract_features, plan
+from utils.instrumentation import hotspot
+
+MIN_CHUNK_SIZE = 200
+MAX_CHUNK_SIZE = 5_000
+CHUNKS_PER_WORKER = 8  # several chunks per worker so uneven texts still balance across the pool
+
+
+def chunk_bounds(n_rows, workers, chunk_size=None):
+    """[(start, stop)] row ranges covering n_rows, sized for about CHUNKS_PER_WORKER chunks per worker."""
+    if chunk_size is None:
+        chunk_size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, -(-n_rows // (workers * CHUNKS_PER_WORKER))))
+    return [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+
+def _attach(name):
+    """Attach to an existing block without registering it again (the parent owns and unlinks it)."""
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+# --- Worker side: the shared matrix and a sentiment cache connection per process ---
+_worker = {}
+
+def _init_worker(shm_name, shape, names, column_slice, options, cache_path, cache_max_entries):
+    from feature_engineering.sentiment_cache import SentimentCache, set_cache
+    shm = _attach(shm_name)
+    _worker.update(shm=shm, matrix=np.ndarray(shape, dtype=np.float64, buffer=shm.buf), names=names,
+                   columns=slice(*column_slice), options=options)
+    # A connection of this process's own; one inherited through fork is not safe to use
+    set_cache(SentimentCache(cache_path, max_entries=cache_max_entries))
+
+def _extract_chunk(start, texts):
+    from feature_engineering.sentiment_cache import get_cache
+    cache = get_cache()
+    hits, misses = cache.hits, cache.misses
+    values, _ = extract_features(texts, _worker["names"], batch_size=max(len(texts), 1), **_worker["options"])
+    _worker["matrix"][start:start + len(texts), _worker["columns"]] = values
+    return len(texts), cache.hits - hits, cache.misses - misses
+
+
+def extract_parallel(texts, names=None, workers=None, chunk_size=None, batch_size=DEFAULT_BATCH_SIZE, **options):
+    """
+    extract_features on a process pool: returns the same (matrix, columns), in
+    input order whatever order chunks finish in. Extractors marked parallel=False
+    (RoBERTa, which threads internally) run afterwards in this process on the
+    same matrix.
+    """
+    from feature_engineering.sentiment_cache import get_cache
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    extractors, _ = plan(names)
+    columns = [column for extractor in extractors for column in extractor.columns]
+    pooled = [e for e in extractors if e.parallel]
+    # Pooled extractors first, so their columns form one contiguous block workers write into
+    ordered = pooled + [e for e in extractors if not e.parallel]
+    ordered_columns = [column for extractor in ordered for column in extractor.columns]
+    n_pooled = sum(len(e.columns) for e in pooled)
+
+    if workers == 1 or len(texts) <= MIN_CHUNK_SIZE or not pooled:
+        return extract_features(texts, names, batch_size=batch_size, **options)
+
+    shape = (len(texts), len(columns))
+    shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    matrix = None
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        cache = get_cache()
+        with hotspot("parallel_features", docs=len(texts)):
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, shape, [e.name for e in pooled], (0, n_pooled), options,
+                                               str(cache.path), cache.max_entries)) as pool:
+                pending = deque()
+                for start, stop in chunk_bounds(len(texts), workers, chunk_size):
+                    pending.append(pool.submit(_extract_chunk, start, texts[start:stop]))
+                    if len(pending) >= 2 * workers:  # bounds the texts in flight
+                        _, hits, misses = pending.popleft().result()
+                        cache.hits, cache.misses = cache.hits + hits, cache.misses + misses
+                while pending:
+                    _, hits, misses = pending.popleft().result()
+                    cache.hits, cache.misses = cache.hits + hits, cache.misses + misses
+
+        serial = [e.name for e in ordered[len(pooled):]]
+        if serial:
+            matrix[:, n_pooled:], _ = extract_features(texts, serial, batch_size=batch_size, **options)
+        # Back to the requested column order
+        positions = [ordered_columns.index(column) for column in columns]
+        return matrix[:, positions].copy(), columns
+    finally:
+        del matrix
+        shm.close()
+        shm.unlink()
+
+
+# --- Scaling benchmark ---
+def benchmark(texts, worker_counts, names=None):
+    """docs/sec and parallel efficiency per worker count, each run against a cold scratch sentiment cache."""
+    from feature_engineering.sentiment_cache import SentimentCache, set_cache
+    results, reference, base_rate = [], None, None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory(prefix="parallel_features_") as scratch:
+            previous = set_cache(SentimentCache(Path(scratch) / "sentiment.sqlite"))
+            try:
+                start = time.perf_counter()
+                matrix, _ = extract_parallel(texts, names, workers=workers)
+                elapsed = time.perf_counter() - start
+            finally:
+                set_cache(previous)
+        if reference is None:
+            reference = matrix
+        rate = len(texts) / max(elapsed, 1e-9)
+        base_rate = base_rate or rate / workers
+        results.append({"workers": workers, "seconds": round(elapsed, 2), "docs_per_sec": round(rate, 1),
+                        "efficiency": round(rate / (base_rate * workers), 2),
+                        "matches_first": bool(np.array_equal(matrix, reference, equal_nan=True))})
+        print(f"{workers:>3} workers: {rate:10,.0f} docs/sec  efficiency {results[-1]['efficiency']:.2f}  "
+              f"identical output: {results[-1]['matches_first']}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-core feature extraction scaling")
+    parser.add_argument("--input", type=str, default=None,
+                        help="Cleaned CSV with a 'text' column (default: a synthetic corpus)")
+    parser.add_argument("--docs", type=int, default=50_000, help="Number of documents to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--features", nargs="+", default=["psych", "projection", "eai"],
+                        help="Registered extractors to run (RoBERTa is left out by default: it runs in the parent)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    if args.input:
+        texts = pd.read_csv(args.input)["text"].fillna("").astype(str).tolist()[:args.docs]
+    else:
+        from benchmarks.synthetic_corpus import iter_posts
+        texts = [f"{post['title']} {post['selftext']}" for post in iter_posts(args.docs)]
+    benchmark(texts, args.workers, args.features)
+
+if __name__ == "__main__":
+    main()
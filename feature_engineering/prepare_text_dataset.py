@@ -2,7 +2,22 @@ import json
 import pandas as pd
 from pathlib import Path
 import argparse
+import gzip
+import io
+import os
 import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.instrumentation import add_profile_argument, stage_run
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+COLUMNS = ["id", "subreddit", "text", "score", "num_comments"]
 
 def clean_text(text):
     """Basic text cleaning: remove URLs, newlines, excess whitespace."""
@@ -11,34 +26,139 @@ def clean_text(text):
     text = re.sub(r"\s+", " ", text)  # normalize spaces
     return text.strip()
 
-# --- Argument parser ---
-parser = argparse.ArgumentParser(description="Clean and convert Reddit JSONL to CSV")
-parser.add_argument("--input", type=str, required=True, help="Path to input .jsonl file")
-args = parser.parse_args()
+# --- Streaming input ---
+def open_jsonl(path):
+    """Open a .jsonl, .jsonl.gz or .jsonl.zst file as a binary line stream."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix in (".zst", ".zstd"):
+        import zstandard
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")))
+    return open(path, "rb")
 
-# --- Load and clean ---
-input_path = Path(args.input)
-output_path = Path("data/processed") / input_path.with_suffix(".csv").name
-output_path.parent.mkdir(parents=True, exist_ok=True)
+def read_chunks(path, chunk_size):
+    """Yield lists of raw lines, chunk_size at a time."""
+    with open_jsonl(path) as f:
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
-data = []
-with open(input_path, "r", encoding="utf-8") as f:
-    for line in f:
+def clean_chunk(lines):
+    """Parse and clean one chunk. Returns (column dict, Counter of malformed-line errors)."""
+    columns = {col: [] for col in COLUMNS}
+    errors = Counter()
+    for line in lines:
         try:
-            post = json.loads(line)
-            text = f"{post['title']} {post['selftext']}"
-            cleaned = clean_text(text)
-            data.append({
+            post = json_loads(line)
+            row = {
                 "id": post["id"],
                 "subreddit": post["subreddit"],
-                "text": cleaned,
+                "text": clean_text(f"{post['title']} {post['selftext']}"),
                 "score": post["score"],
-                "num_comments": post["num_comments"]
-            })
+                "num_comments": post["num_comments"],
+            }
         except Exception as e:
-            print(f"Skipping bad line: {e}")
+            errors[type(e).__name__] += 1
+            continue
+        for col in COLUMNS:
+            columns[col].append(row[col])
+    return columns, errors
+
+def iter_cleaned(path, chunk_size=10_000, workers=None):
+    """
+    Clean chunks on a process pool, yielding results in input order.
+    At most 2 * workers chunks are in flight, so memory stays bounded by chunk size.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in read_chunks(path, chunk_size):
+            yield clean_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in read_chunks(path, chunk_size):
+            pending.append(pool.submit(clean_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# --- Incremental output ---
+class ChunkWriter:
+    """Append cleaned chunks to a CSV file or to Parquet row groups."""
+
+    def __init__(self, path, fmt):
+        self.path = Path(path)
+        self.fmt = fmt
+        self.rows = 0
+        self._writer = None
+
+    def write(self, columns):
+        df = pd.DataFrame(columns, columns=COLUMNS)
+        if df.empty:
+            return
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([("id", pa.string()), ("subreddit", pa.string()), ("text", pa.string()),
+                                ("score", pa.int64()), ("num_comments", pa.int64())])
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+            self._writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif self.rows == 0:
+            pd.DataFrame(columns=COLUMNS).to_csv(self.path, index=False)
+
+def output_path_for(input_path, fmt, out_dir=Path("data/processed")):
+    name = Path(input_path).name
+    for suffix in (".gz", ".zst", ".zstd", ".jsonl", ".json"):
+        name = name[: -len(suffix)] if name.endswith(suffix) else name
+    return Path(out_dir) / f"{name}.{fmt}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and convert Reddit JSONL to CSV or Parquet")
+    parser.add_argument("--input", type=str, required=True, help="Path to input .jsonl(.gz/.zst) file")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Lines per chunk / row group")
+    parser.add_argument("--workers", type=int, default=None, help="Cleaning processes (default: all cores)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("prepare_text_dataset", args.profile) as run:
+        input_path = Path(args.input)
+        output_path = output_path_for(input_path, args.format)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        start = time.perf_counter()
+        writer = ChunkWriter(output_path, args.format)
+        errors = Counter()
+        try:
+            for columns, chunk_errors in iter_cleaned(input_path, args.chunk_size, args.workers):
+                writer.write(columns)
+                errors.update(chunk_errors)
+        finally:
+            writer.close()
+
+        elapsed = time.perf_counter() - start
+        print(f"Cleaned data saved to {output_path} (rows: {writer.rows}, {writer.rows / max(elapsed, 1e-9):,.0f} posts/sec)")
+        if errors:
+            detail = ", ".join(f"{name}: {count}" for name, count in errors.most_common())
+            print(f"Skipped {sum(errors.values())} malformed lines ({detail})")
+        run.rows(rows_in=writer.rows + sum(errors.values()), rows_out=writer.rows)
 
-# --- Save as CSV ---
-df = pd.DataFrame(data)
-df.to_csv(output_path, index=False)
-print(f"Cleaned data saved to {output_path} (rows: {len(df)})")
+if __name__ == "__main__":
+    main()
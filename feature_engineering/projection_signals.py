@@ -3,18 +3,20 @@
 
 import re
 import numpy as np
-from textblob import TextBlob
-from nltk import word_tokenize
-from nltk.corpus import stopwords
+from feature_engineering.feature_registry import FeatureExtractor, word_tokenizer, feature_frame, register
+from feature_engineering.sentence_engine import segment, valence_variance
 
-stop_words = set(stopwords.words("english"))
+OTHER_PRONOUNS = {"you", "they", "them"}
+SELF_PRONOUNS = {"i", "me", "my"}
 
 # --- 1. Pronoun Distance Ratio --- 
 # Defensive projection (blame vs ownership)
 def pronoun_distance_ratio(text):
-    tokens = word_tokenize(text.lower())
-    you_they = sum(1 for w in tokens if w in ["you", "they", "them"])
-    i_me = sum(1 for w in tokens if w in ["i", "me", "my"])
+    return _pronoun_ratio(word_tokenizer()(text.lower()))
+
+def _pronoun_ratio(tokens):
+    you_they = sum(1 for w in tokens if w in OTHER_PRONOUNS)
+    i_me = sum(1 for w in tokens if w in SELF_PRONOUNS)
     return you_they / (i_me + 1)  # Avoid div by zero
 
 # --- 2. Narrative Rigidity Score ---
@@ -26,11 +28,7 @@ def narrative_rigidity_score(text):
 # --- 3. Sentiment Valence Variance ---
 # Projection - Affective instability (idealization/splitting)
 def sentiment_valence_variance(text, chunk_size=3):
-    blob = TextBlob(text)
-    sentences = blob.sentences
-    chunks = [sentences[i:i+chunk_size] for i in range(0, len(sentences), chunk_size)]
-    polarity_scores = [np.mean([s.sentiment.polarity for s in chunk]) for chunk in chunks if chunk]
-    return np.var(polarity_scores) if len(polarity_scores) > 1 else 0.0
+    return valence_variance(segment([text]), chunk_size)[0]
 
 # --- 4. Tense Shifting Score ---
 # Temporal dissonance =, unrersolved trauma loop
@@ -48,3 +46,25 @@ def extract_projection_features(text):
         "projection_valence_variance": sentiment_valence_variance(text),
         "tense_shifting_score": detect_tense_shifts(text),
     }
+
+# --- Batch Feature Extractor ---
+# Tokens, the sentence table and lexicon counts are batch intermediates shared with the other extractors
+@register
+class ProjectionFeatures(FeatureExtractor):
+    name = "projection"
+    columns = ("pronoun_distance_ratio", "narrative_rigidity_score", "projection_valence_variance",
+               "tense_shifting_score")
+    int_columns = ("narrative_rigidity_score", "tense_shifting_score")
+    requires = ("tokens", "lexicon", "sentence_table")
+
+    def compute(self, batch):
+        lexicon = batch["lexicon"]
+        return np.column_stack([
+            [_pronoun_ratio(tokens) for tokens in batch["tokens"]],
+            lexicon["narrative_rigidity_score"],
+            valence_variance(batch["sentence_table"]),
+            np.abs(lexicon["past_tense"] - lexicon["present_tense"]),
+        ])
+
+def extract_projection_features_batch(texts):
+    return feature_frame(texts, ["projection"])
@@ -4,12 +4,32 @@ import pandas as pd
 import numpy as np
 import argparse
 import re
-from textblob import TextBlob
-from transformers import pipeline
+import time
 from pathlib import Path
-
-# --- Setup RoBERTa sentiment model ---
-roberta_pipe = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment")
+from feature_engineering.feature_registry import FeatureExtractor, feature_frame, intermediate, register
+from feature_engineering.sentiment_cache import get_cache
+from utils.instrumentation import add_profile_argument, stage_run
+from utils.lazy import shared
+
+# --- RoBERTa sentiment model (loaded on first use) ---
+ROBERTA_MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+ROBERTA_LABELS = {
+    "LABEL_0": "roberta_sent_neg",
+    "LABEL_1": "roberta_sent_neu",
+    "LABEL_2": "roberta_sent_pos",
+}
+
+@shared
+def _roberta_pipe():
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=ROBERTA_MODEL, top_k=None)
+
+def get_roberta_pipe(num_threads=None):
+    """The RoBERTa pipeline, built once on first use, returning all class scores per input."""
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    return _roberta_pipe()
 
 # --- Psych feature functions ---
 def count_i(text):
@@ -25,69 +45,146 @@ def count_temporal(text):
     return len(re.findall(r"\b(yesterday|today|tomorrow|week|month|year|day|decade)\b", text))
 
 def get_blob_sentiment(text):
-    blob = TextBlob(text)
-    return blob.sentiment.polarity, blob.sentiment.subjectivity
+    return get_cache().sentiment(text)
+
+def _label_scores(result):
+    scores = {col: 0.0 for col in ROBERTA_LABELS.values()}
+    for item in result:
+        scores[ROBERTA_LABELS[item["label"]]] = item["score"]
+    return scores
 
 def get_roberta_scores(text):
-    result = roberta_pipe(text[:512])[0]  # Truncate to 512 tokens
-    scores = {
-        "roberta_sent_neg": result["score"] if result["label"] == "LABEL_0" else 0,
-        "roberta_sent_neu": result["score"] if result["label"] == "LABEL_1" else 0,
-        "roberta_sent_pos": result["score"] if result["label"] == "LABEL_2" else 0,
-    }
+    result = get_roberta_pipe()([text[:512]])[0]  # Truncate to 512 characters
+    return _label_scores(result)
+
+def get_roberta_scores_batched(texts, batch_size=32, num_threads=None):
+    """
+    Score texts in length-sorted batches so each batch pads to similar lengths.
+    Parameters:
+        texts (list of str): Texts to score, in any order.
+        batch_size (int): Number of texts per forward pass.
+        num_threads (int): Torch intra-op threads; None keeps the default.
+    Returns:
+        list of dict: Negative/neutral/positive probabilities, in input order.
+    """
+    pipe = get_roberta_pipe(num_threads)
+    truncated = [t[:512] for t in texts]
+    order = sorted(range(len(truncated)), key=lambda i: len(truncated[i]))
+    scores = [None] * len(truncated)
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        results = pipe([truncated[i] for i in bucket], batch_size=len(bucket))
+        for i, result in zip(bucket, results):
+            scores[i] = _label_scores(result)
     return scores
 
+# --- Registered extractors ---
+@intermediate("roberta")
+def _roberta_scores(batch):
+    """(n, 3) RoBERTa class probabilities, in ROBERTA_LABELS order."""
+    batch_size, threads = batch.options.get("roberta_batch_size", 32), batch.options.get("threads")
+    start = time.perf_counter()
+    scores = get_roberta_scores_batched(batch.texts, batch_size, threads)
+    elapsed = time.perf_counter() - start
+    print(f"RoBERTa: {len(batch) / max(elapsed, 1e-9):.1f} docs/sec "
+          f"(batch_size={batch_size}, threads={threads or 'default'})")
+    return np.array([[s[col] for col in ROBERTA_LABELS.values()] for s in scores], dtype=np.float64).reshape(-1, 3)
+
+@register
+class PsychFeatures(FeatureExtractor):
+    name = "psych"
+    columns = ("word_count", "i_count", "negation_count", "question_mark_count", "temporal_refs",
+               "sentiment_polarity", "sentiment_subjectivity")
+    int_columns = columns[:5]
+    requires = ("word_counts", "lexicon", "sentiment")
+
+    def compute(self, batch):
+        lexicon = batch["lexicon"]
+        return np.column_stack([
+            batch["word_counts"], lexicon["i_count"], lexicon["negation_count"],
+            [count_questions(text) for text in batch.texts], lexicon["temporal_refs"], batch["sentiment"],
+        ])
+
+@register
+class RobertaFeatures(FeatureExtractor):
+    name = "roberta"
+    columns = tuple(ROBERTA_LABELS.values())
+    requires = ("roberta",)
+    parallel = False  # one batched model in this process; torch threads it across cores itself
+
+    def compute(self, batch):
+        return batch["roberta"]
+
+@register
+class SentimentFeatures(FeatureExtractor):
+    """Whole-text TextBlob sentiment alone (the psych extractor already includes it)."""
+    name = "sentiment"
+    columns = ("sentiment_polarity", "sentiment_subjectivity")
+    requires = ("sentiment",)
+
+    def compute(self, batch):
+        return batch["sentiment"]
+
+DEFAULT_FEATURES = ("psych", "roberta", "projection", "eai", "sentence")
+
+def post_texts(df):
+    """The text scored for each row: selftext, else title, else text (empty when none is set)."""
+    columns = [df[c] for c in ("selftext", "title", "text") if c in df.columns]
+    return [next((v for v in values if isinstance(v, str) and v), "") for values in zip(*columns)] \
+        if columns else [""] * len(df)
+
+def compute_signals(df, batch_size=32, threads=None, features=DEFAULT_FEATURES, workers=None, sentence_store=None):
+    """
+    Psych signals (and by default projection, EAI and sentence features) for
+    every row of df (an 'id' column plus selftext/title/text), computed together
+    by the feature registry on workers processes (None: all cores). Sentence
+    features reuse the persisted sentence table at sentence_store if given.
+    Returns a DataFrame with one row per input row, in the same order.
+    """
+    options = {"sentence_store": str(sentence_store)} if sentence_store else {}
+    out = feature_frame(post_texts(df), list(features), workers=workers, roberta_batch_size=batch_size,
+                        threads=threads, **options)
+    out.insert(0, "id", df["id"].to_numpy())
+    return out
+
 # --- Main Function ---
 def main():
     parser = argparse.ArgumentParser(description="Extract psychological features from Reddit text")
     parser.add_argument("--input", type=str, required=True, help="Path to cleaned input CSV")
+    parser.add_argument("--batch-size", type=int, default=32, help="RoBERTa batch size")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads for RoBERTa scoring")
+    parser.add_argument("--features", nargs="+", default=list(DEFAULT_FEATURES),
+                        help="Registered feature extractors to run (psych, roberta, projection, eai, sentence)")
+    parser.add_argument("--sentences", type=str, default=None,
+                        help="Sentence table from sentence_engine; its documents are not re-parsed")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Feature extraction processes (default: all cores; RoBERTa always runs in-process)")
+    add_profile_argument(parser)
     args = parser.parse_args()
 
-    input_path = Path(args.input)
-    df = pd.read_csv(input_path)
-
-    features = {
-        "id": [],
-        "word_count": [],
-        "i_count": [],
-        "negation_count": [],
-        "question_mark_count": [],
-        "temporal_refs": [],
-        "sentiment_polarity": [],
-        "sentiment_subjectivity": [],
-        "roberta_sent_neg": [],
-        "roberta_sent_neu": [],
-        "roberta_sent_pos": []
-    }
-
-    for _, row in df.iterrows():
-        text = (row.get("selftext") or row.get("title") or "")
-        features["id"].append(row["id"])
-        features["word_count"].append(len(text.split()))
-        features["i_count"].append(count_i(text))
-        features["negation_count"].append(count_negations(text))
-        features["question_mark_count"].append(count_questions(text))
-        features["temporal_refs"].append(count_temporal(text))
-
-        polarity, subjectivity = get_blob_sentiment(text)
-        features["sentiment_polarity"].append(polarity)
-        features["sentiment_subjectivity"].append(subjectivity)
-
-        roberta_scores = get_roberta_scores(text)
-        features["roberta_sent_neg"].append(roberta_scores["roberta_sent_neg"])
-        features["roberta_sent_neu"].append(roberta_scores["roberta_sent_neu"])
-        features["roberta_sent_pos"].append(roberta_scores["roberta_sent_pos"])
-
-    out_df = pd.DataFrame(features)
-
-    # Merge on 'id'
-    original_df = pd.read_csv(input_path)
-    merged_df = pd.merge(original_df, out_df, on="id", how="left")
-
-    # Save alongside original filename
-    output_path = Path("data/processed") / (input_path.stem + "_signals.csv")
-    out_df.to_csv(output_path, index=False)
-    print(f"Psychological feature file saved to {output_path}")
+    with stage_run("psych_signals", args.profile) as run:
+        input_path = Path(args.input)
+        df = pd.read_csv(input_path)
+
+        start_time = time.perf_counter()
+        out_df = compute_signals(df, args.batch_size, args.threads, args.features, args.workers,
+                                 args.sentences)
+
+        # Merge on 'id'
+        original_df = pd.read_csv(input_path)
+        merged_df = pd.merge(original_df, out_df, on="id", how="left")
+
+        # Save alongside original filename
+        output_path = Path("data/processed") / (input_path.stem + "_signals.csv")
+        out_df.to_csv(output_path, index=False)
+        print(f"Psychological feature file saved to {output_path}")
+        get_cache().report()
+        run.rows(rows_in=len(df), rows_out=len(out_df))
+        run.extra["sentiment_cache"] = get_cache().stats()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"Total: {len(out_df)} docs in {elapsed:.1f}s ({len(out_df) / max(elapsed, 1e-9):.1f} docs/sec)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,216 @@
+# Quantized embedding storage - L2-normalized vectors kept as float16, or int8 with a float32 scale per vector,
+# in memory-mapped .npy files next to embeddings.npy, so every process reading them shares the same, smaller pages.
+# feature_engineering/quantized_embeddings.py
+
+import argparse
+import json
+import time
+import numpy as np
+from pathlib import Path
+
+STORAGE_TYPES = ("float32", "float16", "int8")
+DEFAULT_CHUNK_SIZE = 50_000
+INT8_MAX = 127
+
+
+def quantized_paths(embeddings_path, storage):
+    """(codes path, scales path or None) of the storage copy of embeddings_path, e.g. embeddings.int8.npy."""
+    path = Path(embeddings_path)
+    codes = path.with_name(f"{path.stem}.{storage}.npy")
+    return codes, path.with_name(f"{path.stem}.{storage}.scales.npy") if storage == "int8" else None
+
+def quantize(vectors, storage):
+    """L2-normalize vectors and encode them as storage; returns (codes, per-vector scales or None)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+    if storage == "float16":
+        return unit.astype(np.float16), None
+    if storage != "int8":
+        raise ValueError(f"Unknown embedding storage {storage!r}; choose from {STORAGE_TYPES[1:]}")
+    scales = np.abs(unit).max(axis=-1) / INT8_MAX
+    scales = np.where(scales == 0, 1.0, scales)  # all-zero vectors
+    codes = np.clip(np.rint(unit / scales[..., None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def dequantize(codes, scales=None):
+    values = np.asarray(codes, dtype=np.float32)
+    return values if scales is None else values * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+class QuantizedEmbeddings:
+    """
+    Read side of a quantized copy: the codes (and int8 scales) stay memory-mapped,
+    and indexing dequantizes only the selected rows, so it stands in for the
+    float32 memmap wherever rows are read by slice or position
+    (embeddings[start:stop], embeddings[positions]). Vectors come back
+    L2-normalized.
+    """
+
+    def __init__(self, embeddings_path, storage="int8"):
+        codes_path, scales_path = quantized_paths(embeddings_path, storage)
+        if not codes_path.exists():
+            raise FileNotFoundError(f"No {storage} embeddings at {codes_path}; write them with "
+                                    f"python -m feature_engineering.quantized_embeddings write --storage {storage}")
+        self.storage = storage
+        self.codes = np.load(codes_path, mmap_mode="r")
+        self.scales = np.load(scales_path, mmap_mode="r") if scales_path else None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __getitem__(self, rows):
+        return dequantize(self.codes[rows], None if self.scales is None else self.scales[rows])
+
+    def iter_batches(self, batch_size=DEFAULT_CHUNK_SIZE):
+        """Yield (start, float32 block) over every row, batch_size rows at a time."""
+        for start in range(0, len(self), batch_size):
+            yield start, self[start:start + batch_size]
+
+
+def open_embeddings(embeddings_path, storage="float32"):
+    """The embeddings at embeddings_path, memory-mapped: the float32 matrix itself or its quantized copy."""
+    if storage == "float32":
+        return np.load(embeddings_path, mmap_mode="r")
+    return QuantizedEmbeddings(embeddings_path, storage)
+
+def write_quantized(embeddings_path, storage="int8", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write the storage copy of a float32 embeddings .npy chunk by chunk and return it opened."""
+    source = np.load(embeddings_path, mmap_mode="r")
+    codes_path, scales_path = quantized_paths(embeddings_path, storage)
+    tmp_codes = codes_path.with_name(codes_path.name + ".tmp")
+    tmp_scales = scales_path.with_name(scales_path.name + ".tmp") if scales_path else None
+    codes = np.lib.format.open_memmap(tmp_codes, mode="w+", dtype=np.dtype(storage), shape=source.shape)
+    scales = (np.lib.format.open_memmap(tmp_scales, mode="w+", dtype=np.float32, shape=(len(source),))
+              if tmp_scales else None)
+    for start in range(0, len(source), chunk_size):
+        block_codes, block_scales = quantize(source[start:start + chunk_size], storage)
+        codes[start:start + len(block_codes)] = block_codes
+        if scales is not None:
+            scales[start:start + len(block_codes)] = block_scales
+    codes.flush()
+    del codes
+    if scales is not None:
+        scales.flush()
+        del scales
+        tmp_scales.replace(scales_path)  # scales first: codes appearing marks the copy complete
+    tmp_codes.replace(codes_path)
+    return QuantizedEmbeddings(embeddings_path, storage)
+
+
+# --- Effect of quantization on neighbourhoods and clusters ---
+def _knn(vectors, k, metric="cosine", chunk_size=1_024):
+    """Exact k nearest neighbours (excluding self) of every row, by cosine or euclidean distance."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if metric == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    squared = (vectors ** 2).sum(axis=1)
+    neighbours = np.empty((len(vectors), k), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        # Larger is closer: cosine similarity, or negated squared euclidean distance
+        scores = block @ vectors.T if metric == "cosine" else 2 * block @ vectors.T - squared
+        scores[np.arange(len(block)), np.arange(start, start + len(block))] = -np.inf
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        neighbours[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+    return neighbours
+
+def neighbourhood_overlap(a, b):
+    """Mean share of each row's neighbours in a that are also its neighbours in b."""
+    k = a.shape[1]
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(a.tolist(), b.tolist())]))
+
+def quantization_report(embeddings_path, storages=("float16", "int8"), sample_size=20_000, k=15,
+                        min_cluster_size=15, seed=42):
+    """
+    Fit UMAP and HDBSCAN on a random sample of the float32 embeddings and on the
+    same rows after a quantize/dequantize round trip, per storage type. Reports
+    bytes per vector, reconstruction cosine, kNN recall in embedding space, the
+    overlap of the two UMAP layouts' neighbourhoods and the agreement of the
+    HDBSCAN labels (adjusted Rand index).
+    """
+    import hdbscan
+    import umap
+    from sklearn.metrics import adjusted_rand_score
+    source = np.load(embeddings_path, mmap_mode="r")
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.choice(len(source), min(sample_size, len(source)), replace=False))
+    reference = np.asarray(source[positions], dtype=np.float32)
+    reference /= np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    k = min(k, len(reference) - 1)
+
+    def fit(vectors):
+        layout = umap.UMAP(n_neighbors=k, metric="cosine", random_state=seed).fit_transform(vectors)
+        return layout, hdbscan.HDBSCAN(min_cluster_size=min_cluster_size).fit_predict(layout)
+
+    reference_knn = _knn(reference, k)
+    reference_layout, reference_labels = fit(reference)
+    reference_layout_knn = _knn(reference_layout, k, metric="euclidean")
+    results = {"sample_size": len(reference), "k": k, "dim": int(source.shape[1]),
+               "reference_clusters": int(reference_labels.max() + 1),
+               "reference_noise": round(float(np.mean(reference_labels < 0)), 4), "storages": {}}
+    for storage in storages:
+        start = time.perf_counter()
+        codes, scales = quantize(reference, storage)
+        restored = dequantize(codes, scales)
+        layout, labels = fit(restored)
+        bytes_per_vector = codes.itemsize * codes.shape[1] + (scales.itemsize if scales is not None else 0)
+        results["storages"][storage] = {
+            "bytes_per_vector": bytes_per_vector,
+            "compression": round(4 * source.shape[1] / bytes_per_vector, 2),
+            "min_cosine": round(float(np.min(np.sum(restored * reference, axis=1)
+                                             / np.maximum(np.linalg.norm(restored, axis=1), 1e-12))), 6),
+            "knn_recall": round(neighbourhood_overlap(reference_knn, _knn(restored, k)), 4),
+            "umap_neighbourhood_overlap": round(neighbourhood_overlap(reference_layout_knn,
+                                                                      _knn(layout, k, metric="euclidean")), 4),
+            "hdbscan_ari": round(float(adjusted_rand_score(reference_labels, labels)), 4),
+            "clusters": int(labels.max() + 1),
+            "noise": round(float(np.mean(labels < 0)), 4),
+            "seconds": round(time.perf_counter() - start, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write or evaluate quantized copies of the embeddings")
+    parser.add_argument("command", choices=["write", "report"])
+    parser.add_argument("--embeddings", type=str, default="data/processed/embeddings.npy")
+    parser.add_argument("--storage", nargs="+", choices=STORAGE_TYPES[1:], default=["int8"],
+                        help="Storage type(s) to write or evaluate")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per write chunk")
+    parser.add_argument("--sample-size", type=int, default=20_000, help="Rows fitted per report")
+    parser.add_argument("--k", type=int, default=15, help="Neighbours compared (and UMAP n_neighbors) in the report")
+    parser.add_argument("--min-cluster-size", type=int, default=15, help="HDBSCAN min_cluster_size in the report")
+    parser.add_argument("--output", type=str, default=None, help="Write the report as JSON here")
+    args = parser.parse_args()
+
+    source = np.load(args.embeddings, mmap_mode="r")
+    if args.command == "write":
+        for storage in args.storage:
+            start = time.perf_counter()
+            quantized = write_quantized(args.embeddings, storage, args.chunk_size)
+            print(f"Wrote {quantized_paths(args.embeddings, storage)[0]}: {quantized.nbytes / 2**20:,.1f} MiB "
+                  f"vs {source.nbytes / 2**20:,.1f} MiB float32 ({time.perf_counter() - start:.1f}s)")
+        return
+
+    report = quantization_report(args.embeddings, args.storage, args.sample_size, args.k, args.min_cluster_size)
+    print(f"Sample of {report['sample_size']} x {report['dim']}: float32 gives {report['reference_clusters']} "
+          f"clusters, {report['reference_noise']:.1%} noise")
+    for storage, row in report["storages"].items():
+        print(f"  {storage:8s} {row['compression']:.1f}x smaller  min cosine {row['min_cosine']:.4f}  "
+              f"kNN recall {row['knn_recall']:.3f}  UMAP neighbourhoods {row['umap_neighbourhood_overlap']:.3f}  "
+              f"HDBSCAN ARI {row['hdbscan_ari']:.3f} ({row['clusters']} clusters, {row['noise']:.1%} noise)")
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# Out-of-core clustering - fit UMAP + HDBSCAN on a stratified sample, then project and
+# assign every row from the memory-mapped embeddings in fixed-size chunks.
+# feature_engineering/sampled_clustering.py
+
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from feature_engineering.cluster_model import iter_assign
+from feature_engineering.feature_store import gather_rows
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
+
+SAMPLE_PATH = Path("data/processed/embeddings_sample.npy")
+REPORT_PATH = Path("data/processed/sample_agreement.json")
+LABEL_COLUMNS = ["id", "cluster", "cluster_prob", "outlier_score"]
+
+
+def _normalized(block):
+    block = np.asarray(block, dtype=np.float32)
+    return block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+
+def stratified_sample(embeddings, sample_size, n_strata=64, chunk_size=50_000, seed=42):
+    """
+    Sorted positions of about sample_size rows, drawn from each of n_strata
+    MiniBatchKMeans cells (cosine geometry) in proportion to its size, with at
+    least one row per cell so small regions of the embedding space survive.
+    Two chunked passes over embeddings: fit the cells, then assign rows to them.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    n = len(embeddings)
+    if sample_size >= n:
+        return np.arange(n)
+    n_strata = max(1, min(n_strata, sample_size, chunk_size, n))
+    kmeans = MiniBatchKMeans(n_clusters=n_strata, random_state=seed, n_init=3)
+    for start in range(0, n, chunk_size):
+        block = embeddings[start:start + chunk_size]
+        if start == 0 or len(block) >= n_strata:
+            kmeans.partial_fit(_normalized(block))
+    strata = np.empty(n, dtype=np.int32)
+    for start in range(0, n, chunk_size):
+        strata[start:start + chunk_size] = kmeans.predict(_normalized(embeddings[start:start + chunk_size]))
+
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(strata, minlength=n_strata)
+    quotas = np.minimum(counts, np.maximum(1, np.round(sample_size * counts / n).astype(np.int64)))
+    picked = [rng.choice(np.flatnonzero(strata == s), size=q, replace=False)
+              for s, q in enumerate(quotas) if q > 0]
+    return np.sort(np.concatenate(picked))
+
+def fit_on_sample(embeddings, sample_size, sample_path=SAMPLE_PATH, seed=42, **fit_params):
+    """
+    Draw a stratified sample, write it to sample_path and fit UMAP + HDBSCAN on it.
+    fit_params are passed to clustering.fit_umap_hdbscan. Returns (reducer, clusterer, n_neighbors).
+    """
+    from feature_engineering.clustering import fit_umap_hdbscan
+    start = time.perf_counter()
+    with hotspot("stratified_sample", docs=len(embeddings)):
+        positions = stratified_sample(embeddings, sample_size, seed=seed)
+    Path(sample_path).parent.mkdir(parents=True, exist_ok=True)
+    gather_rows(embeddings, positions, sample_path)
+    print(f"Drew a stratified sample of {len(positions)} / {len(embeddings)} rows "
+          f"({time.perf_counter() - start:.1f}s)")
+    reducer, clusterer, _, n_neighbors = fit_umap_hdbscan(sample_path, **fit_params)
+    return reducer, clusterer, n_neighbors
+
+def stream_labels(embeddings, ids, reducer, clusterer, labels_path, umap_path=None, chunk_size=50_000):
+    """
+    Project and assign every row of embeddings chunk by chunk, appending
+    id/cluster/cluster_prob/outlier_score rows to labels_path and, if umap_path
+    is given, writing the projection into a memory-mapped .npy there.
+    """
+    ids = pd.Series(ids).reset_index(drop=True)
+    if len(ids) != len(embeddings):
+        raise ValueError(f"{len(ids)} ids for {len(embeddings)} embedding rows.")
+    projection = None
+    if umap_path is not None:
+        projection = np.lib.format.open_memmap(umap_path, mode="w+", dtype=np.float32,
+                                               shape=(len(embeddings), reducer.n_components))
+
+    start_time = time.perf_counter()
+    pd.DataFrame(columns=LABEL_COLUMNS).to_csv(labels_path, index=False)
+    for start, projected, part in iter_assign(embeddings, reducer, clusterer, chunk_size, soft=False):
+        part.insert(0, "id", ids.iloc[start:start + len(part)].to_numpy())
+        part[LABEL_COLUMNS].to_csv(labels_path, mode="a", header=False, index=False)
+        if projection is not None:
+            projection[start:start + len(part)] = projected
+        done = start + len(part)
+        print(f"Assigned {done}/{len(embeddings)} rows ({done / max(time.perf_counter() - start_time, 1e-9):,.0f} rows/sec)")
+    if projection is not None:
+        projection.flush()
+        del projection
+        print(f"Saved UMAP embeddings to {umap_path}")
+
+
+# --- Sample-vs-full agreement ---
+def agreement_report(full_labels, sample_labels):
+    """
+    Compare labels from a full fit with labels from a sample fit on the same rows.
+    Cluster ids are arbitrary per fit, so agreement is measured with permutation-
+    invariant scores; clustered_* scores only use rows both fits put in a cluster.
+    """
+    from sklearn.metrics import adjusted_mutual_info_score, adjusted_rand_score
+    full_labels, sample_labels = np.asarray(full_labels), np.asarray(sample_labels)
+    full_noise, sample_noise = full_labels == -1, sample_labels == -1
+    both = ~full_noise & ~sample_noise
+    report = {
+        "rows": int(len(full_labels)),
+        "full_clusters": int(len(np.unique(full_labels[~full_noise]))),
+        "sample_clusters": int(len(np.unique(sample_labels[~sample_noise]))),
+        "full_noise_fraction": float(full_noise.mean()),
+        "sample_noise_fraction": float(sample_noise.mean()),
+        "noise_agreement": float((full_noise == sample_noise).mean()),
+        "adjusted_rand": float(adjusted_rand_score(full_labels, sample_labels)),
+        "adjusted_mutual_info": float(adjusted_mutual_info_score(full_labels, sample_labels)),
+        "clustered_adjusted_rand": None,
+    }
+    if both.sum() > 1:
+        report["clustered_adjusted_rand"] = float(adjusted_rand_score(full_labels[both], sample_labels[both]))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how well sample-fit cluster labels agree with a full fit")
+    parser.add_argument("--embeddings", type=str, default="data/processed/embeddings.npy",
+                        help="Mid-sized corpus that still fits a full UMAP + HDBSCAN fit")
+    parser.add_argument("--sample-size", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--min-cluster-size", type=int, default=2)
+    parser.add_argument("--min-samples", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--output", type=str, default=str(REPORT_PATH))
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with stage_run("sampled_clustering", args.profile) as run:
+        from feature_engineering.clustering import fit_umap_hdbscan
+        embeddings_path = Path(args.embeddings)
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        fit_params = {"min_cluster_size": args.min_cluster_size, "min_samples": args.min_samples}
+        run.rows(rows_in=len(embeddings))
+
+        start = time.perf_counter()
+        _, full_clusterer, _, _ = fit_umap_hdbscan(embeddings_path, **fit_params)
+        full_seconds = time.perf_counter() - start
+        print(f"Full fit on {len(embeddings)} rows: {full_seconds:.1f}s")
+
+        results = []
+        for sample_size in args.sample_size:
+            if sample_size >= len(embeddings):
+                print(f"Skipping sample size {sample_size}: not smaller than the corpus")
+                continue
+            start = time.perf_counter()
+            reducer, clusterer, _ = fit_on_sample(embeddings, sample_size, **fit_params)
+            labels = np.concatenate([part["cluster"].to_numpy() for _, _, part in
+                                     iter_assign(embeddings, reducer, clusterer, args.chunk_size, soft=False)])
+            report = agreement_report(full_clusterer.labels_, labels)
+            report.update(sample_size=sample_size, seconds=round(time.perf_counter() - start, 2))
+            results.append(report)
+            print(f"sample={sample_size}: ARI={report['adjusted_rand']:.3f}, AMI={report['adjusted_mutual_info']:.3f}, "
+                  f"noise agreement={report['noise_agreement']:.1%}")
+
+        Path(args.output).write_text(json.dumps(
+            {"embeddings": str(embeddings_path), "full_fit_seconds": round(full_seconds, 2), "samples": results}, indent=2))
+        print(pd.DataFrame(results).to_string(index=False))
+        print(f"Agreement report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
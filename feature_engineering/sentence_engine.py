@@ -0,0 +1,283 @@
+# Sentence-level engine - the corpus is segmented once into flat per-sentence arrays (character offsets, polarity,
+# tense markers) indexed by per-document offsets; sentence features are segment reductions over those arrays.
+# feature_engineering/sentence_engine.py
+
+import argparse
+import functools
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from feature_engineering.feature_registry import FeatureExtractor, intermediate, register
+from feature_engineering.lexicon import LEXICONS, LexiconEngine
+from utils.instrumentation import hotspot
+from utils.lazy import shared
+
+DEFAULT_CHUNK_SIZE = 3      # sentences per chunk for valence variance
+SEGMENT_CHUNK_SIZE = 2_000  # texts per pool task when segmenting a corpus
+TENSE_LEXICONS = ("past_tense", "present_tense")
+SENTENCE_ARRAYS = ("starts", "ends", "polarity", "past", "present")
+
+
+def doc_key(text):
+    """Hash of the exact text; sentence offsets index into it, so unlike the sentiment cache it is not normalized."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+@shared
+def tense_engine():
+    return LexiconEngine({name: LEXICONS[name] for name in TENSE_LEXICONS})
+
+
+class SentenceTable:
+    """
+    Every sentence of a set of documents as flat arrays. Document i owns rows
+    doc_offsets[i]:doc_offsets[i + 1] of starts/ends (character offsets into its
+    text), polarity and past/present (tense marker counts); keys[i] is its
+    doc_key, so a persisted table can be matched against new texts.
+    """
+
+    def __init__(self, keys, doc_offsets, starts, ends, polarity, past, present):
+        self.keys = np.asarray(keys, dtype="S16")
+        self.doc_offsets = np.asarray(doc_offsets, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.polarity = np.asarray(polarity, dtype=np.float64)
+        self.past = np.asarray(past, dtype=np.int32)
+        self.present = np.asarray(present, dtype=np.int32)
+        self._order = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def sentence_counts(self):
+        return np.diff(self.doc_offsets)
+
+    @property
+    def doc_rows(self):
+        """Document row of every sentence."""
+        return np.repeat(np.arange(len(self)), self.sentence_counts)
+
+    @property
+    def positions(self):
+        """Index of every sentence within its document."""
+        return np.arange(self.doc_offsets[-1]) - np.repeat(self.doc_offsets[:-1], self.sentence_counts)
+
+    def split(self, values):
+        """Per-sentence values as one array per document, e.g. split(table.polarity) for polarity trajectories."""
+        return np.split(np.asarray(values), self.doc_offsets[1:-1])
+
+    def sentences(self, row, text):
+        """The sentence strings of document row, cut from its text without re-parsing."""
+        span = slice(self.doc_offsets[row], self.doc_offsets[row + 1])
+        return [text[start:end] for start, end in zip(self.starts[span], self.ends[span])]
+
+    # --- Selection ---
+    def find(self, keys):
+        """Row of each doc_key in this table, -1 where it is absent."""
+        keys = np.asarray(keys, dtype="S16")
+        if not len(self):
+            return np.full(len(keys), -1, dtype=np.int64)
+        if self._order is None:
+            self._order = np.argsort(self.keys, kind="stable")
+        sorted_keys = self.keys[self._order]
+        at = np.minimum(np.searchsorted(sorted_keys, keys), len(self) - 1)
+        return np.where(sorted_keys[at] == keys, self._order[at], -1)
+
+    def take(self, rows):
+        """A new table of the given document rows, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.sentence_counts[rows]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        sentence_rows = np.repeat(self.doc_offsets[:-1][rows] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return SentenceTable(self.keys[rows], offsets, *(getattr(self, name)[sentence_rows] for name in SENTENCE_ARRAYS))
+
+    @classmethod
+    def concat(cls, tables):
+        offsets, base = [np.zeros(1, dtype=np.int64)], 0
+        for table in tables:
+            offsets.append(table.doc_offsets[1:] + base)
+            base += table.doc_offsets[-1]
+        return cls(np.concatenate([t.keys for t in tables]) if tables else [], np.concatenate(offsets),
+                   *(np.concatenate([getattr(t, name) for t in tables]) if tables else [] for name in SENTENCE_ARRAYS))
+
+    # --- Persistence ---
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, keys=self.keys, doc_offsets=self.doc_offsets,
+                 **{name: getattr(self, name) for name in SENTENCE_ARRAYS})
+        tmp_path.replace(path)
+        load_store.cache_clear()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["keys"], data["doc_offsets"], *(data[name] for name in SENTENCE_ARRAYS))
+
+
+# --- Segmentation ---
+def segment(texts):
+    """Parse texts into a SentenceTable: TextBlob sentences, their cached polarity and tense marker counts."""
+    from textblob import TextBlob
+    from feature_engineering.sentiment_cache import get_cache
+    texts = [t if isinstance(t, str) else "" for t in texts]
+    parsed = [TextBlob(text).sentences for text in texts]
+    flat = [str(sentence) for sentences in parsed for sentence in sentences]
+    polarity = [p for p, _ in get_cache().sentiment_many(flat)]
+    tense = tense_engine().count_matrix(flat).reshape(len(flat), len(TENSE_LEXICONS))
+    return SentenceTable(
+        [doc_key(text) for text in texts],
+        np.concatenate([[0], np.cumsum([len(sentences) for sentences in parsed], dtype=np.int64)]),
+        [sentence.start for sentences in parsed for sentence in sentences],
+        [sentence.end for sentences in parsed for sentence in sentences],
+        polarity, tense[:, 0], tense[:, 1],
+    )
+
+def _init_segment_worker(cache_path, cache_max_entries):
+    from feature_engineering.sentiment_cache import SentimentCache, set_cache
+    set_cache(SentimentCache(cache_path, max_entries=cache_max_entries))  # not the connection inherited by fork
+
+def segment_corpus(texts, workers=1, chunk_size=SEGMENT_CHUNK_SIZE):
+    """segment() on a process pool (workers None: all cores), chunks concatenated back in input order."""
+    from feature_engineering.sentiment_cache import get_cache
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return segment(texts)
+    cache = get_cache()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker,
+                             initargs=(str(cache.path), cache.max_entries)) as pool:
+        return SentenceTable.concat(list(pool.map(segment, chunks)))
+
+@functools.lru_cache(maxsize=2)
+def load_store(path):
+    """The persisted SentenceTable at path (None if there is none), loaded once per process."""
+    return SentenceTable.load(path) if Path(path).exists() else None
+
+def sentence_table(texts, store=None, workers=1):
+    """
+    The SentenceTable for texts, in order. Documents already in store (a
+    SentenceTable or the path of a persisted one) are reused as they are; only
+    the rest are segmented.
+    """
+    texts = [t if isinstance(t, str) else "" for t in texts]
+    stored = load_store(str(store)) if isinstance(store, (str, Path)) else store
+    if stored is None or not len(stored):
+        return segment_corpus(texts, workers)
+    rows = stored.find([doc_key(text) for text in texts])
+    missing = np.flatnonzero(rows < 0)
+    if not len(missing):
+        return stored.take(rows)
+    found = rows >= 0
+    combined = SentenceTable.concat([stored.take(rows[found]),
+                                     segment_corpus([texts[i] for i in missing], workers)])
+    order = np.empty(len(texts), dtype=np.int64)
+    order[found] = np.arange(found.sum())
+    order[missing] = found.sum() + np.arange(len(missing))
+    return combined.take(order)
+
+
+# --- Vectorized sentence features ---
+def segment_sums(values, offsets):
+    """Sum of values[offsets[i]:offsets[i + 1]] for every i; empty segments sum to 0, which reduceat alone gets wrong."""
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    sums = np.zeros(len(offsets) - 1)
+    nonempty = offsets[:-1] < offsets[1:]
+    if nonempty.any():
+        sums[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+    return sums
+
+def valence_variance(table, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Per document, the variance of the mean polarity of consecutive chunk_size
+    sentence chunks (0 with fewer than two chunks).
+    """
+    n_chunks = -(-table.sentence_counts // chunk_size)
+    chunk_offsets = np.concatenate([[0], np.cumsum(n_chunks)])
+    within = np.arange(chunk_offsets[-1]) - np.repeat(chunk_offsets[:-1], n_chunks)
+    bounds = np.append(np.repeat(table.doc_offsets[:-1], n_chunks) + chunk_size * within, table.doc_offsets[-1])
+    chunk_means = segment_sums(table.polarity, bounds) / np.maximum(np.diff(bounds), 1)
+    doc_means = segment_sums(chunk_means, chunk_offsets) / np.maximum(n_chunks, 1)
+    deviations = (chunk_means - np.repeat(doc_means, n_chunks)) ** 2
+    variance = segment_sums(deviations, chunk_offsets) / np.maximum(n_chunks, 1)
+    return np.where(n_chunks > 1, variance, 0.0)
+
+def tense_shifts(table):
+    """
+    Per document, how often the dominant tense changes from one tensed sentence
+    to the next (sentences with no tense marker, or a tie, are skipped).
+    """
+    tense = np.sign(table.past - table.present)  # +1 past, -1 present
+    tensed = np.flatnonzero(tense)
+    docs, tense = table.doc_rows[tensed], tense[tensed]
+    shifts = (tense[1:] != tense[:-1]) & (docs[1:] == docs[:-1])
+    return np.bincount(docs[1:][shifts], minlength=len(table))
+
+def polarity_trajectory(table):
+    """
+    Per document, the least-squares slope of sentence polarity over sentence
+    position, and the arc from the first sentence's polarity to the last's.
+    """
+    counts = table.sentence_counts.astype(np.float64)
+    x, y = table.positions.astype(np.float64), table.polarity
+    sx, sy, sxx, sxy = (segment_sums(values, table.doc_offsets) for values in (x, y, x * x, x * y))
+    denominator = counts * sxx - sx ** 2
+    slope = np.divide(counts * sxy - sx * sy, denominator, out=np.zeros(len(table)), where=denominator > 0)
+    arc = np.zeros(len(table))
+    nonempty = counts > 0
+    arc[nonempty] = y[table.doc_offsets[1:][nonempty] - 1] - y[table.doc_offsets[:-1][nonempty]]
+    return slope, arc
+
+
+@intermediate("sentence_table")
+def _sentence_table(batch):
+    """The batch's SentenceTable, reusing the persisted store named by the sentence_store option if any."""
+    return sentence_table(batch.texts, batch.options.get("sentence_store"))
+
+@register
+class SentenceFeatures(FeatureExtractor):
+    name = "sentence"
+    columns = ("sentence_count", "sentence_tense_shifts", "polarity_slope", "polarity_arc")
+    int_columns = ("sentence_count", "sentence_tense_shifts")
+    requires = ("sentence_table",)
+
+    def compute(self, batch):
+        table = batch["sentence_table"]
+        return np.column_stack([table.sentence_counts, tense_shifts(table), *polarity_trajectory(table)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment a cleaned corpus into a persisted sentence table")
+    parser.add_argument("--input", type=str, required=True, help="Path to cleaned input CSV")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Sentence table to write (default: data/processed/<input stem>_sentences.npz); "
+                             "documents already in it are not re-parsed")
+    parser.add_argument("--workers", type=int, default=None, help="Segmentation processes (default: all cores)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from feature_engineering.psych_signals import post_texts
+    from feature_engineering.sentiment_cache import get_cache
+    input_path = Path(args.input)
+    output_path = Path(args.output) if args.output else Path("data/processed") / f"{input_path.stem}_sentences.npz"
+    texts = post_texts(pd.read_csv(input_path))
+
+    start = time.perf_counter()
+    previous = load_store(str(output_path))
+    reused = int((previous.find([doc_key(t) for t in texts]) >= 0).sum()) if previous is not None else 0
+    with hotspot("sentence_engine", docs=len(texts)):
+        table = sentence_table(texts, previous, workers=args.workers)
+    table.save(output_path)
+    get_cache().report()
+    elapsed = time.perf_counter() - start
+    print(f"Sentence table saved to {output_path}: {len(table)} docs ({reused} reused), "
+          f"{table.doc_offsets[-1]} sentences in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Persistent sentiment cache - TextBlob polarity/subjectivity computed once per distinct text, across stages and runs.
+# feature_engineering/sentiment_cache.py
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from utils.instrumentation import record_hotspot
+
+DEFAULT_CACHE_PATH = Path("data/cache/sentiment.sqlite")
+DEFAULT_MAX_ENTRIES = 5_000_000
+SQLITE_MAX_VARS = 900  # stay under SQLite's bound-parameter limit per statement
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace; TextBlob's pattern analyzer scores the same either way."""
+    return " ".join(str(text).lower().split())
+
+def text_key(text):
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+
+class SentimentCache:
+    """
+    On-disk TextBlob sentiment cache keyed by a hash of the normalized text.
+    Lookups and inserts are batched; entries beyond max_entries are evicted
+    least-recently-used first.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                "key BLOB PRIMARY KEY, polarity REAL, subjectivity REAL, last_used INTEGER)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment(last_used)")
+        return self._conn
+
+    # --- Bulk primitives ---
+    def get_many(self, keys):
+        """Return {key: (polarity, subjectivity)} for the keys present in the cache."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), SQLITE_MAX_VARS):
+            chunk = keys[start:start + SQLITE_MAX_VARS]
+            rows = self.conn.execute(
+                f"SELECT key, polarity, subjectivity FROM sentiment WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update((key, (pol, subj)) for key, pol, subj in rows)
+        if found:
+            now = int(time.time())
+            self.conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self.conn.commit()
+        return found
+
+    def put_many(self, items):
+        """Insert {key: (polarity, subjectivity)} entries, then evict down to max_entries."""
+        now = int(time.time())
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sentiment (key, polarity, subjectivity, last_used) VALUES (?, ?, ?, ?)",
+            [(key, pol, subj, now) for key, (pol, subj) in items.items()],
+        )
+        self.conn.commit()
+        self._evict()
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.conn.commit()
+            self.evictions += excess
+
+    # --- Sentiment API ---
+    def sentiment_many(self, texts):
+        """Return [(polarity, subjectivity), ...] for texts, computing only cache misses."""
+        keys = [text_key(t) for t in texts]
+        cached = self.get_many(set(keys))
+        missing = {}
+        from textblob import TextBlob  # imported here: it pulls in NLTK, which is slow to load
+        start = time.perf_counter()
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                blob = TextBlob(normalize_text(text))
+                missing[key] = (blob.sentiment.polarity, blob.sentiment.subjectivity)
+        if missing:
+            record_hotspot("textblob", time.perf_counter() - start, docs=len(missing))
+        if missing:
+            self.put_many(missing)
+            cached.update(missing)
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        return [cached[key] for key in keys]
+
+    def sentiment(self, text):
+        return self.sentiment_many([text])[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"Sentiment cache: {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']:.1%} hit rate), {s['evictions']} evicted")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_cache = None
+
+def get_cache():
+    """Process-wide cache at DEFAULT_CACHE_PATH, opened on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SentimentCache()
+    return _cache
+
+def set_cache(cache):
+    """Replace the process-wide cache (e.g. with a scratch file for benchmarks); returns the previous one."""
+    global _cache
+    previous, _cache = _cache, cache
+    return previous
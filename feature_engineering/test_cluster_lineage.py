@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from feature_engineering.cluster_lineage import build_lineage, cluster_centroids
+
+
+def _fit(labels, directions):
+    ids = [f"p{i}" for i in range(len(labels))]
+    labels = np.asarray(labels)
+    embeddings = np.asarray(directions, dtype=np.float32)[np.maximum(labels, 0)]
+    return pd.Series(labels, index=ids), cluster_centroids(embeddings, labels)
+
+
+def test_relabeled_clusters_keep_stable_ids():
+    axes = np.eye(3)
+    previous, prev_centroids = _fit([0] * 5 + [1] * 5 + [-1] * 2, axes)
+    # Same clusters with swapped HDBSCAN ids
+    current, cur_centroids = _fit([1] * 5 + [0] * 5 + [-1] * 2, axes[[1, 0, 2]])
+    lineage, next_id = build_lineage(previous, current, prev_centroids, cur_centroids, {0: 10, 1: 11}, 12)
+    rows = lineage.set_index("cluster")
+    assert rows.loc[1, "stable_id"] == 10 and rows.loc[0, "stable_id"] == 11
+    assert (rows["status"] == "continued").all()
+    assert next_id == 12
+
+
+def test_split_merge_and_new():
+    axes = np.eye(4)
+    previous, prev_centroids = _fit([0] * 6 + [1] * 3 + [2] * 3 + [-1] * 3, axes)
+    # 0 splits 4/2, 1 and 2 merge, the noise becomes a new cluster
+    directions = [axes[0], (axes[0] + axes[3]) / np.sqrt(2), (axes[1] + axes[2]) / np.sqrt(2), axes[3]]
+    current, cur_centroids = _fit([0] * 4 + [1] * 2 + [2] * 6 + [3] * 3, directions)
+    lineage, next_id = build_lineage(previous, current, prev_centroids, cur_centroids, {0: 0, 1: 1, 2: 2}, 3)
+    rows = lineage.set_index("cluster")
+    assert rows.loc[0, "status"] == "split" and rows.loc[0, "stable_id"] == 0
+    assert rows.loc[1, "status"] == "split" and rows.loc[1, "parents"] == "0"
+    assert rows.loc[2, "status"] == "merged" and rows.loc[2, "parents"] == "1 2"
+    assert rows.loc[3, "status"] == "new" and rows.loc[3, "parents"] == ""
+    assert rows.loc[2, "stable_id"] in (1, 2) and {rows.loc[1, "stable_id"], rows.loc[3, "stable_id"]} == {3, 4}
+    assert next_id == 5
@@ -1,5 +1,5 @@
 import pandas as pd
-from emergent_agency_index import compute_emergent_agency_index
+from feature_engineering.emergent_agency_index import compute_emergent_agency_index
 
 df = pd.DataFrame({
     'post_text': [
@@ -0,0 +1,58 @@
+import numpy as np
+from feature_engineering import feature_registry
+from feature_engineering.feature_registry import (EXTRACTORS, INTERMEDIATES, Batch, FeatureExtractor,
+                                                  extract_features, intermediate, register)
+
+TEXTS = ["I was sure. You never listen!", "", "They always say it. I think so? Today, maybe."]
+
+
+def test_intermediates_are_computed_once_per_batch(monkeypatch):
+    monkeypatch.setattr(feature_registry, "INTERMEDIATES", dict(INTERMEDIATES))
+    monkeypatch.setattr(feature_registry, "EXTRACTORS", dict(EXTRACTORS))
+    calls = []
+
+    @intermediate("test_lengths", requires=("lower",))
+    def lengths(batch):
+        calls.append(len(batch))
+        return np.array([len(text) for text in batch["lower"]])
+
+    @register
+    class Lengths(FeatureExtractor):
+        name = "test_lengths"
+        columns = ("length",)
+        requires = ("test_lengths",)
+
+        def compute(self, batch):
+            return batch["test_lengths"]
+
+    @register
+    class DoubleLengths(Lengths):
+        name = "test_double_lengths"
+        columns = ("double_length",)
+
+        def compute(self, batch):
+            return 2 * batch["test_lengths"]
+
+    matrix, columns = extract_features(TEXTS, ["test_lengths", "test_double_lengths"], batch_size=2)
+    assert columns == ["length", "double_length"]
+    np.testing.assert_array_equal(matrix[:, 0], [len(t) for t in TEXTS])
+    np.testing.assert_array_equal(matrix[:, 1], [2 * len(t) for t in TEXTS])
+    assert calls == [2, 1]  # once per batch, shared by both extractors
+
+
+def test_registered_features_match_per_text_functions():
+    from feature_engineering.emergent_agency_index import EAI_WEIGHTS
+    from feature_engineering.projection_signals import detect_tense_shifts, narrative_rigidity_score
+    from feature_engineering.psych_signals import count_i, count_questions
+
+    matrix, columns = extract_features(TEXTS, ["psych", "projection", "eai"])
+    frame = dict(zip(columns, matrix.T))
+    np.testing.assert_array_equal(frame["i_count"], [count_i(t) for t in TEXTS])
+    np.testing.assert_array_equal(frame["question_mark_count"], [count_questions(t) for t in TEXTS])
+    np.testing.assert_array_equal(frame["narrative_rigidity_score"], [narrative_rigidity_score(t) for t in TEXTS])
+    np.testing.assert_array_equal(frame["tense_shifting_score"], [detect_tense_shifts(t) for t in TEXTS])
+    expected = sum(weight * frame[name] for name, weight in EAI_WEIGHTS.items())
+    np.testing.assert_allclose(frame["emergent_agency_index"], expected)
+    batch = Batch(TEXTS)
+    EXTRACTORS["projection"].batch(TEXTS, batch)
+    assert batch.computed().index("lower") < batch.computed().index("tokens")
@@ -0,0 +1,33 @@
+import numpy as np
+from feature_engineering.feature_store import append_npy
+from feature_engineering.incremental import pending_files, recluster_reason
+
+
+def test_append_npy_grows_in_place(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    first = np.arange(12, dtype=np.float32).reshape(4, 3)
+    np.save(path, first)
+    assert append_npy(path, np.ones((2, 3), dtype=np.float32)) == 6
+    assert append_npy(path, np.full((1, 3), 7, dtype=np.float32)) == 7
+    loaded = np.load(path)
+    assert loaded.shape == (7, 3)
+    np.testing.assert_array_equal(loaded[:4], first)
+    np.testing.assert_array_equal(loaded[6], [7, 7, 7])
+
+
+def test_pending_files_in_batch_order(tmp_path):
+    for name in ["b_posts_20250102_000000.jsonl", "a_posts_20250103_000000.jsonl", "c_posts_20250101_000000.jsonl"]:
+        (tmp_path / name).write_text("{}\n")
+    state = {"files": {"c_posts_20250101_000000.jsonl": {"size": 3}}}
+    assert [p.name for p in pending_files(tmp_path, state)] == [
+        "b_posts_20250102_000000.jsonl", "a_posts_20250103_000000.jsonl"]
+
+
+def test_recluster_reason_volume_and_drift():
+    state = {"fit": {"rows": 1000, "noise_fraction": 0.2}, "since_fit": {"rows": 100, "noise": 30}}
+    assert recluster_reason(state, 0.25, 0.1, 500) is None
+    state["since_fit"] = {"rows": 300, "noise": 60}
+    assert "new rows" in recluster_reason(state, 0.25, 0.1, 500)
+    state["since_fit"] = {"rows": 200, "noise": 80}
+    assert "noise fraction" in recluster_reason(state, 0.25, 0.1, 100)
+    assert recluster_reason({"fit": None}, 0.25, 0.1, 100) == "no fitted model"
@@ -0,0 +1,55 @@
+import re
+import numpy as np
+from feature_engineering.lexicon import LEXICONS, LexiconEngine
+from feature_engineering.psych_signals import count_i, count_negations, count_temporal
+
+SAMPLES = [
+    "I don't know if I did the right thing.",
+    "Sometimes I wonder if there's meaning to all this. Never again, never.",
+    "Just another day, just another post.",
+    "I regret what I said, but I meant it in the moment.",
+    "You ALWAYS do this. Obviously you should have known; clearly I was wrong n't no NOT.",
+    "i think i feel like i was fine yesterday, today is a new day... I Was. I HAD. Is it?",
+    "Nevertheless, the shouldn't-haves and alright things kept coming — every week, month and decade.",
+    "My mine me. Me? MY! I'm i'd ghosting existentially; purpose-driven identity death.",
+    "",
+    "n't n'tn't x n't 'n't don't ain't",
+]
+
+
+def rigidity_reference(text):
+    return sum(text.lower().count(word) for word in LEXICONS["narrative_rigidity_score"]["terms"])
+
+
+def tense_reference(text):
+    past = len(re.findall(r"\b(was|had|did|felt|said|thought)\b", text.lower()))
+    present = len(re.findall(r"\b(is|has|do|feel|say|think)\b", text.lower()))
+    return past, present
+
+
+def eai_reference(text):
+    clean_text = text.lower()
+    first_person = len(re.findall(r'\b(i|my|me|mine)\b', clean_text))
+    ethical = sum(1 for word in LEXICONS["ethical_keywords"]["terms"] if word in clean_text)
+    existential = sum(1 for word in LEXICONS["existential_keywords"]["terms"] if word in clean_text)
+    return first_person, ethical, existential
+
+
+def test_lexicon_parity_with_existing_functions():
+    counts = LexiconEngine().count_frame(SAMPLES)
+    for row, text in enumerate(SAMPLES):
+        got = counts.iloc[row]
+        assert got["i_count"] == count_i(text), text
+        assert got["negation_count"] == count_negations(text), text
+        assert got["temporal_refs"] == count_temporal(text), text
+        assert got["narrative_rigidity_score"] == rigidity_reference(text), text
+        assert (got["past_tense"], got["present_tense"]) == tense_reference(text), text
+        assert (got["first_person"], got["ethical_keywords"], got["existential_keywords"]) == eai_reference(text), text
+
+
+def test_count_matrix_is_stable_across_batches():
+    engine = LexiconEngine()
+    first = engine.count_matrix(SAMPLES)
+    second = engine.count_matrix(SAMPLES[::-1])[::-1]
+    assert first.shape == (len(SAMPLES), len(LEXICONS))
+    np.testing.assert_array_equal(first, second)
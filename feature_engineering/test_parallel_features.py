@@ -0,0 +1,24 @@
+import numpy as np
+from benchmarks.synthetic_corpus import iter_posts
+from feature_engineering.feature_registry import extract_features
+from feature_engineering.parallel_features import chunk_bounds
+from feature_engineering.sentiment_cache import SentimentCache, set_cache
+
+
+def test_chunk_bounds_cover_every_row_once():
+    bounds = chunk_bounds(10_001, workers=4)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 10_001
+    assert all(stop == next_start for (_, stop), (next_start, _) in zip(bounds, bounds[1:]))
+    assert len(chunk_bounds(10, workers=32)) == 1
+
+
+def test_parallel_matches_serial_in_input_order(tmp_path):
+    texts = [f"{post['title']} {post['selftext']}" for post in iter_posts(1_000, seed=5)]
+    previous = set_cache(SentimentCache(tmp_path / "sentiment.sqlite"))
+    try:
+        serial, columns = extract_features(texts, ["psych", "projection", "eai"])
+        parallel, parallel_columns = extract_features(texts, ["psych", "projection", "eai"], workers=3)
+    finally:
+        set_cache(previous)
+    assert parallel_columns == columns
+    np.testing.assert_array_equal(parallel, serial)
@@ -0,0 +1,36 @@
+import numpy as np
+from feature_engineering.quantized_embeddings import _knn, open_embeddings, quantized_paths, write_quantized
+
+
+def make_embeddings(tmp_path, n=500, dim=48):
+    vectors = np.random.default_rng(0).normal(size=(n, dim)).astype(np.float32)
+    vectors[7] = 0  # an all-zero row must survive the round trip
+    path = tmp_path / "embeddings.npy"
+    np.save(path, vectors)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return path, unit
+
+
+def test_round_trip_is_memory_mapped_and_close(tmp_path):
+    path, unit = make_embeddings(tmp_path)
+    for storage, tolerance in (("float16", 1e-3), ("int8", 1e-2)):
+        quantized = write_quantized(path, storage, chunk_size=128)
+        assert isinstance(quantized.codes, np.memmap) and quantized.codes.dtype == np.dtype(storage)
+        assert quantized.shape == unit.shape and quantized.nbytes < unit.nbytes / 1.9
+        restored = quantized[:]
+        assert restored.dtype == np.float32
+        np.testing.assert_allclose(restored, unit, atol=tolerance)
+        np.testing.assert_array_equal(restored[7], 0)
+        np.testing.assert_array_equal(quantized[[3, 1, 400]], restored[[3, 1, 400]])
+        np.testing.assert_array_equal(np.concatenate([block for _, block in quantized.iter_batches(64)]), restored)
+        assert not quantized_paths(path, storage)[0].with_name(quantized_paths(path, storage)[0].name + ".tmp").exists()
+
+
+def test_int8_keeps_nearest_neighbours(tmp_path):
+    path, unit = make_embeddings(tmp_path)
+    write_quantized(path, "int8")
+    restored = open_embeddings(path, "int8")[:]
+    reference, approx = _knn(unit, 10), _knn(restored, 10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(reference.tolist(), approx.tolist())])
+    assert recall > 0.9
+    assert isinstance(open_embeddings(path), np.memmap)
@@ -0,0 +1,23 @@
+import numpy as np
+from feature_engineering.sampled_clustering import agreement_report, stratified_sample
+
+
+def test_stratified_sample_keeps_small_regions():
+    rng = np.random.default_rng(0)
+    big = rng.normal(size=(5000, 8)) + np.eye(8)[0] * 10
+    small = rng.normal(size=(20, 8)) - np.eye(8)[0] * 10
+    embeddings = np.vstack([big, small]).astype(np.float32)
+
+    positions = stratified_sample(embeddings, 200, n_strata=8, chunk_size=1000)
+    assert np.all(np.diff(positions) > 0)
+    assert 150 <= len(positions) <= 250
+    assert (positions >= len(big)).any()
+
+
+def test_agreement_report_ignores_label_permutation():
+    full = np.array([0, 0, 1, 1, 2, 2, -1, -1])
+    sample = np.array([2, 2, 0, 0, 1, 1, -1, -1])
+    report = agreement_report(full, sample)
+    assert report["adjusted_rand"] == 1.0
+    assert report["noise_agreement"] == 1.0
+    assert report["full_clusters"] == report["sample_clusters"] == 3
@@ -0,0 +1,71 @@
+import numpy as np
+from feature_engineering import sentence_engine
+from feature_engineering.sentence_engine import (SentenceTable, doc_key, polarity_trajectory, sentence_table,
+                                                 tense_shifts, valence_variance)
+
+# Sentences per document, including empty and single-sentence documents
+POLARITY = [[0.5, -0.2, 0.1, 0.9, -0.4], [], [0.3], [0.0, 0.2, -0.6, 0.4, 0.4, 0.1, -0.9], [0.2, -0.2]]
+PAST = [[1, 0, 2, 0, 1], [], [1], [0, 1, 1, 0, 2, 0, 0], [0, 0]]
+PRESENT = [[0, 1, 0, 0, 0], [], [0], [1, 0, 1, 2, 0, 0, 1], [0, 0]]
+
+
+def make_table(texts=None):
+    texts = texts or [f"doc {i}" for i in range(len(POLARITY))]
+    counts = [len(p) for p in POLARITY]
+    flat = lambda rows: [v for row in rows for v in row]
+    starts = flat([list(range(n)) for n in counts])
+    return SentenceTable([doc_key(t) for t in texts], np.concatenate([[0], np.cumsum(counts)]), starts,
+                         [s + 1 for s in starts], flat(POLARITY), flat(PAST), flat(PRESENT))
+
+
+def chunked_variance_reference(polarity, chunk_size=3):
+    chunks = [polarity[i:i + chunk_size] for i in range(0, len(polarity), chunk_size)]
+    means = [np.mean(chunk) for chunk in chunks if chunk]
+    return np.var(means) if len(means) > 1 else 0.0
+
+def tense_shifts_reference(past, present):
+    tenses = [np.sign(p - q) for p, q in zip(past, present) if p != q]
+    return sum(a != b for a, b in zip(tenses, tenses[1:]))
+
+
+def test_vectorized_features_match_per_document_loops():
+    table = make_table()
+    for chunk_size in (1, 2, 3):
+        np.testing.assert_allclose(valence_variance(table, chunk_size),
+                                   [chunked_variance_reference(p, chunk_size) for p in POLARITY], atol=1e-12)
+    np.testing.assert_array_equal(tense_shifts(table), [tense_shifts_reference(*d) for d in zip(PAST, PRESENT)])
+    slope, arc = polarity_trajectory(table)
+    np.testing.assert_allclose(slope, [np.polyfit(np.arange(len(p)), p, 1)[0] if len(p) > 1 else 0.0
+                                       for p in POLARITY], atol=1e-12)
+    np.testing.assert_allclose(arc, [p[-1] - p[0] if p else 0.0 for p in POLARITY])
+    assert [list(p) for p in table.split(table.polarity)] == POLARITY
+
+
+def test_take_concat_and_persistence_round_trip(tmp_path):
+    table = make_table()
+    rows = [3, 0, 1]
+    taken = table.take(rows)
+    assert [list(p) for p in taken.split(taken.polarity)] == [POLARITY[r] for r in rows]
+    joined = SentenceTable.concat([table.take([4]), taken])
+    np.testing.assert_array_equal(joined.find(table.keys[[0, 4, 2]]), [2, 0, -1])
+
+    table.save(tmp_path / "sentences.npz")
+    loaded = SentenceTable.load(tmp_path / "sentences.npz")
+    for name in ("keys", "doc_offsets", "starts", "ends", "polarity", "past", "present"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(table, name))
+
+
+def test_stored_documents_are_not_segmented_again(monkeypatch):
+    texts = [f"doc {i}" for i in range(len(POLARITY))]
+    store = make_table(texts)
+    segmented = []
+
+    def fake_segment(batch):
+        segmented.extend(batch)
+        return make_table([*batch, *texts[len(batch):]]).take(range(len(batch)))
+
+    monkeypatch.setattr(sentence_engine, "segment", fake_segment)
+    result = sentence_table(["new text", texts[3], texts[0]], store)
+    assert segmented == ["new text"]
+    np.testing.assert_array_equal(result.keys, [doc_key(t) for t in ["new text", texts[3], texts[0]]])
+    assert [list(p) for p in result.split(result.polarity)] == [POLARITY[0], POLARITY[3], POLARITY[0]]
@@ -1,3 +1,12 @@
-from .auto_label import *
-from .review_labels import *
-from .assemble_profiles import *
+# Names of the labeling entry points, re-exported on first access so that importing the package
+# (or any submodule) does not import all three scripts and their dependencies.
+_EXPORTS = ("auto_label", "review_labels", "assemble_profiles")
+
+
+def __getattr__(name):
+    import importlib
+    for module_name in _EXPORTS:
+        module = importlib.import_module(f"{__name__}.{module_name}")
+        if not name.startswith("_") and hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
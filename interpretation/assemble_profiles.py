@@ -1,15 +1,16 @@
+import argparse
 import os
 import yaml
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
+from interpretation.label_lineage import apply_lineage
+from utils.instrumentation import add_profile_argument, stage_run
 
 # === Configuration ===
 FINALS_DIR = Path('./outputs/cluster_labels/finals/')
 PROFILES_DIR = Path('./outputs/profiles/')
-
-# Create profiles directory if not exists
-PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+CLUSTER_DATA_PATH = Path('./data/processed/reddit_with_clusters_signals_final.csv')
 
 # === Utility Functions ===
 
@@ -32,7 +33,32 @@ def save_markdown(content: str, path: Path):
     except Exception as e:
         print(f"[!] Failed to save Markdown {path}: {e}")
 
-def assemble_markdown(cluster_data: Dict) -> str:
+def load_cluster_posts(path: Path = CLUSTER_DATA_PATH) -> Dict:
+    """
+    {cluster_id: posts} for the profiles: typical posts from embedding space, or the
+    most polarised ones (from auto_label's stats cache) without a feature store.
+    Empty if the labeling table is missing.
+    """
+    if not path.exists():
+        return {}
+    from interpretation.auto_label import load_data, load_representative_posts, load_stats
+    df = load_data(path)
+    posts = load_representative_posts(df)
+    if posts is not None:
+        return posts
+    stats = load_stats(path, df)
+    return {cluster_id: stats.top_posts(cluster_id) for cluster_id in stats.cluster_ids()}
+
+def format_posts(posts: List[Dict]) -> str:
+    if not posts:
+        return '(*No representative posts available.*)'
+    return '\n\n'.join(
+        f"{i}. {' '.join(str(post.get('text') or '').split())}\n   *Valence: {post.get('valence')} | "
+        f"Complexity: {post.get('complexity')}*"
+        for i, post in enumerate(posts, 1)
+    )
+
+def assemble_markdown(cluster_data: Dict, posts: List[Dict] = None) -> str:
     cluster_id = cluster_data.get('cluster_id', 'Unknown ID')
     label = cluster_data.get('label', 'No Label')
     traits = cluster_data.get('traits', [])
@@ -59,7 +85,7 @@ def assemble_markdown(cluster_data: Dict) -> str:
 ---
 
 ## Top Example Posts
-(*Placeholder: integrate top posts if available.*)
+{format_posts(posts)}
 
 ---
 
@@ -72,8 +98,11 @@ def process_clusters():
 
     if not final_files:
         print("[!] No final labeled YAML files found.")
-        return
+        return 0
+
+    cluster_posts = load_cluster_posts()
 
+    exported = 0
     for yaml_path in final_files:
         data = load_yaml(yaml_path)
         if not data:
@@ -84,15 +113,26 @@ def process_clusters():
             print(f"[!] Skipping {yaml_path.name}: Missing cluster_id.")
             continue
 
-        profile_markdown = assemble_markdown(data)
+        posts = cluster_posts.get(int(cluster_id), data.get('sample_posts'))
+        profile_markdown = assemble_markdown(data, posts)
         output_path = PROFILES_DIR / f"cluster_{cluster_id}.md"
         save_markdown(profile_markdown, output_path)
         print(f"[✓] Profile exported: {output_path.name}")
+        exported += 1
+    return exported
 
 def main():
-    print("=== Cluster Profile Assembly Started ===")
-    process_clusters()
-    print("=== Cluster Profile Assembly Complete ===")
+    parser = argparse.ArgumentParser(description="Assemble Markdown profiles from reviewed cluster labels")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    with stage_run("assemble_profiles", args.profile) as run:
+        print("=== Cluster Profile Assembly Started ===")
+        apply_lineage()
+        exported = process_clusters()
+        run.rows(rows_in=len(list(FINALS_DIR.glob('*.yaml'))), rows_out=exported)
+        print("=== Cluster Profile Assembly Complete ===")
 
 if __name__ == "__main__":
     main()
@@ -6,22 +6,30 @@ Loads clustered posts, extracts top features and representative posts,
 queries LLM, and saves results as draft YAML files in outputs/cluster_labels/.
 """
 
+import argparse
+import hashlib
 import os
 import pandas as pd
 import yaml
 from collections import Counter
-import anthropic
 import decimal
+from interpretation import label_engine
+from interpretation.cluster_stats import CACHE_DIR, ClusterStats
+from interpretation.label_lineage import REVIEW_STATUSES, apply_lineage, lineage_by_cluster
+from interpretation.llm_cache import ResponseCache, response_key
+from interpretation.representatives import representative_posts, representatives_for_table
+from utils.instrumentation import add_profile_argument, hotspot, stage_run
+from utils.lazy import shared
 
 # === CONFIG ===
-client = anthropic.Anthropic()
 CLUSTER_DATA_PATH = './data/processed/reddit_with_clusters_signals_final.csv'
 OUTPUT_DIR = './outputs/cluster_labels/'
+FINALS_DIR = './outputs/cluster_labels/finals/'
 MODEL_NAME = 'claude-3-opus-20240229'
 TOP_N_POSTS = 3
-
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+MAX_TOKENS = 1000
+TEMPERATURE = 0.3
+SYSTEM_PROMPT = "You are a clinical psychological profiler."
 
 def clean_for_yaml(obj):
     """Recursively convert Decimals and floats for YAML dumping."""
@@ -38,27 +46,46 @@ def load_data(path):
     df = pd.read_csv(path)
     if 'cluster' not in df.columns:
         raise ValueError("Cluster column missing.")
+    # merge_all writes a single sentiment column pair; older hand-merged tables carry it suffixed with _y
+    for col in ('sentiment_polarity', 'sentiment_subjectivity'):
+        if f'{col}_y' not in df.columns and col in df.columns:
+            df[f'{col}_y'] = df[col]
     return df
 
-def extract_top_posts(df, cluster_id, n=TOP_N_POSTS):
-    subset = df[df['cluster'] == cluster_id].copy()
-    subset['signal_score'] = subset['sentiment_polarity_y'].abs()
-    top = subset.nlargest(n, 'signal_score')
-    return [
-        {
-            'text': row['selftext'][:500],
-            'valence': row.get('sentiment_polarity_y'),
-            'complexity': row.get('sentiment_subjectivity_y'),
-            'detected_defenses': None
-        } for _, row in top.iterrows()
-    ]
-
-def summarize_traits(df, cluster_id):
-    subset = df[df['cluster'] == cluster_id]
+POST_FIELDS = {'text': 'selftext', 'valence': 'sentiment_polarity_y',
+               'complexity': 'sentiment_subjectivity_y', 'detected_defenses': None}
+
+def load_stats(path, df=None, cache_dir=CACHE_DIR):
+    """Per-cluster stats for the labeling table (posts ranked by absolute polarity), cached on disk."""
+    return ClusterStats.for_table(
+        path,
+        score_columns=['sentiment_polarity_y'],
+        post_fields=POST_FIELDS,
+        df=df,
+        read=load_data,
+        cache_dir=cache_dir,
+        n_posts=TOP_N_POSTS,
+    )
+
+def extract_top_posts(stats, cluster_id, n=TOP_N_POSTS):
+    """The cluster's most extreme posts by absolute polarity."""
+    return stats.top_posts(cluster_id, n)
+
+def load_representative_posts(df, n=TOP_N_POSTS):
+    """
+    {cluster_id: posts} of typical posts chosen in embedding space (medoid, then
+    maximal marginal relevance); None if the feature store is not available.
+    """
+    representatives = representatives_for_table(df, n=n)
+    if representatives is None:
+        return None
+    return representative_posts(df, representatives, POST_FIELDS, n)
+
+def summarize_traits(stats, cluster_id):
     traits = {
-        'avg_sentiment_polarity': subset['sentiment_polarity_y'].mean() if 'sentiment_polarity_y' in subset else None,
-        'avg_sentiment_subjectivity': subset['sentiment_subjectivity_y'].mean() if 'sentiment_subjectivity_y' in subset else None,
-        'avg_word_count': subset['word_count'].mean() if 'word_count' in subset else None
+        'avg_sentiment_polarity': stats.mean(cluster_id, 'sentiment_polarity_y'),
+        'avg_sentiment_subjectivity': stats.mean(cluster_id, 'sentiment_subjectivity_y'),
+        'avg_word_count': stats.mean(cluster_id, 'word_count')
     }
     return traits
 
@@ -93,13 +120,19 @@ Return strictly:
 """
     return prompt
 
+@shared
+def get_client():
+    """Create the Anthropic client on first use, so importing this module needs no API key."""
+    import anthropic
+    return anthropic.Anthropic()
+
 def query_llm(prompt):
     try:
-        response = client.messages.create(
+        response = get_client().messages.create(
             model=MODEL_NAME,
-            max_tokens=1000,
-            temperature=0.3,
-            system="You are a clinical psychological profiler.",
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
+            system=SYSTEM_PROMPT,
             messages=[
                 {"role": "user", "content": prompt}
             ]
@@ -174,8 +207,12 @@ def save_yaml(cluster_id, label_data):
         'cluster_id': label_data['cluster_id'],
         'label': label_data['label'],
         'traits': label_data['traits'],
-        'structure': label_data['structure']
+        'structure': label_data['structure'],
+        'fingerprint': label_data.get('fingerprint'),
     }
+    if label_data.get('lineage'):
+        safe_yaml['stable_id'] = label_data['lineage']['stable_id']
+        safe_yaml['lineage'] = label_data['lineage']
 
     output_path = os.path.join(OUTPUT_DIR, f'cluster_{cluster_id}_label_draft.yaml')
 
@@ -186,30 +223,169 @@ def save_yaml(cluster_id, label_data):
     except Exception as e:
         print(f"[X] Failed to save YAML for cluster {cluster_id}: {e}")
 
-def main():
-    df = load_data(CLUSTER_DATA_PATH)
-    cluster_ids = sorted(df['cluster'].dropna().unique())
-
-    cluster_ids = [cid for cid in cluster_ids if cid >= 0]
-
+def cluster_fingerprint(member_ids, prompt):
+    """
+    Hash of the cluster's sorted member ids (empty when the table has no id
+    column) and the prompt built from it; a rerun with the same fingerprint
+    would send the model the same request for the same posts.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update('\n'.join(sorted(member_ids)).encode('utf-8'))
+    h.update(b'\0')
+    h.update(f"{MODEL_NAME}|{MAX_TOKENS}|{TEMPERATURE}|{SYSTEM_PROMPT}|{prompt}".encode('utf-8'))
+    return h.hexdigest()
+
+def existing_label(cluster_id):
+    """The cluster's final (preferred) or draft YAML as a dict, or None."""
+    # review_labels moves accepted drafts into FINALS_DIR under the same file name
+    for directory in (FINALS_DIR, OUTPUT_DIR):
+        path = os.path.join(directory, f'cluster_{cluster_id}_label_draft.yaml')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return yaml.safe_load(f) or {}
+    return None
+
+def existing_fingerprint(cluster_id):
+    """Fingerprint stored in the cluster's final (preferred) or draft YAML, if any."""
+    return (existing_label(cluster_id) or {}).get('fingerprint')
+
+def is_current(job, label):
+    """
+    Whether an existing label can stand: its fingerprint matches, or it was
+    carried forward from a cluster that continued unchanged into this fit.
+    New, split and merged clusters are relabeled.
+    """
+    if label is None:
+        return False
+    if label.get('fingerprint') == job['fingerprint']:
+        return True
+    lineage = label.get('lineage') or {}
+    return lineage.get('status') == 'continued' and lineage.get('version') == (job.get('lineage') or {}).get('version')
+
+def build_jobs(df, stats, cluster_ids, representatives=None):
+    """
+    One labeling job per cluster: the prompt plus the traits and posts it was built from.
+    Posts come from representatives ({cluster_id: posts}) when given, else the extremes in stats.
+    """
+    members = {}
+    if 'id' in df.columns:
+        members = df['id'].astype(str).groupby(df['cluster']).agg(list).to_dict()
+    jobs = []
     for cluster_id in cluster_ids:
-        traits = summarize_traits(df, cluster_id)
-        posts = extract_top_posts(df, cluster_id)
+        traits = summarize_traits(stats, cluster_id)
+        if representatives is not None and cluster_id in representatives:
+            posts = representatives[cluster_id]
+        else:
+            posts = extract_top_posts(stats, cluster_id)
         prompt = build_prompt(cluster_id, traits, posts)
-        print(f"\n--- Cluster {cluster_id} ---\nPrompting LLM...")
-        llm_text = query_llm(prompt)
+        jobs.append({
+            'cluster_id': int(cluster_id),
+            'traits': traits,
+            'posts': posts,
+            'prompt': prompt,
+            'fingerprint': cluster_fingerprint(members.get(cluster_id, []), prompt),
+        })
+    return jobs
+
+def save_result(job, result):
+    """Parse and save one finished label as soon as it arrives."""
+    cluster_id = job['cluster_id']
+    if result['text'] is None:
+        print(f"[X] Cluster {cluster_id} failed after {result['attempts']} attempt(s): {result['error']}")
+        return
+    label_data = parse_llm_output(result['text'])
+    label_data['cluster_id'] = cluster_id
+    label_data['fingerprint'] = job['fingerprint']
+    label_data['lineage'] = job.get('lineage')
+    label_data['dominant_traits'] = job['traits']
+    label_data['sample_posts'] = job['posts']
+    save_yaml(cluster_id, label_data)
+    print(f"Cluster {cluster_id} labeled as: {label_data['label']} "
+          f"({result['seconds']:.1f}s, {result['attempts']} attempt(s))")
 
-        print("\nClaude raw output:\n", llm_text)
-
-        label_data = parse_llm_output(llm_text)
-        label_data['cluster_id'] = int(cluster_id)
-        label_data['dominant_traits'] = traits
-        label_data['sample_posts'] = posts
-
-        print(label_data)
-
-        save_yaml(cluster_id, label_data)
-        print(f"Cluster {cluster_id} labeled as: {label_data['label']}")
+def main():
+    parser = argparse.ArgumentParser(description="Draft cluster labels with an LLM")
+    parser.add_argument("--input", type=str, default=CLUSTER_DATA_PATH, help="Clustered posts with signals (CSV)")
+    parser.add_argument("--concurrency", type=int, default=label_engine.DEFAULT_CONCURRENCY,
+                        help="Requests in flight at once")
+    parser.add_argument("--rpm", type=int, default=label_engine.DEFAULT_RPM, help="Requests per minute limit")
+    parser.add_argument("--input-tpm", type=int, default=label_engine.DEFAULT_INPUT_TPM,
+                        help="Input tokens per minute limit")
+    parser.add_argument("--max-retries", type=int, default=label_engine.DEFAULT_MAX_RETRIES,
+                        help="Retries per cluster on 429/5xx/connection errors")
+    parser.add_argument("--base-url", type=str, default=None,
+                        help="API base URL (e.g. a local stand_in_llm_server for testing)")
+    parser.add_argument("--force", action="store_true",
+                        help="Relabel clusters whose label matches their fingerprint or was carried forward")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached responses and always call the model")
+    parser.add_argument("--posts", choices=["representative", "extreme"], default="representative",
+                        help="Prompt with typical posts from embedding space, or the most polarised ones")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with stage_run("auto_label", args.profile) as run:
+        # Rename labels from the previous fit's cluster ids to this fit's before comparing anything
+        lineage = lineage_by_cluster(apply_lineage())
+        df = load_data(args.input)
+        cluster_ids = sorted(df['cluster'].dropna().unique())
+
+        cluster_ids = [cid for cid in cluster_ids if cid >= 0]
+        representatives = None
+        if args.posts == "representative":
+            representatives = load_representative_posts(df)
+            if representatives is None:
+                print("No feature store found; prompting with the most polarised posts instead")
+        jobs = build_jobs(df, load_stats(args.input, df), cluster_ids, representatives)
+        cache = ResponseCache()
+
+        skipped, cached, pending = [], [], []
+        for job in jobs:
+            job['cache_key'] = response_key(MODEL_NAME, SYSTEM_PROMPT, job['prompt'], MAX_TOKENS, TEMPERATURE)
+            label = existing_label(job['cluster_id'])
+            job['lineage'] = lineage.get(job['cluster_id'])
+            if label and (label.get('lineage') or {}).get('version') == (job['lineage'] or {}).get('version'):
+                job['lineage'] = label['lineage']  # keeps the carried-forward previous_label for review
+            if not args.force and is_current(job, label):
+                skipped.append(job)
+                continue
+            text = None if args.no_cache else cache.get(job['cache_key'])
+            if text is not None:
+                save_result(job, {'text': text, 'attempts': 0, 'seconds': 0.0})
+                cached.append(job)
+            else:
+                pending.append(job)
+        print(f"{len(skipped)} clusters unchanged, {len(cached)} answered from cache, {len(pending)} to label")
+        flagged = [j for j in pending if (j['lineage'] or {}).get('status') in REVIEW_STATUSES[1:]]
+        if flagged:
+            print(f"{len(flagged)} split or merged clusters will need review: "
+                  + ", ".join(str(j['cluster_id']) for j in flagged))
+
+        def on_result(job, result):
+            if result['text'] is not None:
+                cache.put(job['cache_key'], MODEL_NAME, result['text'])
+            save_result(job, result)
+
+        results = []
+        if pending:
+            print(f"Labeling {len(pending)} clusters ({args.concurrency} concurrent, {args.rpm} requests/min)...")
+            with hotspot("llm_query", docs=len(pending)):
+                results = label_engine.label_clusters(
+                    pending, on_result=on_result, base_url=args.base_url,
+                    model=MODEL_NAME, system=SYSTEM_PROMPT, max_tokens=MAX_TOKENS, temperature=TEMPERATURE,
+                    concurrency=args.concurrency, rpm=args.rpm, input_tpm=args.input_tpm, max_retries=args.max_retries,
+                )
+        cache.close()
+
+        failed = [r for r in results if r['error'] is not None]
+        print(f"\nSkipped (unchanged): {len(skipped)} | Cache hits: {len(cached)} | "
+              f"Fresh calls: {len(results) - len(failed)} ({sum(r['attempts'] for r in results)} requests) | "
+              f"Failed: {len(failed)}")
+        for r in failed:
+            print(f"  cluster {r['cluster_id']}: {r['error']}")
+        run.rows(rows_in=len(df), rows_out=len(cached) + len(results) - len(failed))
+        run.extra.update(skipped_clusters=len(skipped), cache_hits=len(cached), fresh_calls=len(results) - len(failed),
+                         failed_clusters=[r['cluster_id'] for r in failed])
 
 if __name__ == '__main__':
     main()
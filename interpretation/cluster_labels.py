@@ -10,16 +10,15 @@ No toy academic toybox but real psycho-symbolic machine
 
 import pandas as pd
 import os
-from collections import Counter
 import yaml
+from interpretation.cluster_stats import ClusterStats
+from interpretation.representatives import representative_posts, representatives_for_table
+from utils.instrumentation import stage_run
 
 # Configurable Paths
 CLUSTER_DATA_PATH = './data/processed/clustered_data.csv'  # Adjust if necessary
 OUTPUT_DIR = './output/cluster_labels/'
 
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 def load_cluster_data(path: str) -> pd.DataFrame:
     """Load clustered data from CSV."""
     df = pd.read_csv(path)
@@ -27,39 +26,38 @@ def load_cluster_data(path: str) -> pd.DataFrame:
         raise ValueError("Cluster column missing in dataset.")
     return df
 
-def extract_dominant_traits(df: pd.DataFrame, cluster_id: int) -> dict:
+POST_FIELDS = {'text': 'text', 'valence': 'valence', 'complexity': 'complexity',
+               'detected_defenses': 'detected_defenses'}
+
+def load_cluster_stats(path: str, df: pd.DataFrame = None) -> ClusterStats:
+    """Per-cluster stats in one grouped pass, posts ranked by extremity of valence and complexity."""
+    return ClusterStats.for_table(
+        path,
+        score_columns=['valence', 'complexity'],
+        post_fields=POST_FIELDS,
+        df=df,
+    )
+
+def extract_dominant_traits(stats: ClusterStats, cluster_id: int) -> dict:
     """Extract dominant psychological features for a given cluster."""
-    subset = df[df['cluster'] == cluster_id]
     traits = {}
-    
-    if 'valence' in subset.columns:
-        traits['avg_valence'] = subset['valence'].mean()
-    if 'complexity' in subset.columns:
-        traits['avg_complexity'] = subset['complexity'].mean()
-    if 'detected_defenses' in subset.columns:
-        defenses = sum(subset['detected_defenses'].dropna().apply(eval).tolist(), [])
-        traits['common_defenses'] = Counter(defenses).most_common(5)
+    means = stats.clusters[int(cluster_id)]['means']
+
+    if 'valence' in means:
+        traits['avg_valence'] = means['valence']
+    if 'complexity' in means:
+        traits['avg_complexity'] = means['complexity']
+    if 'detected_defenses' in stats.params['columns']:
+        traits['common_defenses'] = stats.common_defenses(cluster_id, 5)
 
     return traits
 
-def select_representative_posts(df: pd.DataFrame, cluster_id: int, n_posts: int = 3) -> list:
-    """Select top-N posts based on extremity of psychological signals."""
-    subset = df[df['cluster'] == cluster_id]
-    if subset.empty:
-        return []
-
-    subset['signal_score'] = subset[['valence', 'complexity']].abs().sum(axis=1)
-    top_posts = subset.nlargest(n_posts, 'signal_score')
-
-    samples = []
-    for _, row in top_posts.iterrows():
-        samples.append({
-            'text': row['text'][:500],  # Clip long posts for readability
-            'valence': row.get('valence', None),
-            'complexity': row.get('complexity', None),
-            'detected_defenses': row.get('detected_defenses', None)
-        })
-    return samples
+def select_representative_posts(stats: ClusterStats, cluster_id: int, n_posts: int = 3,
+                                representatives: dict = None) -> list:
+    """Typical posts from embedding space when available, else top-N by extremity of psychological signals."""
+    if representatives is not None and cluster_id in representatives:
+        return representatives[cluster_id][:n_posts]
+    return stats.top_posts(cluster_id, n_posts)
 
 def save_cluster_label_yaml(cluster_id: int, label: str, dominant_traits: dict, sample_posts: list):
     """Save cluster label and traits as YAML file."""
@@ -85,14 +83,22 @@ def manual_labeling_prompt(cluster_id: int, dominant_traits: dict, sample_posts:
     return label
 
 def main():
-    df = load_cluster_data(CLUSTER_DATA_PATH)
-    cluster_ids = sorted(df['cluster'].dropna().unique())
-
-    for cluster_id in cluster_ids:
-        dominant_traits = extract_dominant_traits(df, cluster_id)
-        sample_posts = select_representative_posts(df, cluster_id)
-        label = manual_labeling_prompt(cluster_id, dominant_traits, sample_posts)
-        save_cluster_label_yaml(cluster_id, label, dominant_traits, sample_posts)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with stage_run("cluster_labels") as run:
+        df = load_cluster_data(CLUSTER_DATA_PATH)
+        stats = load_cluster_stats(CLUSTER_DATA_PATH, df)
+        cluster_ids = stats.cluster_ids()
+        representatives = None
+        if 'id' in df.columns:
+            found = representatives_for_table(df, n=3)
+            representatives = representative_posts(df, found, POST_FIELDS, 3) if found is not None else None
+
+        for cluster_id in cluster_ids:
+            dominant_traits = extract_dominant_traits(stats, cluster_id)
+            sample_posts = select_representative_posts(stats, cluster_id, representatives=representatives)
+            label = manual_labeling_prompt(cluster_id, dominant_traits, sample_posts)
+            save_cluster_label_yaml(cluster_id, label, dominant_traits, sample_posts)
+        run.rows(rows_in=len(df), rows_out=len(cluster_ids))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,165 @@
+"""
+cluster_stats.py
+
+Per-cluster statistics for the interpretation scripts, computed for every
+cluster in one grouped pass instead of re-filtering the table per cluster:
+sizes, means and quantiles of the numeric columns, the top-N posts by signal
+strength, and defense frequencies. Results are cached on disk next to the
+other pipeline caches, keyed by the input file and the parameters.
+"""
+
+import ast
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+CACHE_DIR = Path("data/cache/cluster_stats")
+QUANTILES = (0.1, 0.5, 0.9)
+POST_CHARS = 500  # posts are clipped for prompts and profiles
+
+
+def parse_defenses(value):
+    """A detected_defenses cell ("['denial', 'projection']") as a list; unparseable cells give []."""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return list(parsed) if isinstance(parsed, (list, tuple, set)) else [parsed]
+
+def _plain(value):
+    """numpy scalars to Python ones, NaN to None, so stats serialize to JSON and YAML cleanly."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def format_post(row, post_fields):
+    """A post dict from a table row: post_fields maps post keys to columns (None or absent gives None)."""
+    post = {}
+    for key, column in post_fields.items():
+        value = _plain(row[column]) if column in row.index else None
+        if key == "text" and isinstance(value, str):
+            value = value[:POST_CHARS]
+        post[key] = value
+    return post
+
+
+class ClusterStats:
+    """
+    Statistics for all clusters of a table. score_columns rank posts (sum of
+    absolute values, largest first); post_fields maps the keys of each returned
+    post to table columns, with None for keys the table does not carry.
+    """
+
+    def __init__(self, clusters, params=None):
+        self.clusters = clusters  # {cluster_id: {"size", "means", "quantiles", "top_posts", "defenses"}}
+        self.params = params or {}
+
+    @classmethod
+    def compute(cls, df, score_columns, post_fields, n_posts=3, defenses_column="detected_defenses",
+                quantiles=QUANTILES):
+        df = df[df["cluster"].notna()].reset_index(drop=True)
+        clusters = df["cluster"].astype(int)
+        numeric = [c for c in df.select_dtypes("number").columns if c != "cluster"]
+        grouped = df[numeric].groupby(clusters)
+
+        sizes = clusters.value_counts()
+        means = grouped.mean()
+        quantile_table = grouped.quantile(list(quantiles)).unstack() if numeric else pd.DataFrame()
+
+        # Top posts: one global sort, then the first n rows of each cluster
+        scored = df.assign(_cluster=clusters)
+        present = [c for c in score_columns if c in df.columns]
+        scored["_score"] = df[present].abs().sum(axis=1, min_count=1) if present else 0.0
+        top = scored.sort_values("_score", ascending=False, kind="stable").groupby("_cluster", sort=False).head(n_posts)
+
+        defenses = {}
+        if defenses_column in df.columns:
+            exploded = df[defenses_column].map(parse_defenses).explode().dropna()
+            if len(exploded):
+                counts = exploded.groupby(clusters.loc[exploded.index].to_numpy()).value_counts()
+                for (cluster_id, defense), count in counts.items():
+                    defenses.setdefault(int(cluster_id), []).append([defense, int(count)])
+
+        table = {}
+        for cluster_id, size in sizes.sort_index().items():
+            table[int(cluster_id)] = {
+                "size": int(size),
+                "means": {c: _plain(v) for c, v in means.loc[cluster_id].items()} if numeric else {},
+                "quantiles": {
+                    c: {str(q): _plain(quantile_table.loc[cluster_id, (c, q)]) for q in quantiles} for c in numeric
+                },
+                "top_posts": [],
+                "defenses": defenses.get(int(cluster_id), []),
+            }
+        for _, row in top.iterrows():
+            table[int(row["_cluster"])]["top_posts"].append(format_post(row, post_fields))
+
+        params = {"columns": list(df.columns), "score_columns": list(score_columns), "post_fields": dict(post_fields), "n_posts": n_posts,
+                  "defenses_column": defenses_column, "quantiles": list(quantiles)}
+        return cls(table, params)
+
+    @classmethod
+    def for_table(cls, path, score_columns, post_fields, df=None, read=pd.read_csv, cache_dir=CACHE_DIR, **params):
+        """
+        Stats for the CSV at path, from the disk cache when the file (by size and
+        mtime) and parameters are unchanged. On a miss the table is df if given,
+        else read(path).
+        """
+        path = Path(path)
+        stat = path.stat()
+        key_payload = json.dumps([str(path.resolve()), stat.st_size, stat.st_mtime_ns, list(score_columns),
+                                  post_fields, sorted(params.items())], default=str)
+        cache_path = Path(cache_dir) / f"{hashlib.blake2b(key_payload.encode(), digest_size=16).hexdigest()}.json"
+        if cache_path.exists():
+            return cls.load(cache_path)
+        stats = cls.compute(read(path) if df is None else df, score_columns, post_fields, **params)
+        stats.save(cache_path)
+        return stats
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"params": self.params, "clusters": self.clusters}, default=str))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(Path(path).read_text())
+        return cls({int(k): v for k, v in data["clusters"].items()}, data["params"])
+
+    # --- Accessors ---
+    def cluster_ids(self):
+        return sorted(self.clusters)
+
+    def size(self, cluster_id):
+        return self.clusters[int(cluster_id)]["size"]
+
+    def mean(self, cluster_id, column):
+        """Mean of column in the cluster, or None if the table has no such column."""
+        return self.clusters[int(cluster_id)]["means"].get(column)
+
+    def means_frame(self, columns=None):
+        frame = pd.DataFrame({cid: c["means"] for cid, c in self.clusters.items()}).T.sort_index()
+        frame.index.name = "cluster"
+        return frame if columns is None else frame[[c for c in columns if c in frame.columns]]
+
+    def quantile(self, cluster_id, column, q):
+        return self.clusters[int(cluster_id)]["quantiles"].get(column, {}).get(str(q))
+
+    def top_posts(self, cluster_id, n=None):
+        posts = self.clusters.get(int(cluster_id), {}).get("top_posts", [])
+        return posts if n is None else posts[:n]
+
+    def common_defenses(self, cluster_id, n=5):
+        """[(defense, count)] for the n most frequent defenses, like Counter.most_common."""
+        counts = self.clusters[int(cluster_id)]["defenses"]
+        return [tuple(pair) for pair in sorted(counts, key=lambda pair: -pair[1])[:n]]
@@ -0,0 +1,161 @@
+"""
+label_engine.py
+
+Concurrent cluster labeling over the async Anthropic client.
+Requests run under a concurrency bound and two token buckets (requests and
+input tokens per minute); transient API errors are retried with exponential
+backoff and jitter, and a cluster that still fails is reported on its own
+without stopping the others.
+"""
+
+import asyncio
+import random
+import time
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RPM = 50
+DEFAULT_INPUT_TPM = 40_000
+DEFAULT_MAX_RETRIES = 6
+
+
+class RateLimiter:
+    """Async token bucket refilled continuously at per_minute units, holding at most one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """Wait until amount units are available and take them (waiters are served in order)."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount):
+        """Charge (or refund, if negative) units after the fact, e.g. once actual token usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def is_retryable(error):
+    """Connection problems, timeouts, 408/409/429 and 5xx (including 529 overloaded) are worth retrying."""
+    import anthropic
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def retry_delay(error, attempt, base_delay=1.0, max_delay=60.0):
+    """The server's retry-after if it sent one, else exponential backoff with full jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class LabelEngine:
+    """
+    Sends one prompt per cluster through client.messages.create (an AsyncAnthropic,
+    or anything with the same interface) and hands each finished result to a callback.
+    """
+
+    def __init__(self, client, model, system, max_tokens=1000, temperature=0.3,
+                 concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, input_tpm=DEFAULT_INPUT_TPM,
+                 max_retries=DEFAULT_MAX_RETRIES, base_delay=1.0, max_delay=60.0):
+        self.client = client
+        self.model = model
+        self.system = system
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = RateLimiter(rpm)
+        self.input_tokens = RateLimiter(input_tpm)
+
+    async def query(self, prompt):
+        """Return (text, attempts) for one prompt, retrying transient errors; the last error is raised."""
+        estimate = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire(1)
+            await self.input_tokens.acquire(estimate)
+            try:
+                response = await self.client.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    system=self.system,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    e.attempts = attempt + 1
+                    raise
+                await asyncio.sleep(retry_delay(e, attempt, self.base_delay, self.max_delay))
+                continue
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.input_tokens.adjust(usage.input_tokens - estimate)
+            return response.content[0].text, attempt + 1
+
+    async def run(self, jobs, on_result=None):
+        """
+        Label every job concurrently. jobs are dicts with 'cluster_id' and 'prompt';
+        each result dict adds 'text' (None on failure), 'error', 'attempts' and
+        'seconds', and is passed to on_result(job, result) as soon as it finishes.
+        Returns the results in job order.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(job):
+            async with semaphore:
+                start = time.perf_counter()
+                result = {"cluster_id": job["cluster_id"], "text": None, "error": None, "attempts": 0}
+                try:
+                    result["text"], result["attempts"] = await self.query(job["prompt"])
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    result["attempts"] = getattr(e, "attempts", 1)
+                result["seconds"] = round(time.perf_counter() - start, 3)
+            if on_result is not None:
+                try:
+                    on_result(job, result)
+                except Exception as e:
+                    result["error"] = f"on_result failed: {type(e).__name__}: {e}"
+            return result
+
+        return await asyncio.gather(*(one(job) for job in jobs))
+
+
+def label_clusters(jobs, on_result=None, client=None, base_url=None, **engine_kwargs):
+    """Synchronous entry point: build an AsyncAnthropic client if none is given and run the engine."""
+    async def main():
+        nonlocal client
+        if client is None:
+            import anthropic
+            # Retries are handled here, with the rate limiters in the loop, not inside the SDK
+            client = anthropic.AsyncAnthropic(base_url=base_url, max_retries=0)
+        engine = LabelEngine(client, **engine_kwargs)
+        return await engine.run(jobs, on_result)
+    return asyncio.run(main())
@@ -0,0 +1,159 @@
+"""
+label_lineage.py
+
+Carries cluster labels across re-clusters. Every clustering fit writes a lineage
+table (feature_engineering/cluster_lineage.py) mapping its clusters to the
+previous fit's; this applies the tables the labels have not seen yet, once per
+fit, renaming draft and final label YAMLs and profiles to the new cluster ids
+and tagging each label with its stable id and lineage. Continued clusters keep
+their final labels; labels of split or merged clusters go back to the drafts
+for review; labels of clusters with no successor are moved to the backups.
+"""
+
+import json
+import re
+import pandas as pd
+import yaml
+from pathlib import Path
+from feature_engineering.cluster_lineage import LINEAGE_PATH
+from feature_engineering.cluster_model import MODELS_DIR
+
+LABELS_DIR = Path('./outputs/cluster_labels/')
+FINALS_DIR = LABELS_DIR / 'finals'
+PROFILES_DIR = Path('./outputs/profiles/')
+BACKUPS_DIR = Path('./outputs/cluster_backups/')
+APPLIED_PATH = LABELS_DIR / '.lineage_version'  # fit version the label files are keyed to
+REVIEW_STATUSES = ('new', 'split', 'merged')
+
+_LABEL_FILE = re.compile(r'cluster_(-?\d+)_label_draft\.yaml$')
+_PROFILE_FILE = re.compile(r'cluster_(-?\d+)\.md$')
+
+
+def load_lineage(path=LINEAGE_PATH):
+    """The latest lineage table, or None before the first fit that wrote one."""
+    path = Path(path)
+    return pd.read_csv(path) if path.exists() else None
+
+def lineage_by_cluster(lineage):
+    """{cluster id: lineage record} for YAML: stable_id, status, parents, previous_cluster, version."""
+    if lineage is None:
+        return {}
+    info = {}
+    for row in lineage.itertuples(index=False):
+        info[int(row.cluster)] = {
+            'stable_id': int(row.stable_id),
+            'status': row.status,
+            'parents': [int(p) for p in str(row.parents).split()] if pd.notna(row.parents) else [],
+            'previous_cluster': int(row.previous_cluster) if pd.notna(row.previous_cluster) else None,
+            'version': row.version,
+        }
+    return info
+
+def pending_lineages(applied, models_dir=MODELS_DIR):
+    """
+    Lineage tables from the fit after `applied` up to the latest, oldest first,
+    by walking the version chain back from LATEST. Without an applied version the
+    labels are taken to belong to the first fit that recorded lineage.
+    """
+    models_dir = Path(models_dir)
+    latest = models_dir / 'LATEST'
+    version = latest.read_text().strip() if latest.exists() else None
+    chain = []
+    while version is not None and version != applied:
+        version_dir = models_dir / version
+        if not (version_dir / 'lineage.json').exists():
+            print(f"[!] Model version {version} has no lineage table; labels before it cannot be carried forward")
+            break
+        previous = json.loads((version_dir / 'lineage.json').read_text())['previous']
+        if previous is not None:  # the first fit with lineage maps every cluster to itself
+            chain.append(pd.read_csv(version_dir / 'lineage.csv'))
+        version = previous
+    return chain[::-1]
+
+
+def _read_labels(directory):
+    labels = {}
+    for path in Path(directory).glob('cluster_*_label_draft.yaml'):
+        match = _LABEL_FILE.match(path.name)
+        if match:
+            with open(path, 'r', encoding='utf-8') as f:
+                labels[int(match.group(1))] = (path, yaml.safe_load(f) or {})
+    return labels
+
+def _write_yaml(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, sort_keys=False, allow_unicode=True)
+
+def carry_forward(lineage, labels_dir=LABELS_DIR, finals_dir=FINALS_DIR, profiles_dir=PROFILES_DIR,
+                  backups_dir=BACKUPS_DIR):
+    """
+    Apply one lineage table to the label files, which must be keyed to its
+    previous_version. Everything is read before anything is written, so a new id
+    that equals another cluster's old id cannot be overwritten. Returns counts.
+    """
+    info = lineage_by_cluster(lineage)
+    successor = {rec['previous_cluster']: (cid, rec) for cid, rec in info.items() if rec['previous_cluster'] is not None}
+    retired_dir = Path(backups_dir) / f"retired_{lineage['version'].iloc[0]}"
+    drafts, finals = _read_labels(labels_dir), _read_labels(finals_dir)
+    profiles = {}
+    for path in Path(profiles_dir).glob('cluster_*.md'):
+        match = _PROFILE_FILE.match(path.name)
+        if match:
+            profiles[int(match.group(1))] = (path, path.read_text(encoding='utf-8'))
+    for path, _ in [*drafts.values(), *finals.values(), *profiles.values()]:
+        path.unlink()
+
+    counts = {'continued': 0, 'review': 0, 'retired': 0}
+    new_drafts, new_finals = {}, {}
+    for source, old_labels in (('draft', drafts), ('final', finals)):
+        for old_id, (path, data) in old_labels.items():
+            if old_id not in successor:
+                _write_yaml(retired_dir / path.name, data)
+                counts['retired'] += 1
+                continue
+            new_id, rec = successor[old_id]
+            data['cluster_id'] = new_id
+            data['stable_id'] = rec['stable_id']
+            data['lineage'] = {**rec, 'previous_label': data.get('label')}
+            if source == 'final' and rec['status'] == 'continued':
+                new_finals[new_id] = data
+            else:
+                new_drafts.setdefault(new_id, data)  # an existing draft wins over a final sent back for review
+    for new_id, data in new_drafts.items():
+        _write_yaml(Path(labels_dir) / f'cluster_{new_id}_label_draft.yaml', data)
+    for new_id, data in new_finals.items():
+        _write_yaml(Path(finals_dir) / f'cluster_{new_id}_label_draft.yaml', data)
+    counts['continued'] = len(new_finals)
+    counts['review'] = sum(1 for data in new_drafts.values() if data['lineage']['status'] in REVIEW_STATUSES)
+
+    # Profiles follow continued finals; the rest are rebuilt by assemble_profiles after review
+    for old_id, (path, text) in profiles.items():
+        new_id = successor.get(old_id, (None,))[0]
+        if new_id in new_finals:
+            (Path(profiles_dir) / f'cluster_{new_id}.md').write_text(text, encoding='utf-8')
+        else:
+            retired_dir.mkdir(parents=True, exist_ok=True)
+            (retired_dir / path.name).write_text(text, encoding='utf-8')
+    return counts
+
+def apply_lineage(models_dir=MODELS_DIR, applied_path=APPLIED_PATH, **dirs):
+    """
+    Carry labels forward through every fit since they were last keyed, then
+    record the latest version. Safe to call at the start of every labeling step;
+    it does nothing once the labels are current. Returns the latest lineage table.
+    """
+    applied_path = Path(applied_path)
+    applied = applied_path.read_text().strip() if applied_path.exists() else None
+    lineage = load_lineage()
+    if lineage is None or len(lineage) == 0 or lineage['version'].iloc[0] == applied:
+        return lineage
+    for table in pending_lineages(applied, models_dir):
+        if len(table) == 0:
+            continue
+        counts = carry_forward(table, **dirs)
+        print(f"Carried labels to clustering version {table['version'].iloc[0]}: {counts['continued']} continued, "
+              f"{counts['review']} flagged for review, {counts['retired']} retired")
+    applied_path.parent.mkdir(parents=True, exist_ok=True)
+    applied_path.write_text(lineage['version'].iloc[0])
+    return lineage
@@ -0,0 +1,62 @@
+"""
+llm_cache.py
+
+Persistent cache of LLM responses, so re-running auto_label does not pay for
+prompts it has already sent. Responses are keyed by a hash of the model name,
+sampling parameters, system prompt and user prompt; changing any of them is a miss.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path("data/cache/llm_responses.sqlite")
+
+
+def response_key(model, system, prompt, max_tokens, temperature):
+    payload = json.dumps([model, system, prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of response text by response_key, with hit/miss counters."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created_at INTEGER)"
+            )
+        return self._conn
+
+    def get(self, key):
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, model, response):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+            (key, model, response, int(time.time())),
+        )
+        self.conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,200 @@
+"""
+representatives.py
+
+Typical, rather than extreme, posts for each cluster, chosen in embedding space.
+For every cluster at once:
+- the medoid: under cosine similarity, the member most similar to all the others
+  is the one closest to the cluster's mean direction, so no pairwise matrix is needed;
+- HDBSCAN exemplars: members nearest the clusterer's exemplar points in the
+  projection it was fitted on (or, without a saved model, the members with the
+  highest membership strength);
+- a diversity-aware top-N by maximal marginal relevance, starting from the medoid.
+Clusters larger than max_members are randomly sampled first, so the work per
+cluster is bounded regardless of corpus size.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+DEFAULT_MAX_MEMBERS = 2_000
+DEFAULT_DIVERSITY = 0.3  # MMR weight on redundancy with already chosen posts (1 - lambda)
+UMAP_PATH = Path("data/processed/embeddings_umap.npy")
+EMBEDDING_IDS_PATH = Path("data/processed/embedding_ids.csv")
+
+
+def _normalized(block):
+    block = np.asarray(block, dtype=np.float32)
+    return block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+
+def _first_per_group(groups, keys):
+    """Position of the row with the largest key in each group (groups need not be sorted)."""
+    order = np.lexsort((-keys, groups))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[order][1:] != groups[order][:-1]
+    return order[first]
+
+def _rank_in_group(groups):
+    """0, 1, 2, ... within each run of equal values of the (sorted) groups array."""
+    starts = np.r_[0, np.flatnonzero(groups[1:] != groups[:-1]) + 1]
+    return np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+
+def sample_members(labels, max_members=DEFAULT_MAX_MEMBERS, seed=42):
+    """Sorted positions of at most max_members random rows per non-noise cluster."""
+    labels = np.asarray(labels)
+    members = np.flatnonzero(labels >= 0)
+    rng = np.random.default_rng(seed)
+    # Rank rows within their cluster by a random key and keep the first max_members
+    order = members[np.lexsort((rng.random(len(members)), labels[members]))]
+    return np.sort(order[_rank_in_group(labels[order]) < max_members])
+
+
+def select_representatives(embeddings, labels, n=3, rows=None, max_members=DEFAULT_MAX_MEMBERS,
+                           diversity=DEFAULT_DIVERSITY, exemplar_points=None, projection=None,
+                           probabilities=None, seed=42):
+    """
+    Representatives for every cluster in labels (noise, -1, is skipped).
+    embeddings may be memory-mapped; row i of labels is embeddings[rows[i]]
+    (rows defaults to range(len(labels))), and only the sampled rows are read.
+    exemplar_points (clusterer.exemplars_) and projection (the fitted space,
+    aligned with labels) give HDBSCAN exemplars; otherwise probabilities
+    (cluster_prob) are used. Returns {cluster_id: {"size", "medoid", "mmr",
+    "exemplars"}} with positions into labels.
+    """
+    labels = np.asarray(labels)
+    rows = np.arange(len(labels)) if rows is None else np.asarray(rows)
+    candidates = sample_members(labels, max_members, seed)
+    if len(candidates) == 0:
+        return {}
+    group = labels[candidates]
+    cluster_ids, group_index = np.unique(group, return_inverse=True)
+
+    # Gather the sampled rows in storage order (sequential reads on a memmap), then normalize
+    read_order = np.argsort(rows[candidates], kind="stable")
+    vectors = np.empty((len(candidates), embeddings.shape[1]), dtype=np.float32)
+    vectors[read_order] = _normalized(embeddings[rows[candidates][read_order]])
+
+    # Mean direction of each cluster, all clusters in one pass
+    centroids = np.zeros((len(cluster_ids), vectors.shape[1]), dtype=np.float32)
+    np.add.at(centroids, group_index, vectors)
+    centroids = _normalized(centroids)
+    relevance = np.einsum("ij,ij->i", vectors, centroids[group_index])
+
+    medoids = _first_per_group(group_index, relevance)
+
+    # MMR, one pick per cluster per step: relevance to the centroid minus redundancy with picks so far
+    chosen = np.zeros(len(candidates), dtype=bool)
+    chosen[medoids] = True
+    picks = [medoids]
+    redundancy = np.einsum("ij,ij->i", vectors, vectors[medoids][group_index])  # medoids are in cluster order
+    for _ in range(n - 1):
+        score = (1 - diversity) * relevance - diversity * redundancy
+        score[chosen] = -np.inf
+        best = _first_per_group(group_index, score)
+        best = best[np.isfinite(score[best])]  # clusters with no candidates left
+        if len(best) == 0:
+            break
+        chosen[best] = True
+        picks.append(best)
+        picked_for = np.full(len(cluster_ids), -1)
+        picked_for[group_index[best]] = best
+        has_new = picked_for[group_index] >= 0
+        redundancy[has_new] = np.maximum(
+            redundancy[has_new],
+            np.einsum("ij,ij->i", vectors[has_new], vectors[picked_for[group_index[has_new]]]),
+        )
+
+    sizes = dict(zip(*np.unique(labels[labels >= 0], return_counts=True)))
+    result = {int(c): {"size": int(sizes[c]), "medoid": int(candidates[medoids[i]]), "mmr": [], "exemplars": []}
+              for i, c in enumerate(cluster_ids)}
+    for step in picks:
+        for position in step:
+            result[int(group[position])]["mmr"].append(int(candidates[position]))
+
+    exemplars = None
+    if exemplar_points is not None and projection is not None:
+        exemplars = exemplar_members(exemplar_points, projection, labels, n)
+    elif probabilities is not None:
+        exemplars = strongest_members(probabilities, labels, n)
+    for cluster_id, positions in (exemplars or {}).items():
+        if cluster_id in result:
+            result[cluster_id]["exemplars"] = positions
+    return result
+
+def exemplar_members(exemplar_points, projection, labels, n=3):
+    """
+    Up to n members per cluster nearest to its HDBSCAN exemplar points
+    (clusterer.exemplars_, indexed by cluster label), via one KD-tree query of
+    every member against all exemplar points.
+    """
+    from scipy.spatial import cKDTree
+    labels = np.asarray(labels)
+    points = np.vstack([np.asarray(p) for p in exemplar_points])
+    point_cluster = np.repeat(np.arange(len(exemplar_points)), [len(p) for p in exemplar_points])
+    members = np.flatnonzero(labels >= 0)
+    distances, nearest = cKDTree(points).query(np.asarray(projection[members]), k=1)
+    same = point_cluster[nearest] == labels[members]
+    members, distances, nearest = members[same], distances[same], nearest[same]
+
+    # Closest member per exemplar point, then the n closest of those per cluster
+    order = np.lexsort((distances, nearest))
+    first = np.r_[True, nearest[order][1:] != nearest[order][:-1]]
+    best = order[first]
+    result = {}
+    for position in best[np.argsort(distances[best], kind="stable")]:
+        picked = result.setdefault(int(labels[members[position]]), [])
+        if len(picked) < n:
+            picked.append(int(members[position]))
+    return result
+
+def strongest_members(probabilities, labels, n=3):
+    """Up to n members per cluster with the highest HDBSCAN membership strength."""
+    labels, probabilities = np.asarray(labels), np.asarray(probabilities, dtype=np.float64)
+    members = np.flatnonzero(labels >= 0)
+    order = members[np.lexsort((-np.nan_to_num(probabilities[members], nan=-1.0), labels[members]))]
+    result = {}
+    for position in order[_rank_in_group(labels[order]) < n]:
+        result.setdefault(int(labels[position]), []).append(int(position))
+    return result
+
+
+def representatives_for_table(df, n=3, store_dir=None, umap_path=UMAP_PATH, ids_path=EMBEDDING_IDS_PATH,
+                              use_model=True, **kwargs):
+    """
+    Representatives for a labeling table with 'id' and 'cluster' columns, reading
+    embeddings from the feature store. Positions in the result are df row
+    positions. Returns None when the store is missing, so callers can fall back.
+    """
+    from feature_engineering.feature_store import DEFAULT_STORE_DIR, FeatureStore
+    try:
+        store = FeatureStore(store_dir or DEFAULT_STORE_DIR)
+    except FileNotFoundError:
+        return None
+    rows = store.ids.get_indexer(pd.Index(df["id"]))
+    labels = df["cluster"].fillna(-1).astype(int).to_numpy().copy()
+    labels[rows < 0] = -1  # rows without embeddings cannot be representatives
+
+    if use_model:
+        try:
+            from feature_engineering.cluster_model import load_model
+            _, clusterer, _ = load_model()
+            exemplar_points = clusterer.exemplars_
+            if len(exemplar_points) != labels.max() + 1:
+                raise ValueError(f"saved model has {len(exemplar_points)} clusters, table has {labels.max() + 1}")
+            projection_rows = pd.Index(pd.read_csv(ids_path)["id"]).get_indexer(pd.Index(df["id"]))
+            projection = np.load(umap_path, mmap_mode="r")[np.maximum(projection_rows, 0)]
+            labels[projection_rows < 0] = -1
+            kwargs.update(exemplar_points=exemplar_points, projection=projection)
+        except Exception as e:  # a model from another run, or none saved: use membership strength instead
+            print(f"HDBSCAN exemplars unavailable ({e}); using membership strength")
+    if "exemplar_points" not in kwargs and "cluster_prob" in df.columns:
+        kwargs["probabilities"] = df["cluster_prob"].to_numpy()
+    return select_representatives(store.embeddings(), labels, n=n, rows=np.maximum(rows, 0), **kwargs)
+
+def representative_posts(df, representatives, post_fields, n=3, kind="mmr"):
+    """{cluster_id: [post dict]} for the first n positions of each cluster's kind ('mmr' or 'exemplars')."""
+    from interpretation.cluster_stats import format_post
+    return {
+        cluster_id: [format_post(df.iloc[position], post_fields) for position in reps[kind][:n]]
+        for cluster_id, reps in representatives.items()
+    }
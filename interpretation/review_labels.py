@@ -2,17 +2,12 @@ import os
 import yaml
 import shutil
 from colorama import Fore, Style, init
-
-# Initialize colorama
-init(autoreset=True)
+from interpretation.label_lineage import REVIEW_STATUSES, apply_lineage
 
 DRAFTS_DIR = './outputs/cluster_labels/'
 FINALS_DIR = './outputs/cluster_labels/finals/'
 BACKUPS_DIR = './outputs/cluster_backups/'
 
-os.makedirs(FINALS_DIR, exist_ok=True)
-os.makedirs(BACKUPS_DIR, exist_ok=True)
-
 summary = []
 
 def load_yaml(path):
@@ -27,6 +22,20 @@ def save_yaml(path, data):
     with open(path, 'w', encoding='utf-8') as f:
         yaml.safe_dump(data, f, sort_keys=False, allow_unicode=True)
 
+def describe_lineage(lineage):
+    """One line on where a re-clustered cluster came from, e.g. 'split from stable cluster 4 (was: Avoidant)'."""
+    status = lineage.get('status')
+    parents = ', '.join(str(p) for p in lineage.get('parents') or [])
+    if status == 'new':
+        text = f"new cluster (stable id {lineage.get('stable_id')})"
+    elif status == 'merged':
+        text = f"merged from stable clusters {parents}"
+    else:
+        text = f"{status} from stable cluster {parents}"
+    if lineage.get('previous_label'):
+        text += f" (was: {lineage['previous_label']})"
+    return text
+
 def review_label(file_name, default_accept=True):
     path = os.path.join(DRAFTS_DIR, file_name)
     data = load_yaml(path)
@@ -39,6 +48,9 @@ def review_label(file_name, default_accept=True):
     print(f"Label: {data.get('label')}")
     print(f"Dominant Traits: {data.get('traits')}")
     print(f"Psychological Structure:\n{data.get('structure')}")
+    lineage = data.get('lineage') or {}
+    if lineage.get('status') in REVIEW_STATUSES:
+        print(f"{Fore.MAGENTA}Lineage: {describe_lineage(lineage)}")
     print(f"{Fore.CYAN}=========================")
 
     if default_accept:
@@ -99,6 +111,11 @@ def review_label(file_name, default_accept=True):
         summary.append((file_name, 'Skipped - Invalid Input'))
 
 def main():
+    init(autoreset=True)
+    os.makedirs(FINALS_DIR, exist_ok=True)
+    os.makedirs(BACKUPS_DIR, exist_ok=True)
+    # Bring drafts and finals up to the latest clustering before reviewing them
+    apply_lineage()
     draft_files = [f for f in os.listdir(DRAFTS_DIR) if f.endswith('.yaml') and 'draft' in f.lower()]
 
     if not draft_files:
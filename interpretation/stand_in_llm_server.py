@@ -0,0 +1,151 @@
+"""
+stand_in_llm_server.py
+
+Local stand-in for the Messages API, for exercising auto_label without real API calls.
+Each POST /v1/messages sleeps for a random latency and then either answers with a
+well-formed label or fails the way the real API does (429 with retry-after,
+529 overloaded, 500). Prompts containing fail_marker always fail with 500.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LABEL_TEXT = """Label: Stand-in Complex
+Dominant Traits:
+  - Repetition of a single grievance
+  - Externalised blame
+  - Flattened affect
+Inferred Psychological Structure:
+  A stand-in structure returned by the local test server."""
+
+ERRORS = {
+    429: ("rate_limit_error", "Number of request tokens has exceeded your per-minute rate limit"),
+    529: ("overloaded_error", "Overloaded"),
+    500: ("api_error", "Internal server error"),
+}
+
+
+class StandInLLMServer:
+    """Threaded HTTP server with configurable latency and error rates; start() returns its base URL."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=(0.05, 0.2), rate_limit_rate=0.1,
+                 overload_rate=0.05, error_rate=0.05, retry_after=0.1, fail_marker=None, seed=0):
+        self.latency = latency
+        self.outcomes = [(429, rate_limit_rate), (529, overload_rate), (500, error_rate)]
+        self.retry_after = retry_after
+        self.fail_marker = fail_marker
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _pick(self, prompt):
+        with self.lock:
+            delay = self.rng.uniform(*self.latency)
+            if self.fail_marker and self.fail_marker in prompt:
+                return delay, 500
+            draw = self.rng.random()
+        for status, rate in self.outcomes:
+            if draw < rate:
+                return delay, status
+            draw -= rate
+        return delay, 200
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=()):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/messages":
+                    return self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+                with server.lock:
+                    server.stats["requests"] += 1
+                    server.stats["in_flight"] += 1
+                    server.stats["max_in_flight"] = max(server.stats["max_in_flight"], server.stats["in_flight"])
+                try:
+                    delay, status = server._pick(prompt)
+                    time.sleep(delay)
+                    if status != 200:
+                        with server.lock:
+                            server.stats["errors"] += 1
+                        error_type, message = ERRORS[status]
+                        headers = [("retry-after", str(server.retry_after))] if status == 429 else []
+                        return self._send(status, {"type": "error", "error": {"type": error_type, "message": message}},
+                                          headers)
+                    with server.lock:
+                        server.stats["ok"] += 1
+                    self._send(200, {
+                        "id": f"msg_standin_{server.stats['requests']}",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": request.get("model", "stand-in"),
+                        "content": [{"type": "text", "text": LABEL_TEXT}],
+                        "stop_reason": "end_turn",
+                        "stop_sequence": None,
+                        "usage": {"input_tokens": len(prompt) // 4 + 1, "output_tokens": len(LABEL_TEXT) // 4},
+                    })
+                finally:
+                    with server.lock:
+                        server.stats["in_flight"] -= 1
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Messages API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--min-latency", type=float, default=0.5)
+    parser.add_argument("--max-latency", type=float, default=3.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1, help="Fraction of requests answered with 429")
+    parser.add_argument("--overload-rate", type=float, default=0.05, help="Fraction answered with 529")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction answered with 500")
+    args = parser.parse_args()
+
+    server = StandInLLMServer(port=args.port, latency=(args.min_latency, args.max_latency),
+                              rate_limit_rate=args.rate_limit_rate, overload_rate=args.overload_rate,
+                              error_rate=args.error_rate)
+    print(f"Stand-in Messages API on {server.base_url} (Ctrl+C to stop); "
+          f"use auto_label --base-url {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"Served {server.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import pandas as pd
+from collections import Counter
+from interpretation.cluster_stats import ClusterStats
+
+
+def make_table():
+    return pd.DataFrame({
+        "cluster": [0, 1, 0, 1, 0, -1, 1],
+        "text": ["a", "b", "c", "d", "e", "f", "g"],
+        "valence": [0.1, -0.9, 0.5, 0.2, -0.3, 0.0, 0.4],
+        "complexity": [0.2, 0.1, 0.6, 0.0, 0.9, 0.5, 0.3],
+        "detected_defenses": ["['denial']", "['projection', 'denial']", None, "['projection']",
+                              "['denial', 'splitting']", "[]", "not a list"],
+    })
+
+
+def test_matches_per_cluster_filtering():
+    df = make_table()
+    stats = ClusterStats.compute(df, ["valence", "complexity"],
+                                 {"text": "text", "valence": "valence"}, n_posts=2)
+    assert stats.cluster_ids() == [-1, 0, 1]
+    for cluster_id in stats.cluster_ids():
+        subset = df[df["cluster"] == cluster_id]
+        assert stats.size(cluster_id) == len(subset)
+        assert abs(stats.mean(cluster_id, "valence") - subset["valence"].mean()) < 1e-12
+        expected = subset.assign(s=subset[["valence", "complexity"]].abs().sum(axis=1)).nlargest(2, "s")
+        assert [p["text"] for p in stats.top_posts(cluster_id)] == expected["text"].tolist()
+    assert stats.common_defenses(0) == [("denial", 2), ("splitting", 1)]
+    assert dict(stats.common_defenses(1)) == Counter(["projection", "denial", "projection"])
+
+
+def test_for_table_round_trips_through_the_cache(tmp_path):
+    path = tmp_path / "table.csv"
+    make_table().to_csv(path, index=False)
+    kwargs = dict(score_columns=["valence"], post_fields={"text": "text"}, cache_dir=tmp_path / "cache")
+    first = ClusterStats.for_table(path, **kwargs)
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+    second = ClusterStats.for_table(path, read=None, **kwargs)  # a miss would call read and fail
+    assert second.clusters == first.clusters
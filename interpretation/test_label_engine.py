@@ -0,0 +1,39 @@
+import asyncio
+import time
+import pytest
+from interpretation.label_engine import RateLimiter, label_clusters
+from interpretation.stand_in_llm_server import StandInLLMServer
+
+
+def test_rate_limiter_spaces_requests_past_the_burst():
+    async def take(limiter, n):
+        for _ in range(n):
+            await limiter.acquire(1)
+
+    limiter = RateLimiter(per_minute=600)  # 10 per second, burst of 600
+    limiter.tokens = 0
+    start = time.perf_counter()
+    asyncio.run(take(limiter, 5))
+    assert time.perf_counter() - start >= 0.4
+
+
+def test_label_clusters_survives_injected_errors():
+    pytest.importorskip("anthropic")
+    server = StandInLLMServer(latency=(0.01, 0.05), rate_limit_rate=0.2, overload_rate=0.1, error_rate=0.1,
+                              retry_after=0.01, fail_marker="ALWAYS_FAIL")
+    base_url = server.start()
+    jobs = [{"cluster_id": i, "prompt": f"cluster {i}" + (" ALWAYS_FAIL" if i == 7 else "")} for i in range(20)]
+    seen = []
+    try:
+        results = label_clusters(jobs, on_result=lambda job, result: seen.append(result["cluster_id"]),
+                                 base_url=base_url, model="stand-in", system="test", concurrency=4,
+                                 rpm=6000, input_tpm=10**6, max_retries=8, base_delay=0.01, max_delay=0.05)
+    finally:
+        server.stop()
+
+    assert [r["cluster_id"] for r in results] == list(range(20))
+    assert sorted(seen) == list(range(20))
+    failed = [r["cluster_id"] for r in results if r["error"] is not None]
+    assert failed == [7]
+    assert all(r["text"].startswith("Label:") for r in results if r["cluster_id"] != 7)
+    assert server.stats["max_in_flight"] <= 4
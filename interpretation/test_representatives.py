@@ -0,0 +1,40 @@
+import numpy as np
+from interpretation.representatives import sample_members, select_representatives, strongest_members
+
+
+def make_clusters(seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.eye(16)[:3] * 5
+    labels = np.repeat([0, 1, 2, -1], [200, 50, 5, 20])
+    embeddings = np.vstack([rng.normal(size=(200, 16)) + centers[0], rng.normal(size=(50, 16)) + centers[1],
+                            rng.normal(size=(5, 16)) + centers[2], rng.normal(size=(20, 16))]).astype(np.float32)
+    return embeddings, labels
+
+
+def test_medoid_matches_pairwise_cosine_medoid():
+    embeddings, labels = make_clusters()
+    reps = select_representatives(embeddings, labels, n=3)
+    assert sorted(reps) == [0, 1, 2]
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    for cluster_id, found in reps.items():
+        members = np.flatnonzero(labels == cluster_id)
+        distances = 1 - unit[members] @ unit[members].T
+        assert found["medoid"] == members[distances.sum(axis=1).argmin()]
+        assert found["mmr"][0] == found["medoid"]
+        assert len(set(found["mmr"])) == len(found["mmr"]) == 3
+        assert all(labels[p] == cluster_id for p in found["mmr"])
+        assert found["size"] == len(members)
+
+
+def test_sampling_bounds_candidates_per_cluster():
+    _, labels = make_clusters()
+    sampled = sample_members(labels, max_members=30)
+    counts = np.bincount(labels[sampled])
+    assert counts.tolist() == [30, 30, 5]
+    assert np.all(np.diff(sampled) > 0)
+
+
+def test_strongest_members_fallback():
+    labels = np.array([0, 0, 0, 1, 1, -1])
+    probabilities = np.array([0.2, 1.0, 0.5, 0.9, np.nan, 1.0])
+    assert strongest_members(probabilities, labels, n=2) == {0: [1, 2], 1: [3, 4]}
@@ -1,14 +1,27 @@
 import pandas as pd
+from interpretation.cluster_stats import ClusterStats
+from utils.instrumentation import stage_run
+
+run = stage_run("cluster_interpretation").start()
 
 # Load the clustered data
-df = pd.read_csv('data/processed/reddit_with_clusters.csv')
+CLUSTERED_PATH = 'data/processed/reddit_with_clusters.csv'
+df = pd.read_csv(CLUSTERED_PATH)
+stats = ClusterStats.for_table(
+    CLUSTERED_PATH,
+    score_columns=['sentiment_polarity'],
+    post_fields={'title': 'title', 'text': 'selftext', 'sentiment_polarity': 'sentiment_polarity',
+                 'sentiment_subjectivity': 'sentiment_subjectivity'},
+    df=df,
+    n_posts=5,
+)
 
 # Example: View cluster summaries (mean sentiment values per cluster)
-cluster_summary = df.groupby('cluster')[['sentiment_polarity', 'sentiment_subjectivity']].mean()
+cluster_summary = stats.means_frame(['sentiment_polarity', 'sentiment_subjectivity'])
 print(cluster_summary)
 
-# Example: View posts in Cluster 0 (replace with your actual clusters)
-cluster_0_posts = df[df['cluster'] == 0][['title', 'selftext', 'sentiment_polarity', 'sentiment_subjectivity']]
+# Example: View the strongest posts in Cluster 0 (replace with your actual clusters)
+cluster_0_posts = pd.DataFrame(stats.top_posts(0))
 print(cluster_0_posts.head())
 
 # Define human-readable labels for clusters
@@ -26,3 +39,5 @@ df['cluster_label'] = df['cluster'].map(cluster_labels)
 df.to_csv('data/processed/reddit_with_refined_labels.csv', index=False)
 
 print("Cluster interpretation complete and saved with human-readable labels.")
+run.rows(rows_in=len(df), rows_out=len(df))
+run.finish()
@@ -2,6 +2,9 @@ import hdbscan
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from utils.instrumentation import hotspot, stage_run
+
+run = stage_run("hdbscan_clustering").start()
 
 # Define the directory path for saving images
 images_dir = '/Users/am/python_code/project_folder/standalone_complex_profiler/visualisation/images'
@@ -15,7 +18,8 @@ df = pd.read_csv('/Users/am/python_code/project_folder/standalone_complex_profil
 
 # Fit HDBSCAN clustering on 2D UMAP embeddings
 clusterer = hdbscan.HDBSCAN(min_samples=10, min_cluster_size=15)
-clusters = clusterer.fit_predict(df[['umap_x', 'umap_y']])
+with hotspot("hdbscan_fit", docs=len(df)):
+    clusters = clusterer.fit_predict(df[['umap_x', 'umap_y']])
 
 # Add clustering outputs to DataFrame
 df['cluster'] = clusters
@@ -29,6 +33,8 @@ print("Cluster distribution:\n", summary)
 # Save DataFrame with HDBSCAN outputs to a new file
 df.to_csv('/Users/am/python_code/project_folder/standalone_complex_profiler/data/processed/reddit_with_hdbscan.csv', index=False)
 print("Clustering complete and saved to 'data/processed/reddit_with_hdbscan.csv'")
+run.rows(rows_in=len(df), rows_out=len(df))
+run.finish()
 
 # Visualize clusters on UMAP projection (great for understanding the general structure of your data and seeing the groups formed by HDBSCAN)
 plt.figure(figsize=(8, 6))
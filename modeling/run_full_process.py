@@ -0,0 +1,366 @@
+# Pipeline orchestrator - stages declare inputs, outputs and parameters; a stage reruns only
+# when the content hash of those (or of its code) changed, and independent stages run in parallel.
+# modeling/run_full_process.py
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from utils.instrumentation import PROFILE_ENV, REPORT_DIR, RUN_ID_ENV, run_id as new_run_id
+
+STATE_PATH = Path("data/cache/pipeline_state.json")
+LOG_DIR = Path("data/logs/pipeline")
+
+
+class Stage:
+    """
+    One pipeline step, run as 'python -m module *args'. inputs and outputs are
+    file or directory paths; code lists the source files whose edits invalidate
+    the stage. params are folded into the cache key alongside the input hashes.
+    An optional stage whose inputs do not exist yet is skipped instead of failing.
+    """
+
+    def __init__(self, name, module, args=(), inputs=(), outputs=(), code=(), params=None, optional=False):
+        self.name = name
+        self.module = module
+        self.args = [str(a) for a in args]
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.code = [Path(p) for p in code] or [Path(*module.split(".")).with_suffix(".py")]
+        self.params = params or {}
+        self.optional = optional
+
+    def command(self):
+        return [sys.executable, "-m", self.module, *self.args]
+
+
+def pipeline_stages(raw_input, fmt="csv", sample_size=None, min_cluster_size=2, workers=None, storage=None):
+    """The standard stage list for one raw JSONL file."""
+    processed = Path("data/processed")
+    stem = Path(raw_input).name
+    for suffix in (".gz", ".zst", ".zstd", ".jsonl", ".json"):
+        stem = stem[: -len(suffix)] if stem.endswith(suffix) else stem
+    cleaned = processed / f"{stem}.{fmt}"
+    signals = processed / f"{stem}_signals.csv"
+    sentences = processed / f"{stem}_sentences.npz"
+    workers_args = ["--workers", workers] if workers else []
+    storage_args = ["--storage", storage] if storage else []
+    cluster_args = ["--min-cluster-size", min_cluster_size] + (["--sample-size", sample_size] if sample_size else [])
+    cluster_args += storage_args
+
+    return [
+        Stage("prepare", "feature_engineering.prepare_text_dataset",
+              args=["--input", raw_input, "--format", fmt, *workers_args],
+              inputs=[raw_input], outputs=[cleaned]),
+        Stage("sentences", "feature_engineering.sentence_engine",
+              args=["--input", cleaned, "--output", sentences, *workers_args],
+              inputs=[cleaned], outputs=[sentences],
+              code=["feature_engineering/sentence_engine.py", "feature_engineering/sentiment_cache.py",
+                    "feature_engineering/lexicon.py"]),
+        Stage("psych", "feature_engineering.psych_signals",
+              args=["--input", cleaned, "--sentences", sentences, *workers_args],
+              inputs=[cleaned, sentences], outputs=[signals],
+              code=["feature_engineering/psych_signals.py", "feature_engineering/lexicon.py",
+                    "feature_engineering/sentiment_cache.py", "feature_engineering/feature_registry.py",
+                    "feature_engineering/parallel_features.py", "feature_engineering/sentence_engine.py",
+                    "feature_engineering/projection_signals.py", "feature_engineering/emergent_agency_index.py"]),
+        Stage("embed", "feature_engineering.embed_signals",
+              args=["--input", raw_input, *workers_args, *storage_args],
+              inputs=[raw_input],
+              outputs=[processed / "embeddings.npy", processed / "embedding_ids.csv", processed / "reddit_with_umap.csv"],
+              code=["feature_engineering/embed_signals.py", "feature_engineering/encoding_engine.py",
+                    "feature_engineering/embedding_store.py", "feature_engineering/quantized_embeddings.py"]),
+        Stage("cluster", "feature_engineering.clustering",
+              args=cluster_args,
+              inputs=[processed / "embeddings.npy", processed / "embedding_ids.csv"],
+              outputs=[processed / "cluster_labels.csv", processed / "embeddings_umap.npy"],
+              code=["feature_engineering/clustering.py", "feature_engineering/knn_graph.py",
+                    "feature_engineering/cluster_model.py", "feature_engineering/sampled_clustering.py",
+                    "feature_engineering/quantized_embeddings.py"]),
+        Stage("merge", "feature_engineering.merge_all",
+              args=["--signals", signals],
+              inputs=[signals, processed / "embedding_ids.csv", processed / "cluster_labels.csv",
+                      processed / "embeddings.npy", processed / "reddit_with_umap.csv"],
+              outputs=[processed / "feature_store" / "meta.json", processed / "reddit_with_clusters_signals_final.csv"],
+              code=["feature_engineering/merge_all.py", "feature_engineering/feature_store.py"]),
+        Stage("label", "interpretation.auto_label",
+              args=["--input", processed / "reddit_with_clusters_signals_final.csv"],
+              inputs=[processed / "reddit_with_clusters_signals_final.csv"],
+              outputs=[Path("outputs/cluster_labels")]),
+        Stage("profiles", "interpretation.assemble_profiles",
+              inputs=[Path("outputs/cluster_labels/finals")],
+              outputs=[Path("outputs/profiles")], optional=True),  # finals come from the manual review step
+    ]
+
+
+def incremental_stages(raw_dir, sample_size=None, min_cluster_size=2, workers=None,
+                       recluster_volume=None, recluster_drift=None):
+    """Daily mode: ingest only new raw files, then relabel; see feature_engineering/incremental.py."""
+    processed = Path("data/processed")
+    args = ["--raw-dir", raw_dir, "--min-cluster-size", min_cluster_size]
+    args += ["--sample-size", sample_size] if sample_size else []
+    args += ["--workers", workers] if workers else []
+    args += ["--recluster-volume", recluster_volume] if recluster_volume is not None else []
+    args += ["--recluster-drift", recluster_drift] if recluster_drift is not None else []
+    return [
+        Stage("ingest", "feature_engineering.incremental", args=args,
+              inputs=[raw_dir],
+              outputs=[processed / "incremental" / "watermark.json", processed / "reddit_with_clusters_signals_final.csv"],
+              code=["feature_engineering/incremental.py", "feature_engineering/psych_signals.py",
+                    "feature_engineering/projection_signals.py", "feature_engineering/emergent_agency_index.py",
+                    "feature_engineering/feature_registry.py", "feature_engineering/parallel_features.py",
+                    "feature_engineering/sentence_engine.py", "feature_engineering/feature_store.py",
+                    "feature_engineering/cluster_model.py"]),
+        Stage("label", "interpretation.auto_label",
+              args=["--input", processed / "reddit_with_clusters_signals_final.csv"],
+              inputs=[processed / "reddit_with_clusters_signals_final.csv"],
+              outputs=[Path("outputs/cluster_labels")]),
+        Stage("profiles", "interpretation.assemble_profiles",
+              inputs=[Path("outputs/cluster_labels/finals")],
+              outputs=[Path("outputs/profiles")], optional=True),
+    ]
+
+
+# --- Content hashing ---
+class HashCache:
+    """blake2b digests of files and directories, memoized by (size, mtime) so unchanged files are read once."""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def file_digest(self, path, chunk_bytes=64 << 20):
+        stat = path.stat()
+        cached = self.entries.get(str(path))
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_bytes):
+                digest.update(chunk)
+        self.entries[str(path)] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def digest(self, path):
+        path = Path(path)
+        if path.is_dir():
+            digest = hashlib.blake2b(digest_size=16)
+            for child in sorted(p for p in path.rglob("*") if p.is_file()):
+                digest.update(f"{child.relative_to(path)}:{self.file_digest(child)}".encode())
+            return digest.hexdigest()
+        return self.file_digest(path)
+
+def stage_key(stage, hashes):
+    """Cache key over the stage's command, parameters, input contents and code."""
+    payload = {
+        "module": stage.module,
+        "args": stage.args,
+        "params": stage.params,
+        "inputs": {str(p): hashes.digest(p) for p in stage.inputs},
+        "code": {str(p): hashes.digest(p) for p in stage.code if p.exists()},
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+# --- State ---
+def load_state(path=STATE_PATH):
+    if Path(path).exists():
+        return json.loads(Path(path).read_text())
+    return {"stages": {}, "hashes": {}}
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(path)
+
+
+# --- Scheduling ---
+def dependencies(stages):
+    """Map each stage name to the names of the stages producing its inputs."""
+    producers = {out: stage.name for stage in stages for out in stage.outputs}
+    return {stage.name: {producers[p] for p in stage.inputs if p in producers} for stage in stages}
+
+def downstream_of(stages, names):
+    """names plus every stage that transitively depends on one of them."""
+    deps = dependencies(stages)
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for stage in stages:
+            if stage.name not in selected and deps[stage.name] & selected:
+                selected.add(stage.name)
+                changed = True
+    return selected
+
+def run_stage(stage, log_dir=LOG_DIR, env=None):
+    """
+    Run one stage as a subprocess with env added to its environment, sending its
+    output to log_dir/<name>.log. Returns (returncode, seconds).
+    """
+    log_dir.mkdir(parents=True, exist_ok=True)
+    for out in stage.outputs:
+        (out if not out.suffix else out.parent).mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with open(log_dir / f"{stage.name}.log", "w", encoding="utf-8") as log:
+        log.write(f"$ {' '.join(stage.command())}\n")
+        log.flush()
+        result = subprocess.run(stage.command(), stdout=log, stderr=subprocess.STDOUT,
+                                env={**os.environ, "PYTHONUNBUFFERED": "1", **(env or {})})
+    return result.returncode, time.perf_counter() - start
+
+def run_pipeline(stages, jobs=2, force=(), until=None, dry_run=False, state_path=STATE_PATH, env=None):
+    """
+    Run stages in dependency order, up to jobs at a time. A stage is skipped when
+    its key matches the last successful run and its outputs exist; state is saved
+    after every stage, so a failed or interrupted run resumes at the first stale one.
+    Returns {stage name: {"status": ran/fresh/would_run/waiting/failed, "seconds": ...}}.
+    """
+    if until is not None:
+        names = [s.name for s in stages]
+        stages = stages[:names.index(until) + 1]
+    deps = dependencies(stages)
+    state = load_state(state_path)
+    hashes = HashCache(state.get("hashes"))
+    forced = downstream_of(stages, force) if force else set()
+
+    done, failed, would_run, running = set(), set(), set(), {}
+    outcomes = {}
+    pending = list(stages)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            # Start (or skip) every stage whose upstream stages have finished
+            ready = [s for s in pending if deps[s.name] <= done]
+            for stage in ready:
+                pending.remove(stage)
+                missing = [str(p) for p in stage.inputs if not p.exists()]
+                if missing and stage.optional:
+                    print(f"[{stage.name}] skipped: waiting for {', '.join(missing)}")
+                    outcomes[stage.name] = {"status": "waiting"}
+                    done.add(stage.name)
+                    continue
+                if missing and not (dry_run and deps[stage.name] & would_run):
+                    print(f"[{stage.name}] missing input(s): {', '.join(missing)}")
+                    outcomes[stage.name] = {"status": "failed", "reason": f"missing {missing}"}
+                    failed.add(stage.name)
+                    continue
+                key = None if missing else stage_key(stage, hashes)
+                previous = state["stages"].get(stage.name, {})
+                fresh = (key is not None and previous.get("key") == key and stage.name not in forced
+                         and not deps[stage.name] & would_run and all(p.exists() for p in stage.outputs))
+                if fresh:
+                    print(f"[{stage.name}] up to date (last run {previous.get('finished_at')})")
+                    outcomes[stage.name] = {"status": "fresh"}
+                    done.add(stage.name)
+                elif dry_run:
+                    print(f"[{stage.name}] would run: {' '.join(stage.command()[1:])}")
+                    outcomes[stage.name] = {"status": "would_run"}
+                    would_run.add(stage.name)
+                    done.add(stage.name)
+                else:
+                    print(f"[{stage.name}] running: {' '.join(stage.command()[1:])}")
+                    running[pool.submit(run_stage, stage, LOG_DIR, env)] = (stage, key)
+
+            # Stages downstream of a failure can never start
+            blocked = [s for s in pending if deps[s.name] & failed]
+            for stage in blocked:
+                pending.remove(stage)
+                failed.add(stage.name)
+                outcomes[stage.name] = {"status": "failed", "reason": "upstream stage failed"}
+                print(f"[{stage.name}] skipped: upstream stage failed")
+            if not running:
+                if not ready and not blocked:
+                    break  # nothing left that can start
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, key = running.pop(future)
+                returncode, seconds = future.result()
+                outcomes[stage.name] = {"status": "ran" if returncode == 0 else "failed", "seconds": round(seconds, 2)}
+                if returncode != 0:
+                    failed.add(stage.name)
+                    print(f"[{stage.name}] FAILED after {seconds:.1f}s (exit {returncode}); see {LOG_DIR / stage.name}.log")
+                    continue
+                state["stages"][stage.name] = {"key": key, "finished_at": datetime.now().isoformat(timespec="seconds"),
+                                               "seconds": round(seconds, 2)}
+                state["hashes"] = hashes.entries
+                save_state(state, state_path)
+                done.add(stage.name)
+                print(f"[{stage.name}] done in {seconds:.1f}s")
+
+    if not dry_run:
+        state["hashes"] = hashes.entries
+        save_state(state, state_path)
+    return outcomes
+
+def write_run_report(stages, outcomes, run_id, report_dir=REPORT_DIR):
+    """Combine the per-stage reports of one run with the scheduler's outcomes into pipeline.json."""
+    run_dir = Path(report_dir) / run_id
+    report = {"run_id": run_id, "stages": []}
+    for stage in stages:
+        if stage.name not in outcomes:
+            continue
+        entry = {"name": stage.name, "module": stage.module, **outcomes[stage.name]}
+        stage_report = run_dir / f"{stage.module.rsplit('.', 1)[-1]}.json"
+        if outcomes[stage.name]["status"] in ("ran", "failed") and stage_report.exists():
+            entry["report"] = json.loads(stage_report.read_text())
+        report["stages"].append(entry)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "pipeline.json").write_text(json.dumps(report, indent=2))
+    return run_dir / "pipeline.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full profiling pipeline, skipping up-to-date stages")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=str, help="Raw Reddit JSONL(.gz/.zst)")
+    source.add_argument("--incremental", type=str, metavar="RAW_DIR",
+                        help="Daily mode: ingest only new *_posts_*.jsonl files in RAW_DIR")
+    parser.add_argument("--recluster-volume", type=float, default=None,
+                        help="Incremental: re-cluster when new rows exceed this fraction of the last fit")
+    parser.add_argument("--recluster-drift", type=float, default=None,
+                        help="Incremental: re-cluster when the noise fraction of new posts rises this much")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Cleaned dataset format")
+    parser.add_argument("--sample-size", type=int, default=None, help="Cluster via a stratified sample of this size")
+    parser.add_argument("--min-cluster-size", type=int, default=2, help="HDBSCAN min_cluster_size")
+    parser.add_argument("--workers", type=int, default=None, help="Processes per stage (prepare, sentences, psych, embed)")
+    parser.add_argument("--embedding-storage", choices=["float16", "int8"], default=None,
+                        help="Also store embeddings quantized and cluster from that copy")
+    parser.add_argument("--jobs", type=int, default=2, help="Independent stages run at once")
+    parser.add_argument("--force", nargs="+", default=[], help="Rerun these stages and everything downstream")
+    parser.add_argument("--until", type=str, default=None, help="Stop after this stage (e.g. merge)")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    parser.add_argument("--profile", action="store_true", help="Dump cProfile output for every stage that runs")
+    args = parser.parse_args()
+
+    if args.incremental:
+        stages = incremental_stages(args.incremental, args.sample_size, args.min_cluster_size, args.workers,
+                                    args.recluster_volume, args.recluster_drift)
+    else:
+        stages = pipeline_stages(args.input, args.format, args.sample_size, args.min_cluster_size, args.workers,
+                                 args.embedding_storage)
+    names = [s.name for s in stages]
+    unknown = [n for n in args.force + ([args.until] if args.until else []) if n not in names]
+    if unknown:
+        parser.error(f"Unknown stage(s) {unknown}; choose from {names}")
+
+    run_id = new_run_id()
+    env = {RUN_ID_ENV: run_id, **({PROFILE_ENV: "1"} if args.profile else {})}
+    start = time.perf_counter()
+    outcomes = run_pipeline(stages, jobs=args.jobs, force=args.force, until=args.until, dry_run=args.dry_run, env=env)
+    ok = all(o["status"] != "failed" for o in outcomes.values())
+    if not args.dry_run:
+        print(f"Run report: {write_run_report(stages, outcomes, run_id)}")
+    print(f"Pipeline {'finished' if ok else 'stopped with failures'} in {time.perf_counter() - start:.1f}s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
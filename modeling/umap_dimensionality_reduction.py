@@ -1,5 +1,8 @@
 import umap
 import pandas as pd
+from utils.instrumentation import hotspot, stage_run
+
+run = stage_run("umap_dimensionality_reduction").start()
 
 # Load the processed data with sentiment features
 df = pd.read_csv('/Users/am/python_code/project_folder/standalone_complex_profiler/data/processed/reddit_with_sentiment.csv')
@@ -9,7 +12,8 @@ features = df[['sentiment_polarity', 'sentiment_subjectivity']]  # Add any other
 
 # Initialize and fit UMAP
 umap_model = umap.UMAP(n_neighbors=15, min_dist=0.1, n_components=2)
-umap_embeddings = umap_model.fit_transform(features)
+with hotspot("umap_fit", docs=len(features)):
+    umap_embeddings = umap_model.fit_transform(features)
 
 # Save the UMAP output
 df['umap_x'] = umap_embeddings[:, 0]
@@ -19,3 +23,5 @@ df['umap_y'] = umap_embeddings[:, 1]
 df.to_csv('/Users/am/python_code/project_folder/standalone_complex_profiler/data/processed/reddit_with_umap.csv', index=False)
 
 print("UMAP dimensionality reduction complete and saved to 'data/processed/reddit_with_umap.csv'")
+run.rows(rows_in=len(df), rows_out=len(df))
+run.finish()
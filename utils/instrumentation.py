@@ -0,0 +1,152 @@
+# Per-stage performance instrumentation - wall/CPU time, peak RSS, row counts and named hot spots,
+# written as one JSON report per stage run, with optional cProfile output.
+# utils/instrumentation.py
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+REPORT_DIR = Path("data/reports")
+PROFILE_ENV = "PROFILER_PROFILE"  # set to 1 to profile every stage (run_full_process --profile does this)
+RUN_ID_ENV = "PROFILER_RUN_ID"    # groups the reports of one pipeline run under data/reports/<run id>/
+
+_active = None
+
+
+def _peak_rss_mb(who):
+    """Peak resident set size in MB for this process or its reaped children (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(who(resource)).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)  # bytes on macOS, KB on Linux
+
+def run_id():
+    return os.environ.get(RUN_ID_ENV) or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+class StageRun:
+    """
+    Measures one stage run. Use as a context manager (or start()/finish() in
+    module-level scripts); hot spots inside it are timed with hotspot(), which
+    also works from library code that does not know about the run.
+    """
+
+    def __init__(self, stage, profile=None, report_dir=REPORT_DIR):
+        self.stage = stage
+        self.profile = os.environ.get(PROFILE_ENV) == "1" if profile is None else profile
+        self.report_dir = Path(report_dir) / run_id()
+        self.rows_in = None
+        self.rows_out = None
+        self.hotspots = {}
+        self.extra = {}
+        self._profiler = None
+
+    def start(self):
+        global _active
+        _active = self
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children = os.times()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(status="ok" if exc_type is None else f"error: {exc_type.__name__}")
+        return False
+
+    def rows(self, rows_in=None, rows_out=None):
+        """Record how many rows the stage read and wrote."""
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+
+    def record(self, name, seconds, docs=None):
+        spot = self.hotspots.setdefault(name, {"calls": 0, "seconds": 0.0, "docs": 0})
+        spot["calls"] += 1
+        spot["seconds"] += seconds
+        spot["docs"] += docs or 0
+
+    def finish(self, status="ok"):
+        """Stop measuring and write the JSON report (and the cProfile dump, if profiling)."""
+        global _active
+        wall = time.perf_counter() - self._wall
+        children = os.times()
+        child_cpu = (children.children_user - self._children.children_user
+                     + children.children_system - self._children.children_system)
+        if _active is self:
+            _active = None
+
+        for spot in self.hotspots.values():
+            spot["seconds"] = round(spot["seconds"], 4)
+            spot["docs_per_sec"] = round(spot["docs"] / spot["seconds"], 1) if spot["docs"] and spot["seconds"] else None
+        report = {
+            "stage": self.stage,
+            "status": status,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(time.process_time() - self._cpu, 3),
+            "child_cpu_seconds": round(child_cpu, 3),
+            "peak_rss_mb": _peak_rss_mb(lambda r: r.RUSAGE_SELF),
+            "peak_child_rss_mb": _peak_rss_mb(lambda r: r.RUSAGE_CHILDREN),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "docs_per_sec": round(self.rows_in / wall, 1) if self.rows_in and wall else None,
+            "hotspots": self.hotspots,
+            **self.extra,
+        }
+
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        report_path = self.report_dir / f"{self.stage}.json"
+        if self._profiler is not None:
+            self._profiler.disable()
+            profile_path = self.report_dir / f"{self.stage}.prof"
+            self._profiler.dump_stats(profile_path)
+            report["profile"] = str(profile_path)
+            summary = io.StringIO()
+            pstats.Stats(self._profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+            print(summary.getvalue())
+        report_path.write_text(json.dumps(report, indent=2))
+
+        hot = ", ".join(f"{name} {spot['seconds']:.1f}s" for name, spot in self.hotspots.items())
+        print(f"[{self.stage}] {report['wall_seconds']:.1f}s wall, {report['cpu_seconds']:.1f}s CPU, "
+              f"peak RSS {report['peak_rss_mb']} MB{'; ' + hot if hot else ''} -> {report_path}")
+        return report
+
+
+def stage_run(stage, profile=None):
+    """StageRun for stage; profile=None defers to the PROFILER_PROFILE environment variable."""
+    return StageRun(stage, profile=profile or None)
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", action="store_true", help="Dump cProfile output for this stage")
+    return parser
+
+def record_hotspot(name, seconds, docs=None):
+    """Add an externally timed block to the active stage run, if any."""
+    if _active is not None:
+        _active.record(name, seconds, docs)
+
+@contextmanager
+def hotspot(name, docs=None):
+    """Time a named block (optionally processing docs items) into the active stage run, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_hotspot(name, time.perf_counter() - start, docs)
@@ -0,0 +1,29 @@
+# Lazily created shared resources - models, API clients and corpora are built on first use, once per
+# process, so importing a module (or running an entry point with --help) never pays for them.
+# utils/lazy.py
+
+import functools
+import threading
+
+
+def shared(factory):
+    """
+    Decorator for a zero-argument factory: the first call builds the resource
+    (under a lock, so concurrent first uses build it once) and later calls return
+    the same object. get.loaded() tells whether it has been built; get.reset()
+    drops it so the next call builds a fresh one.
+    """
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(factory)
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+
+    get.loaded = lambda: bool(built)
+    get.reset = built.clear
+    return get
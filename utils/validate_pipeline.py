@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
+from feature_engineering.feature_store import FeatureStore
+from feature_engineering.quantized_embeddings import STORAGE_TYPES, QuantizedEmbeddings, quantized_paths
 
 def fail(msg):
     print(f"{msg}")
@@ -21,7 +23,7 @@ def validate_pipeline():
         "Embedding IDs": base / "embedding_ids.csv",
         "Embeddings": base / "embeddings.npy",
         "Cluster labels": base / "cluster_labels.csv",
-        "Merged dataset": base / "full_features.csv"
+        "Feature store": base / "feature_store" / "meta.json"
     }
 
     for name, path in files.items():
@@ -31,29 +33,46 @@ def validate_pipeline():
     psych = pd.read_csv(files["Heuristic features"])
     ids = pd.read_csv(files["Embedding IDs"])
     clusters = pd.read_csv(files["Cluster labels"])
-    embeddings = np.load(files["Embeddings"])
-    full = pd.read_csv(files["Merged dataset"])
+    embeddings = np.load(files["Embeddings"], mmap_mode="r")
+    store = FeatureStore(base / "feature_store")
 
     # Check row counts
     if not (len(psych) == len(ids) == len(clusters) == embeddings.shape[0]):
         fail("Mismatch in row counts between psych, IDs, clusters, or embeddings.")
     print("All component datasets have matching row counts.")
 
+    # Quantized copies, where written, must cover the same rows
+    for storage in STORAGE_TYPES[1:]:
+        if quantized_paths(files["Embeddings"], storage)[0].exists():
+            quantized = QuantizedEmbeddings(files["Embeddings"], storage)
+            if quantized.shape != embeddings.shape:
+                fail(f"{storage} embeddings have shape {quantized.shape}, expected {embeddings.shape}")
+            print(f"{storage} embeddings match the float32 matrix.")
+
     # Check ID consistency
     if not (psych["id"].equals(ids["id"]) and psych["id"].equals(clusters["id"])):
         fail("Mismatch in post IDs across datasets.")
     print("All IDs are aligned across files.")
 
-    # Check full_features shape
-    expected_cols = psych.shape[1] + 1 + embeddings.shape[1]  # +1 for cluster
-    if full.shape[1] != expected_cols:
-        fail(f"full_features.csv has unexpected number of columns ({full.shape[1]} vs expected {expected_cols})")
-    print("full_features.csv has correct number of columns.")
+    # Check feature store shape
+    signals = store.load()
+    expected_cols = psych.shape[1] + clusters.shape[1] - 1  # signals + cluster columns, sharing 'id'
+    if signals.shape[1] != expected_cols:
+        fail(f"Feature store signals have unexpected number of columns ({signals.shape[1]} vs expected {expected_cols})")
+    store_embeddings = store.embeddings()
+    if store_embeddings.shape != (len(store), embeddings.shape[1]):
+        fail(f"Feature store embeddings have shape {store_embeddings.shape}, expected ({len(store)}, {embeddings.shape[1]})")
+    if not signals["id"].equals(pd.Series(store.ids, name="id")):
+        fail("Feature store signal rows are not aligned with its id index.")
+    print("Feature store has correct columns and aligned embeddings.")
 
     # Check for NaNs
-    if full.isnull().any().any():
-        fail("NaN values detected in full_features.csv")
-    print("No NaNs in full_features.csv")
+    if signals.isnull().any().any():
+        fail("NaN values detected in feature store signals")
+    for start in range(0, len(store_embeddings), 100_000):
+        if np.isnan(store_embeddings[start:start + 100_000]).any():
+            fail("NaN values detected in feature store embeddings")
+    print("No NaNs in feature store")
 
     # Cluster sanity check
     cluster_counts = clusters["cluster"].value_counts(dropna=False)